@@ -7,8 +7,23 @@ import math
 import operator
 import numpy as np
 import os
+import importlib.util
+import sys
 from enum import Enum
 
+## LoadImranLibrary loads one of my helper libraries from the SceneBasics folder by file path, as blender doesn't know about it.
+github_drive = "f"
+library_path = github_drive + ":/github/technicalsmartistry/Blender/SceneBasics/"
+def LoadImranLibrary(module_name):
+    spec = importlib.util.spec_from_file_location(module_name, library_path + module_name + ".py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return(module)
+
+ml = LoadImranLibrary("ImranMeshLib")
+sl = LoadImranLibrary("ImranSceneLib")
+
 class BoneTypes(Enum):
     Deform  = 1
     Control = 2
@@ -34,36 +49,18 @@ class MeshUtilities():
         pass
 
     ## CreateKDTreeFromObject makes a KD tree, which is a data structure used to find spatial differences quickly.
+    ## The tree comes from the shared cache, so it's only rebuilt when the mesh's vertices actually changed.
     ## Parameters:
     ##  dataItem -- the 'MESH' of the item we want to generate a KD tree from.
     def CreateKDTreeFromObject(self, dataItem):
-        kd = mathutils.kdtree.KDTree(len(dataItem.vertices))
-        for i, v in enumerate(dataItem.vertices):
-            kd.insert(v.co, i)
-        kd.balance()
-        return(kd)
+        return(ml.CreateKDTreeFromObject(dataItem))
 
-    ## DeleteAllMeshObjects deletes all objects of type 'MESH'
+    ## DeleteAllMeshObjects deletes all objects of type 'MESH', and the meshes they orphan.  Gives back the scene library's deletion report.
     def DeleteAllMeshObjects(self):
-        # We want to be in object mode and select all
-        if bpy.context.object == None:
-            return
-        match bpy.context.object.mode:
-            case 'EDIT':
-                bpy.ops.object.editmode_toggle()
-            case 'SCULPT':
-                bpy.ops.sculpt.sculptmode_toggle()
-
-        bpy.ops.object.select_all(action='SELECT')
-        
-        # deselect anything that isn't a mesh
-        for selectedObject in bpy.context.selected_objects:
-            if selectedObject.type != "MESH":
-                selectedObject.select_set(False)
-        
-        # delete all selected objects.
-        bpy.ops.object.delete(use_global=False, confirm=False)
-        pass
+        report = sl.SceneReset().DeleteAllMeshObjects()
+        ml.SharedKDTreeCache.Invalidate() ## the cached trees belong to meshes that are gone now
+        ml.SharedBVHTreeCache.Invalidate()
+        return(report)
 
     ## SelectSomeNearbyVertices selects n number of vertices based on an item, a point, and a target number of vertices.
     ## Params:
@@ -79,7 +76,7 @@ class MeshUtilities():
             vertexIndices.append(thisResult[1])
 
         # select the vertices
-        self.SelectVerticesByIndex(dataItem, vertexIndices)
+        self.SelectVerticesByIndices(dataItem, vertexIndices)
         pass
 
     ## SelectVerticesByIndices selects vertices by index in an 'MESH' object
@@ -90,37 +87,22 @@ class MeshUtilities():
     ##  Meshes are lists of points, loops, and faces.  Each list is a 0 indexed array.
     ##  Various functions will give us a list of vertex indices -- we can use those lists to select the vertices for further edits.
     def SelectVerticesByIndices(self, dataItem=None, vertexIndices=[]):
-        # Get the bmesh object from edit mode 
+        # The library writes the whole selection in one pass and adds it to whatever is already selected.
+        ml.ApplyVertexSelection(dataItem, vertexIndices, ml.SelectionOperations.Union)
+
+        # The callers expect to be in edit mode after a selection
         if bpy.context.object.mode != 'EDIT':
             bpy.ops.object.editmode_toggle()
-        bm = bmesh.from_edit_mesh(dataItem)
-        
-        # select the found target vertex
-        for targetVertexIndex in vertexIndices:
-            bm.verts.ensure_lookup_table()
-            bm.verts[targetVertexIndex].select_set(True)
-            
-        # To update blender's UX with the selection change, we need to flush and update
-        bm.select_mode |= {'VERT'}
-        bm.select_flush_mode()
-        bmesh.update_edit_mesh(dataItem)
         pass ## Just to look pretty
 
-    ## IncreaseVertexCount adds vertices to the mesh around the entire mesh by adding a subdivide modifier and applying the modifier.
+    ## IncreaseVertexCount adds vertices to the mesh around the entire mesh by subdividing it, like adding and applying a subdivide modifier.
+    ## My mesh library does the subdividing on the vertex arrays, so no modifier, selection or active object is needed.
     def IncreaseVertexCount(self, mesh, method=SubSurfModifierMethods.Simple, level=1):
-        self.worldUtils.SetObjectMode()
-        self.worldUtils.SelectItems([mesh])
-        if bpy.context.object.modifiers.find("Subdivision") < 0:
-            bpy.ops.object.modifier_add(type='SUBSURF')
-
-        bpy.context.object.modifiers["Subdivision"].subdivision_type = method.value
-        bpy.context.object.modifiers["Subdivision"].levels = level
-        bpy.context.object.modifiers["Subdivision"].render_levels = level
-
-        bpy.ops.object.modifier_apply(modifier="Subdivision", report=True) ## applies viewport amount
+        ml.SubdivideMesh(mesh, ml.SubdivisionMethods(method.value), level)
         pass
 
 ## A class to create meshes
+## The meshes are built straight from arrays by my mesh library, so nothing gets selected and no operator runs.
 class MeshPrimitives():
     def __init__(self):
         self.worldUtils = WorldUtilities()
@@ -128,33 +110,24 @@ class MeshPrimitives():
 
     ## Circle is a simple circle
     def Circle(self, radius=1, location=(0, 0, 0)):
-        bpy.ops.mesh.primitive_circle_add(radius=radius, enter_editmode=False, align='WORLD', location=location, scale=(1, 1, 1))
-        circle = bpy.context.object.data
-        bpy.context.selected_objects[0].name = circle.name
-        return(circle)
+        circle = ml.NewPrimitiveObject("Circle", ml.mp.Circle, location=location, radius=radius)
+        return(circle.data)
     
 
     ## Cylinder is a simple cylinder with radius r and height h
     def Cylinder(self, r=1, h=2):
-        self.worldUtils.DeselectAll()
-        bpy.ops.mesh.primitive_cylinder_add(radius=r, depth=h, enter_editmode=False, align='WORLD', location=(0, 0, 0), scale=(1, 1, 1))
-        cyl = bpy.context.object.data
-        bpy.context.selected_objects[0].name = cyl.name
-        return(cyl)
+        cyl = ml.NewPrimitiveObject("Cylinder", ml.mp.Cylinder, radius=r, depth=h)
+        return(cyl.data)
 
     ## IvoShphere is a sphere with regularly placed vertices
     def IcoSphere(self, radius=1, location=(0, 0, 0)):
-        bpy.ops.mesh.primitive_ico_sphere_add(radius=radius, enter_editmode=False, align='WORLD', location=location, scale=(1, 1, 1))
-        sphere = bpy.context.object.data
-        bpy.context.selected_objects[0].name = sphere.name
-        return(sphere)
+        sphere = ml.NewPrimitiveObject("Icosphere", ml.mp.IcoSphere, location=location, radius=radius)
+        return(sphere.data)
 
     ## UVSphere is a sphere with vertices increasing in concentration around one axis.
     def UVSphere(self, radius=1, location=(0, 0, 0)):
-        bpy.ops.mesh.primitive_uv_sphere_add(radius=radius, enter_editmode=False, align='WORLD', location=location, scale=(1, 1, 1))
-        sphere = bpy.context.object.data
-        bpy.context.selected_objects[0].name = sphere.name
-        return(sphere)
+        sphere = ml.NewPrimitiveObject("Sphere", ml.mp.UVSphere, location=location, radius=radius)
+        return(sphere.data)
 
 ## A class to create Armatures/bones, append them to meshes, and create named control shapes
 class SkeletonUtilities():
@@ -170,16 +143,9 @@ class SkeletonUtilities():
         bpy.context.selected_objects[0].name = bone.name
         return(bone)
 
-    ## ClearAll deletes all Armatures
+    ## ClearAll deletes all Armatures, and the armature data they orphan.  Gives back the scene library's deletion report.
     def DeleteAllArmatureObjects(self, scene='Scene'):
-        self.worldUtils.DeselectAll()
-        allObjects = bpy.data.scenes['Scene'].objects
-        for object in allObjects:
-            if object.type == 'ARMATURE':
-                # select the object
-                object.select_set(True)
-        self.worldUtils.DeleteSelected()
-        pass
+        return(sl.SceneReset().DeleteAllArmatureObjects(bpy.data.scenes[scene]))
 
     ## AddNewArmatureToMesh adds a single Armature/bone to a mesh at the center of the mesh and auto-weights mesh vertices to it.
     def AddNewArmatureToMesh(self, mesh, boneSize=(1, 1, 1)):
@@ -219,14 +185,10 @@ class SkeletonUtilities():
         self.worldUtils.SetObjectMode()
         self.worldUtils.SelectItems([armature])
 
-        # Change to edit mode and select nothing.
-        bpy.ops.object.editmode_toggle()
-        bpy.ops.armature.select_all(action='DESELECT')
-        
-        # Get the bone I want to extrude another bone from, and select the tail by edit mode foolishness (IMHO, this is a bug).
-        lastBone = armature.bones[len(armature.bones)-1]
-        bpy.ops.object.editmode_toggle()
-        lastBone.select_tail = True
+        # Select nothing but the tail of the bone I want to extrude another bone from.  Bone selection set in object mode
+        # is what edit mode starts with, so one toggle is enough.
+        self.DeselectAllBones(armature)
+        armature.bones[len(armature.bones)-1].select_tail = True
         bpy.ops.object.editmode_toggle()
         
         # extrude a bone 1 unit vertically constrained on Z from this selected tail
@@ -235,8 +197,11 @@ class SkeletonUtilities():
         # this extruded bone is now the active object, capture a reference to it before I lose it.
         newBone = bpy.context.active_bone
 
-        # deslect all, go back to object mode and return
-        bpy.ops.armature.select_all(action='DESELECT')
+        # deslect all the edit bones and return
+        for bone in armature.edit_bones:
+            bone.select = False
+            bone.select_head = False
+            bone.select_tail = False
         return (newBone)
 
     ## SelectSingleBoneForEdit selects a single bone and puts in edit mode.
@@ -245,16 +210,20 @@ class SkeletonUtilities():
         self.worldUtils.SetObjectMode()
         self.worldUtils.SelectItems([armature])
 
-        # enter edit mode and select no bones at all
-        bpy.ops.object.editmode_toggle()
-        bpy.ops.armature.select_all(action='DESELECT')
-        bpy.ops.object.editmode_toggle()
-
-        # select the bone and re-enter edit mode
+        # select no bones but this one, then enter edit mode
+        self.DeselectAllBones(armature)
         armature.bones[boneName].select=True
         bpy.ops.object.editmode_toggle()
         pass
 
+    ## DeselectAllBones clears the selection of every bone in an armature, straight on the data, in object mode.
+    def DeselectAllBones(self, armature):
+        for bone in armature.bones:
+            bone.select = False
+            bone.select_head = False
+            bone.select_tail = False
+        pass
+
 ## A class to help add/create textures to a mesh
 class TextureUtilities():
 
@@ -308,9 +277,10 @@ class WorldUtilities():
         bpy.ops.object.delete(use_global=False, confirm=False)
         pass
 
-    ## DeselectAll selects nothing.
+    ## DeselectAll selects nothing.  Only the selected objects are touched, so it doesn't walk the whole scene.
     def DeselectAll(self):
-        bpy.ops.object.select_all(action='DESELECT')
+        for item in bpy.context.selected_objects:
+            item.select_set(False)
         pass
 
     ## SelectItems first deselects any other item, then selects the list of items.
@@ -322,31 +292,30 @@ class WorldUtilities():
     ## SelectAdditionalItems adds items to the selection
     def SelectAdditionalItems(self, items, scene='Scene'):
         for toselectItem in items:
-            bpy.data.scenes[scene].objects.get(toselectItem.name).select_set(True)
+            self.GetWorldObjectFromObject(toselectItem, scene).select_set(True)
         pass
 
     ## SetSceneKeysToObjectDataNames sets the world outline name for an object to the same name as the objects data name.
+    ## Only objects added or renamed since the last sync get renamed.  Gives back the scene library's sync report.
     def SetSceneKeysToObjectDataNames(self, scene='Scene'):
-        allObjects = bpy.data.scenes[scene].objects
-        for object in allObjects:
-            object.name = object.data.name
-        pass
+        return(sl.GetNameSync(scene).Sync(objectsFromData=True))
 
     ## SetSceneObjectDataNamesToSceneNames sets the object's data name to the world outliner name.
+    ## Only objects added or renamed since the last sync get renamed.  Gives back the scene library's sync report.
     def SetSceneObjectDataNamesToSceneNames(self, scene='Scene'):
-        allObjects = bpy.data.scenes[scene].objects
-        for object in allObjects:
-            object.data.name = object.name
-        pass
+        return(sl.GetNameSync(scene).Sync(objectsFromData=False))
 
     ## GetWorldObjectFromObject gets the data object from a world object. In blender, objects are typed.  The world/scene objects are a different type than the same object as a Mesh, bone, etc
+    ## The scene library's index maps each mesh/armature to the object that owns it, so this works even when the names don't match.
     def GetWorldObjectFromObject(self, object, scene='Scene'):
-         target = bpy.data.scenes[scene].objects.get(object.name)
-         return(target)
+        if isinstance(object, bpy.types.Object):
+            return(sl.GetSceneIndex(scene).ObjectByName(object.name))
+        target = sl.GetSceneIndex(scene).OwnerOfData(object)
+        return(target)
 
-    ## def GetObjectByName gives us a bpy.data.objects instance and searches by name
+    ## def GetObjectByName gives us a bpy.data.objects instance and searches by name, through the scene library's name index.
     def GetObjectByName(self, name, scene='Scene'):
-        target = bpy.data.scenes[scene].objects.get(name)
+        target = sl.GetSceneIndex(scene).ObjectByName(name)
         return(target)
 
     ## HideObjectFromRender hides an object from being rendered in a full render, but shows in viewport.
@@ -362,20 +331,27 @@ class WorldUtilities():
         pass
 
 
-    ## SetObjectMode selects nothing and puts the system in object mode.
+    ## SetObjectMode selects nothing and puts the system in object mode.  The mode switch only runs if we're in another mode.
     def SetObjectMode(self):
         self.DeselectAll()
-        bpy.ops.object.mode_set()
+        if bpy.context.object is not None and bpy.context.object.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
         pass
 
-    ## TranslateSelected will translate the selected objects
+    ## TranslateSelected will translate the selected objects -- in object mode straight on their locations, in edit mode with the operator.
     def TransateSelected(self, translate_displacement=(0, 0, 0)):
-        bpy.ops.transform.translate(value=translate_displacement)
+        if bpy.context.mode != 'OBJECT':
+            bpy.ops.transform.translate(value=translate_displacement)
+            return
+        for item in bpy.context.selected_objects:
+            item.location += mathutils.Vector(translate_displacement)
         pass
 
      
 ###
 ## Main Questions -- just stuff I want to figure out how to do.
+## Each question is one bulk scene build: the helpers select, deselect and add constraints through the data API instead of operators,
+## so the scene is evaluated once when the question finishes rather than around every operator call.
 ###
 
 class BasicAnimationQuestions():
@@ -402,6 +378,7 @@ class BasicAnimationQuestions():
 
 
     ## How do I use what I know to animate two eyes tracking something?
+    @sl.BulkSceneBuild()
     def HowDoIAnimateEyes(self):
         # clear everything, draw the character, create a bone, and parent an eye to the created bone.
         self.meshUtils.DeleteAllMeshObjects()
@@ -421,8 +398,7 @@ class BasicAnimationQuestions():
             self.worldUtils.DeselectAll()
             bone = self.skelUtils.AddNewArmatureToMesh(character[eye])
             self.worldUtils.SetSceneKeysToObjectDataNames()
-            bpy.ops.object.constraint_add(type='TRACK_TO')
-            bpy.context.object.constraints["Track To"].target = self.worldUtils.GetWorldObjectFromObject(reticle)
+            bpy.context.object.constraints.new('TRACK_TO').target = self.worldUtils.GetWorldObjectFromObject(reticle)
             bones.append(bone)
         
         # update the character hash to include the bones.
@@ -430,6 +406,7 @@ class BasicAnimationQuestions():
         return(character)
 
     ## How do I bend a tube?  Adapted from https://www.youtube.com/watch?v=jw30S-Oepyo
+    @sl.BulkSceneBuild()
     def HowDoIBendATube(self):
         self.meshUtils.DeleteAllMeshObjects()
         cylinderHeight = 10
@@ -480,10 +457,10 @@ class BasicAnimationQuestions():
         pass
     
     ## How do I squish a ball? Adapted from https://www.youtube.com/watch?v=1LIH_T3irRY
+    @sl.BulkSceneBuild()
     def HowdDoISquishABall(self):
         # step 1 -- create a ball and a bone and place the ball on the ground, add a full length bone
-        ball = self.meshPrims.IcoSphere()
-        self.worldUtils.TransateSelected((0, 0, 1))
+        ball = self.meshPrims.IcoSphere(location=(0, 0, 1))
         armature = self.skelUtils.CreateArmature()
         lastBoneName = armature.bones[0].name
 
@@ -501,13 +478,13 @@ class BasicAnimationQuestions():
 
         # step 3 -- add a maintain volume object constraint to the armature with a free Z axis.
         self.worldUtils.SelectItems([armature])
-        bpy.ops.object.constraint_add(type='MAINTAIN_VOLUME')
-        bpy.context.object.constraints["Maintain Volume"].free_axis = 'SAMEVOL_Z'
+        bpy.context.object.constraints.new('MAINTAIN_VOLUME').free_axis = 'SAMEVOL_Z'
 
         # I can now set the scale of the bone to squash and stretch the ball!
         return(ball, armature)
 
     ## HowDoIInsertKeyFrames attempts to figure out how to insert keyframes for an object.  I'll just move a sphere around.
+    @sl.BulkSceneBuild()
     def HowDoIInsertKeyFrames(self) -> None:
         # figure out how many frames I have for 10 seconds of video.
         tk = TimeKeys()
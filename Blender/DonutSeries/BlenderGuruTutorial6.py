@@ -7,6 +7,21 @@ import pdb
 import math
 import operator
 import numpy as np
+import importlib.util
+import sys
+
+## LoadImranLibrary loads one of my helper libraries from the SceneBasics folder by file path, as blender doesn't know about it.
+github_drive = "f"
+library_path = github_drive + ":/github/technicalsmartistry/Blender/SceneBasics/"
+def LoadImranLibrary(module_name):
+    spec = importlib.util.spec_from_file_location(module_name, library_path + module_name + ".py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return(module)
+
+ml = LoadImranLibrary("ImranMeshLib")
+sl = LoadImranLibrary("ImranSceneLib")
 
 ## GenerateStrokePtFromKDTree generates a single mouse stroke from a pt
 def GenerateStrokePtFromKDTree(tree, location, is_start=False):
@@ -34,20 +49,17 @@ def GeneratePointFromPolarPoint(r, theta, Z):
     z = Z
     return((x, y, z))
 
-## GetObjectData is just a shortcut to save typing to bpy...objects
+## GetObjectData is just a shortcut to save typing to bpy...objects.  It looks the name up in the scene library's index rather than searching the scene.
 def GetObjectData(objectName):
-    target = bpy.data.scenes['Scene'].objects[objectName]
+    target = sl.GetSceneIndex('Scene').ObjectByName(objectName)
     return(target)
 
 ## CreateKDTreeFromObject makes a KD tree, which is a data structure used to find spatial differences quickly.
+## The tree comes from the shared cache, so it's only rebuilt when the mesh's vertices actually changed.
 ## Parameters:
 ##  dataItem -- the 'MESH' of the item we want to generate a KD tree from.
 def CreateKDTreeFromObject(dataItem):
-    kd = mathutils.kdtree.KDTree(len(dataItem.vertices))
-    for i, v in enumerate(dataItem.vertices):
-        kd.insert(v.co, i)
-    kd.balance()
-    return(kd)
+    return(ml.CreateKDTreeFromObject(dataItem))
 
 ## SelectVertices selects vertices by index in an 'MESH' object
 ## Parameters:
@@ -56,21 +68,13 @@ def CreateKDTreeFromObject(dataItem):
 ## Explainer:
 ##  Meshes are lists of points, loops, and faces.  Each list is a 0 indexed array.
 ##  Various functions will give us a list of vertex indices -- we can use those lists to select the vertices for further edits.
+##  The library writes the whole selection in one pass and adds it to whatever is already selected.
 def SelectVertices(dataItem=None, vertexIndices=[]):
-    ## Get the bmesh object from edit mode 
+    ml.ApplyVertexSelection(dataItem, vertexIndices, ml.SelectionOperations.Union)
+
+    ## The rest of the pipeline expects to be in edit mode after a selection
     if bpy.context.object.mode != 'EDIT':
         bpy.ops.object.editmode_toggle()
-    bm = bmesh.from_edit_mesh(dataItem)
-    
-    ## select the found target vertex
-    for targetVertexIndex in vertexIndices:
-        bm.verts.ensure_lookup_table()
-        bm.verts[targetVertexIndex].select_set(True)
-        
-    ## To update blender's UX with the selection change, we need to flush and update
-    bm.select_mode |= {'VERT'}
-    bm.select_flush_mode()
-    bmesh.update_edit_mesh(dataItem)
     pass ## Just to look pretty
 
 ## SelectNearestSetOfVertices selects a count of vertices based on an item, a point, and a target number of vertices.
@@ -98,29 +102,28 @@ def SelectNearestVertext(dataItem, positionWanted):
     SelectNearestSetOfVertices(dataItem, positionWanted, 1)
     pass
 
-## DeleteAllMeshObjects deletes all objects of type 'MESH'
+## DeleteAllMeshObjects deletes all objects of type 'MESH', and the meshes they leave behind, so re-running the script doesn't pile up orphan data.
 def DeleteAllMeshObjects():
-
-    ## We want to be in object mode and select all
-    match bpy.context.object.mode:
-        case 'EDIT':
-            bpy.ops.object.editmode_toggle()
-        case 'SCULPT':
-             bpy.ops.sculpt.sculptmode_toggle()
-
-    bpy.ops.object.select_all(action='SELECT')
-    
-    ## deselect anything that isn't a mesh
-    for selectedObject in bpy.context.selected_objects:
-        if selectedObject.type != "MESH":
-            selectedObject.select_set(False)
-    
-    ## delete all selected objects.
-    bpy.ops.object.delete(use_global=False, confirm=False)
-    pass
+    report = sl.SceneReset().DeleteAllMeshObjects()
+    ml.SharedKDTreeCache.Invalidate() ## the cached trees belong to meshes that are gone now
+    ml.SharedBVHTreeCache.Invalidate()
+    return(report)
+
+## Let's create an arrays of points, displacements, and proportions we can use for translation experimentation
+## They live out here so CheckDonutShaping.py can replay the same edits with the tutorial's original operators.
+translate_pts = [(.07, 0, 0), (.09, .11, .09), (-.04, .04, 0.015)]
+translate_displacement = [(0.005, 0, 0), (0.005, 0.005, 0.005), (-.005, -0.005, 0.005)]
+translate_proportion = [0.035, 0.07, 0.05]
+
+## Let's create an array of points, displacements, and proportions we can use for shrink_fatten
+sf_pts = [(-.07, -0.07, 0), (1, -1, 1), (1, -1, 0.015)]
+sf_displacement = [-0.001, 0.005, -0.003]
+sf_proportion = [0.04, 0.035, .024]
 
 ## MakeDonut creates a base torus and deforms it, naming the creation "Donut"
-def MakeDonut():
+## Parameters:
+##  irregularDough -- also add Andrew's bonus irregular dough.  Off by default, so the donut matches the tutorial's.
+def MakeDonut(irregularDough=False):
     ## Delete the base cube if it exists
     if bpy.data.scenes['Scene'].objects.find('Cube') >= 0:
         bpy.data.scenes['Scene'].objects.get('Cube').select_set(True)
@@ -142,10 +145,11 @@ def MakeDonut():
 
     ## create the Donut mesh if it doesn't already exist.
     if bpy.data.scenes['Scene'].objects.find('Donut') < 0:
-        bpy.ops.mesh.primitive_torus_add(align='WORLD', location=(0, 0, 0), rotation=(0, 0, 0), major_segments=40, minor_segments=16, major_radius=0.04, minor_radius=0.03, abso_major_rad=1.25, abso_minor_rad=0.75)
-        bpy.context.selected_objects[0].name = "Donut" ## I want a better name than "Torus" in the scene collection. This seems to only be Scene Collection name -- other places will keep the "Torus" name.
+        ## Built straight from arrays, so it's called "Donut" everywhere from the start -- no "Torus" mesh name left behind.
+        donut = ml.NewPrimitiveObject("Donut", ml.mp.Torus, location=(0, 0, 0), major_segments=40, minor_segments=16, major_radius=0.04, minor_radius=0.03)
 
-    ## Select the donut
+    ## Select the donut and make it active -- creating it from arrays doesn't touch the selection.
+    bpy.context.view_layer.objects.active = bpy.data.scenes['Scene'].objects.get('Donut')
     bpy.data.scenes['Scene'].objects.get('Donut').select_set(True)
 
     ## shade selected Donut smooth in object mode
@@ -162,35 +166,27 @@ def MakeDonut():
     bpy.context.object.modifiers["Subdivision"].levels = 0
     bpy.context.object.modifiers["Subdivision"].render_levels = 2
 
-    ## Get into edit mode if not already, set proportional selection on.
-    if bpy.context.object.mode == 'OBJECT':
-        bpy.ops.object.editmode_toggle()
-    bpy.context.scene.tool_settings.use_proportional_edit = True
+    ## Shape the donut straight on the vertex arrays in object mode -- no selection, edit mode or operator calls needed.
+    myData = bpy.context.object.data
 
+    ## translate experiment -- all the proportional moves go to the vertex array in one pass, instead of one translate operator call each.
+    translate_edits = [(pt, translate_displacement[index], translate_proportion[index], ml.ProportionalFalloffs.Smooth) for index, pt in enumerate(translate_pts)]
+    ml.ProportionalTranslateMesh(myData, translate_edits)
 
-    ## Let's create an arrays of points, displacements, and proportions we can use for translation experimentation
-    translate_pts = [(.07, 0, 0), (.09, .11, .09), (-.04, .04, 0.015)]
-    translate_displacement = [(0.005, 0, 0), (0.005, 0.005, 0.005), (-.005, -0.005, 0.005)]
-    translate_proportion = [0.035, 0.07, 0.05]
 
-    ## translate experiment
-    myData = bpy.context.object.data
-    for index, pt in enumerate(translate_pts):
-        bpy.ops.mesh.select_all(action='DESELECT')
-        SelectNearestVertext(myData, pt)
-        bpy.ops.transform.translate(value=translate_displacement[index], use_proportional_edit=True, proportional_edit_falloff='SMOOTH', proportional_size=translate_proportion[index])
-
-
-    ## Let's create an array of points, displacements, and proportions we can use for shrink_fatten
-    sf_pts = [(-.07, -0.07, 0), (1, -1, 1), (1, -1, 0.015)]
-    sf_displacement = [-0.001, 0.005, -0.003]
-    sf_proportion = [0.04, 0.035, .024]
-
-    ## run the shrink_fatten transform
-    for index, pt in enumerate(sf_pts):
-        bpy.ops.mesh.select_all(action='DESELECT')
-        SelectNearestVertext(myData, pt)
-        bpy.ops.transform.shrink_fatten(value=sf_displacement[index], use_even_offset=False, mirror=True, use_proportional_edit=True, proportional_edit_falloff='SMOOTH', proportional_size=sf_proportion[index], use_proportional_connected=False, use_proportional_projected=False)
+    ## run the shrink_fatten edits.  The last two overlap, so apply them in order like the operator did.
+    ## CheckDonutShaping.py compares the shaped donut with the original operator version.
+    sf_edits = [(pt, sf_displacement[index], sf_proportion[index], ml.ProportionalFalloffs.Smooth) for index, pt in enumerate(sf_pts)]
+    ml.ShrinkFattenMesh(myData, sf_edits, sequential=True)
+
+    ## Andrew's bonus -- irregular dough.  Seeded noise along the normals instead of select_random plus shrink_fatten, so it's the same every run.
+    if irregularDough:
+        ml.NoiseDisplaceMesh(myData, amplitude=0.0008, frequency=60, octaves=3, seed=1)
+
+    ## Get into edit mode if not already, set proportional selection on for the rest of the pipeline.
+    if bpy.context.object.mode == 'OBJECT':
+        bpy.ops.object.editmode_toggle()
+    bpy.context.scene.tool_settings.use_proportional_edit = True
     return(myData) ## end MakeDonut
 
 def MakeIcing():
@@ -229,7 +225,7 @@ def MakeIcing():
     return(myData)        
 
 ## Add detail to the icing.
-def DetailIcing(donut_tree, icing_tree):
+def DetailIcing(donut_object, icing_object):
     ## deselect everything and select only the icing, make the icing the active object
     if bpy.context.mode == 'EDIT_MESH':
         bpy.ops.mesh.select_all(action='DESELECT') ## note, we have a different object to call select_all with -- the mesh
@@ -252,11 +248,12 @@ def DetailIcing(donut_tree, icing_tree):
     
     ## Andrew now has us pull in reference -- we'll skip that.
     
-    ## Andrew now applies the subsurf modifier -- let's do that.
-    bpy.ops.object.modifier_move_to_index(modifier="Subdivision", index=0)
-    bpy.context.object.modifiers["Subdivision"].levels = 1
+    ## Andrew now applies the subsurf modifier -- we subdivide the mesh arrays directly instead, which is the same as applying it first in the stack.
+    ## Drop the subsurf the icing copied from the donut first, so the new one below gets the "Subdivision" name.
     bpy.ops.object.editmode_toggle() ## back to object mode
-    bpy.ops.object.modifier_apply(modifier="Subdivision", report=True) ## applies viewport amount
+    if icing.modifiers.find("Subdivision") >= 0:
+        icing.modifiers.remove(icing.modifiers["Subdivision"])
+    ml.SubdivideMesh(icing_object, ml.SubdivisionMethods.CatmullClark, 1)
     
     ## add another subsurf modifier after the solidify modifier
     bpy.ops.object.modifier_add(type='SUBSURF')
@@ -280,10 +277,10 @@ def DetailIcing(donut_tree, icing_tree):
         bpy.ops.mesh.select_all(action='DESELECT') ## Don't forget this, or the points stay selected, and displacement becomes cumalative!
         SelectNearestVertext(icing_object, pt1) ## select the icing vertex
         
-        ## find the selected point
-        selectedPt = icing_tree.find(pt1)
+        ## find the selected point.  The icing moves every pass, so ask the cache for a tree each time -- it only rebuilds when the mesh changed.
+        selectedPt = CreateKDTreeFromObject(icing_object).find(pt1)
         tp1 = pt1 - np.asarray((0, 0, -0.01)) ## What's a point near pt1, but 0.05 down.
-        fi = donut_tree.find(tp1) ## What's the nearest vertex on the donut near that displaced point.
+        fi = CreateKDTreeFromObject(donut_object).find(tp1) ## What's the nearest vertex on the donut near that displaced point.
         dp1 = np.asarray(selectedPt[0]) - np.asarray(fi[0]) ## What's the displacement needed to move from the icing point to the donut point?
         
         ## let's try displacing it down and see what happens.
@@ -291,12 +288,12 @@ def DetailIcing(donut_tree, icing_tree):
 
         #bpy.ops.transform.translate(value=dp1, orient_axis_ortho='X', orient_type='GLOBAL', orient_matrix=((1, 0, 0), (0, 1, 0), (0, 0, 1)), orient_matrix_type='GLOBAL', mirror=True, use_proportional_edit=True, proportional_edit_falloff='SMOOTH', proportional_size=0.0355841, use_proportional_connected=False, use_proportional_projected=False)
     
-    ## let's create the little drippings.
+    ## let's create the little drippings.  Generate every drip point first, then find all their vertices in one batched query.
     divions = 7
     bpy.ops.mesh.select_all(action='DESELECT') ## Don't forget this, or the points stay selected, and displacement becomes cumalative!
-    for thetaIndex in range(divions):
-        pt1 = np.asarray(GeneratePointFromPolarPoint(.07, thetaIndex*(360/divions), -0.01)) ## 7cm from center, 22 degrees of rotation around 0,0, 1 cm down
-        SelectNearestSetOfVertices(icing_object, pt1,3 ) ## select vertices for extrusion
+    drip_pts = [GeneratePointFromPolarPoint(.07, thetaIndex*(360/divions), -0.01) for thetaIndex in range(divions)] ## 7cm from center, 1 cm down
+    drip_indices, drip_distances = ml.FindNearestVertices(icing_object, drip_pts, 3)
+    SelectVertices(icing_object, drip_indices.ravel().tolist()) ## select vertices for extrusion
     bpy.ops.mesh.extrude_region_move(MESH_OT_extrude_region={"use_normal_flip":False, "use_dissolve_ortho_edges":False, "mirror":False}, TRANSFORM_OT_translate={"value":(-0.00133574, -9.8661e-05, -0.0146044), "orient_axis_ortho":'X', "orient_type":'GLOBAL', "orient_matrix":((1, 0, 0), (0, 1, 0), (0, 0, 1)), "orient_matrix_type":'GLOBAL', "constraint_axis":(False, False, False), "mirror":False, "use_proportional_edit":False, "proportional_edit_falloff":'SMOOTH', "proportional_size":1, "use_proportional_connected":False, "use_proportional_projected":False, "snap":False, "snap_target":'CLOSEST', "snap_point":(0, 0, 0), "snap_align":False, "snap_normal":(0, 0, 0), "gpencil_strokes":False, "cursor_transform":False, "texture_space":False, "remove_on_cancel":False, "view2d_edge_pan":False, "release_confirm":False, "use_accurate":False, "use_automerge_and_split":False})
     
     ## exit edit mode, select nothing, return
@@ -317,25 +314,22 @@ def DetailDonut(donut_object):
     bpy.context.view_layer.objects.active = donut
     donut.select_set(True)
 
-    ## add and apply a subdiv surf modifier of 1 viewport level.
-    bpy.ops.object.modifier_add(type='SUBSURF')
-    bpy.context.object.modifiers["Subdivision"].levels = 1
-    bpy.ops.object.modifier_move_to_index(modifier="Subdivision", index=1)
-    bpy.ops.object.modifier_apply(modifier="Subdivision", report=True) ## This invalidates the donut kd_tree, as I added vertices.  Ooops.
+    ## subdivide the donut once, like adding and applying a subdiv surf modifier of 1 viewport level, but without touching the modifier stack.
+    ml.SubdivideMesh(donut.data, ml.SubdivisionMethods.CatmullClark, 1) ## This adds vertices -- the KD tree cache notices the new vertex count and rebuilds on the next lookup.
 
     ## select the ring around the middle.
     SelectNearestSetOfVertices(bpy.context.object.data, (1, 0, 0), 2)
     bpy.ops.mesh.loop_multi_select(ring=False)
 
     ## shrink the center
-    bpy.ops.transform.shrink_fatten(value=-0.005, use_even_offset=False, mirror=True, use_proportional_edit=True, proportional_edit_falloff='SMOOTH', proportional_size=.01, use_proportional_connected=False, use_proportional_projected=False)
+    ml.ShrinkFattenSelection(bpy.context.object.data, -0.005, radius=.01, falloff=ml.ProportionalFalloffs.Smooth)
     
     ## fatten the bottom a bit
     bpy.ops.mesh.select_all(action='DESELECT')
     targetPt = GeneratePointFromPolarPoint(.07, 1, -0.03)
     SelectNearestSetOfVertices(bpy.context.object.data, targetPt, 2)
     bpy.ops.mesh.loop_multi_select(ring=False)
-    bpy.ops.transform.shrink_fatten(value=0.0033, use_even_offset=False, mirror=True, use_proportional_edit=True, proportional_edit_falloff='SMOOTH', proportional_size=.02, use_proportional_connected=False, use_proportional_projected=False)
+    ml.ShrinkFattenSelection(bpy.context.object.data, 0.0033, radius=.02, falloff=ml.ProportionalFalloffs.Smooth)
     
     ## deselect and exit edit mode
     bpy.ops.mesh.select_all(action='DESELECT')
@@ -344,55 +338,47 @@ def DetailDonut(donut_object):
     pass
 
 def EditDonutAndIciningMeshes(donut_object, icing_object):
-    ## get the KD tree for the donut
-    donut_tree = CreateKDTreeFromObject(donut_object)
-    icing_tree = CreateKDTreeFromObject(icing_object)
-
-    ## add some more detail to the icing
-    DetailIcing(donut_tree, icing_tree)
+    ## add some more detail to the icing.  KD trees come from the shared cache as needed.
+    DetailIcing(donut_object, icing_object)
 
     ## Make the center ring of the donut a little smaller
     DetailDonut(donut_object)
 
-    ## put the shrinkwrap modifier on the icing.
+    ## conform the icing onto the donut, like a shrinkwrap modifier applied first in the stack -- but straight on the vertex arrays.
     icing = GetObjectData('Icing')
     bpy.context.view_layer.objects.active = icing
     icing.select_set(True)
-    bpy.ops.object.modifier_add(type='SHRINKWRAP')
-    bpy.context.object.modifiers["Shrinkwrap"].target = bpy.data.objects["Donut"]
-    bpy.ops.object.modifier_move_to_index(modifier="Shrinkwrap", index=0)
-    bpy.ops.object.modifier_apply(modifier="Shrinkwrap", report=True)
+    ml.ProjectMeshOntoMesh(icing, GetObjectData('Donut'), ml.ProjectionModes.Nearest)
 
     ## deselect all
     bpy.ops.object.select_all(action='DESELECT')
 
         
-## Make the base donut
-DeleteAllMeshObjects()
-
-## generate the base objects
-donut_object = MakeDonut()
-icing_object = MakeIcing()
-
-## add mesh details to both donut and icing per Andrew's video 4.
-EditDonutAndIciningMeshes(donut_object, icing_object)
-
-## Apply all modifiers
-icing = GetObjectData('Icing')
-bpy.context.view_layer.objects.active = icing
-icing.select_set(True)
-bpy.ops.object.modifier_apply(modifier="Solidify", report=True)
-bpy.ops.object.modifier_apply(modifier="Subdivision", report=True)
-
-## Switch to a sculpting tool and drag it across the icing?
-bpy.ops.object.mode_set(mode='SCULPT')
-bpy.ops.wm.tool_set_by_id(name="builtin_brush.Draw")
-
-## define a stroke to sculpt
-stroke = [{ "name": "defaultStroke",
-                            "mouse" : (0.0, 0.0),
-                            "pen_flip" : False,
-                            "is_start": True,
-                            "location": (0, 0, 0),
-                            "pressure": 1.0,
-                            "time": 1.0}]
\ No newline at end of file
+## The tutorial itself runs when this script is run, but not when CheckDonutShaping.py loads it for MakeDonut.
+if __name__ == "__main__":
+    ## Make the base donut
+    DeleteAllMeshObjects()
+
+    ## generate the base objects -- set irregular_dough to True for Andrew's bonus lumpy dough.
+    irregular_dough = False
+    donut_object = MakeDonut(irregularDough=irregular_dough)
+    icing_object = MakeIcing()
+
+    ## add mesh details to both donut and icing per Andrew's video 4.
+    EditDonutAndIciningMeshes(donut_object, icing_object)
+
+    ## Apply all modifiers
+    icing = GetObjectData('Icing')
+    bpy.context.view_layer.objects.active = icing
+    icing.select_set(True)
+    bpy.ops.object.modifier_apply(modifier="Solidify", report=True)
+    bpy.ops.object.modifier_apply(modifier="Subdivision", report=True)
+
+    ## Sculpt the icing from code rather than the viewport.  Per tutorial 5: generate a set of points as a "brush" and push/pull the vertices near them.
+    ## A wavy ring of dabs around the top of the icing, drawn with the inflate brush, then smoothed out a little.
+    sculpt_pts = [GeneratePointFromPolarPoint(.06 + 0.005 * math.sin(math.radians(theta * 6)), theta, 0.03) for theta in np.linspace(0, 360, 720)]
+    stroke = ml.SculptStroke(sculpt_pts, pressure=1.0, radius=0.006)
+    sculptor = ml.SculptEngine(icing.data)
+    sculptor.ApplyStroke(stroke, ml.SculptBrushes.Inflate, strength=0.05, snapToSurface=True)
+    sculptor.ApplyStroke(stroke, ml.SculptBrushes.Smooth, strength=0.5, snapToSurface=True)
+    sculptor.Commit()
@@ -0,0 +1,98 @@
+## This script checks that the donut BlenderGuruTutorial6's MakeDonut shapes on the vertex arrays matches the one the tutorial's original
+## operator calls made.  The operator version is a mesh snapshot stored next to this script; every run calls the real MakeDonut and
+## compares vertex positions with it.  Without a snapshot the check fails rather than passing with nothing to compare.
+## Run it in an empty scene -- MakeDonut replaces any "Donut" -- from blender's scripting tab, or headless with: blender -b --python CheckDonutShaping.py
+## Recording the reference needs blender's window, as the transform operators need a 3D viewport: set record_reference to True,
+## run the script from the scripting tab, and commit the DonutOperatorReference.imsnap it writes.  Record it again after a blender upgrade.
+
+import bpy
+import bmesh
+import numpy as np
+import importlib.util
+import os
+import sys
+
+## LoadDonutScript loads one of the donut tutorial scripts from this folder by file path, so its functions can be called without running it.
+github_drive = "f"
+donut_path = github_drive + ":/github/technicalsmartistry/Blender/DonutSeries/"
+def LoadDonutScript(module_name):
+    spec = importlib.util.spec_from_file_location(module_name, donut_path + module_name + ".py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return(module)
+
+tutorial = LoadDonutScript("BlenderGuruTutorial6")
+ml = tutorial.ml
+
+## The reference donut, shaped by the operators, next to this script.
+reference_path = donut_path + "DonutOperatorReference.imsnap"
+
+## record_reference writes the reference from the operators before checking.  It needs the window -- see the top of this script.
+record_reference = False
+
+## tolerance is how far apart, in meters, matching vertices may be -- float32 rounding on a donut this size is far below it.
+tolerance = 1e-6
+
+## OperatorDonut shapes a torus the way the tutorial first did: select the nearest vertex in edit mode, then one operator call per edit.
+## It uses the tutorial's own edit lists, so the reference can't drift from what MakeDonut does.
+def OperatorDonut():
+    bpy.ops.mesh.primitive_torus_add(align='WORLD', location=(0, 0, 0), rotation=(0, 0, 0), major_segments=40, minor_segments=16, major_radius=0.04, minor_radius=0.03, abso_major_rad=1.25, abso_minor_rad=0.75)
+    donut = bpy.context.object
+    kd = ml.BuildKDTree(ml.ReadVertexCoordinates(donut.data)) ## the mesh doesn't change until edit mode ends, like the tutorial's KD tree
+    bpy.ops.object.editmode_toggle()
+
+    def SelectNearest(pt):
+        bpy.ops.mesh.select_all(action='DESELECT')
+        bm = bmesh.from_edit_mesh(donut.data)
+        bm.verts.ensure_lookup_table()
+        bm.verts[kd.find(pt)[1]].select_set(True)
+        bm.select_flush_mode()
+        bmesh.update_edit_mesh(donut.data)
+
+    for index, pt in enumerate(tutorial.translate_pts):
+        SelectNearest(pt)
+        bpy.ops.transform.translate(value=tutorial.translate_displacement[index], use_proportional_edit=True, proportional_edit_falloff='SMOOTH', proportional_size=tutorial.translate_proportion[index])
+    for index, pt in enumerate(tutorial.sf_pts):
+        SelectNearest(pt)
+        bpy.ops.transform.shrink_fatten(value=tutorial.sf_displacement[index], use_even_offset=False, mirror=True, use_proportional_edit=True, proportional_edit_falloff='SMOOTH', proportional_size=tutorial.sf_proportion[index], use_proportional_connected=False, use_proportional_projected=False)
+    bpy.ops.object.editmode_toggle()
+    return(donut)
+
+## TutorialDonut shapes a donut with the tutorial's MakeDonut, and brings it back to object mode.
+def TutorialDonut():
+    tutorial.MakeDonut()
+    if bpy.context.object.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+    return(bpy.context.object)
+
+## RemoveDonut deletes a donut this script made, and its mesh.
+def RemoveDonut(donut):
+    mesh = donut.data
+    bpy.data.objects.remove(donut)
+    bpy.data.meshes.remove(mesh)
+    ml.SharedKDTreeCache.Invalidate()
+    pass
+
+## CheckDonutShaping compares the tutorial's donut with the operator reference.
+## Gives back {'vertices', 'maxDifference', 'recorded'}, and raises AssertionError if any vertex is further off than tolerance,
+## or FileNotFoundError if there's no reference to compare with.
+def CheckDonutShaping():
+    if record_reference:
+        donut = OperatorDonut()
+        ml.SaveMeshSnapshot(donut.data, reference_path, {'source': "tutorial operators"})
+        RemoveDonut(donut)
+    if not os.path.exists(reference_path):
+        raise FileNotFoundError(reference_path + " is missing -- record it from blender's scripting tab with record_reference = True")
+    reference = ml.ms.LoadMeshSnapshot(reference_path, mmap=False)
+
+    donut = TutorialDonut()
+    coords = ml.ReadVertexCoordinates(donut.data)
+    RemoveDonut(donut)
+    assert coords.shape == reference['co'].shape, "the tutorial donut has %d vertices, the reference %d" % (len(coords), len(reference['co']))
+    maxDifference = float(np.abs(coords.astype(np.float64) - reference['co']).max())
+    assert maxDifference <= tolerance, "the tutorial donut is up to %g m away from the operator donut" % maxDifference
+    return({'vertices': len(coords), 'maxDifference': maxDifference, 'recorded': record_reference})
+
+
+CheckDonutShaping()
@@ -0,0 +1,110 @@
+## DonutFactory makes thousands of donut variants by fanning parameter sets out to headless blender workers, one per core.
+## This script runs in plain python, not blender.  Each worker is a `blender -b` process running DonutFactoryWorker.py on a shard of variants.
+## Usage:
+##  python DonutFactory.py --count 1000 --out C:\temp\Donuts --blender "C:\Program Files\Blender Foundation\Blender 4.2\blender.exe"
+
+import argparse
+import concurrent.futures
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DonutFactoryWorker.py")
+
+## MakeVariants generates count random, but repeatable, donut parameter sets.
+## Parameters:
+##  count -- how many donuts we want.
+##  seed -- the seed for the whole batch.  Every variant also gets its own seed, so any one donut can be rebuilt alone.
+def MakeVariants(count, seed=0):
+    rng = random.Random(seed)
+    variants = []
+    for index in range(count):
+        variants.append({
+            'id': "donut_%05d" % index,
+            'seed': rng.randrange(2**31),
+            'majorRadius': rng.uniform(0.035, 0.05),
+            'minorRadius': rng.uniform(0.022, 0.032),
+            'majorSegments': rng.choice([32, 40, 48]),
+            'minorSegments': rng.choice([12, 16, 20]),
+            'lumpCount': rng.randint(2, 8),
+            'lumpScale': rng.uniform(0.002, 0.006),
+            'noiseAmplitude': rng.uniform(0.0, 0.0015),
+            'noiseFrequency': rng.uniform(40.0, 90.0),
+            'icingCoverage': rng.uniform(0.45, 0.6),
+            'dripCount': rng.randint(0, 12),
+            'dripLength': rng.uniform(0.004, 0.015),
+        })
+    return(variants)
+
+## RunShard runs one headless blender process over a shard file of variants.
+## Gives back (records, error): the metadata records, and None -- or no records and why the shard failed.
+## Results left from an earlier run are removed first, and --python-exit-code makes a worker that raises exit non-zero,
+## so a crashed shard can't hand back stale or partial records as if they were new.
+def RunShard(blender, shardPath, outputDirectory):
+    resultPath = shardPath.replace(".json", ".results.jsonl")
+    if os.path.exists(resultPath):
+        os.remove(resultPath)
+    command = [blender, "-b", "--factory-startup", "-t", "1", "--python-exit-code", "1", "--python", worker_script, "--", shardPath, outputDirectory, resultPath]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0 or not os.path.exists(resultPath):
+        return([], "blender worker exited with code %d: %s" % (completed.returncode, completed.stderr[-2000:].strip()))
+    with open(resultPath) as results:
+        return([json.loads(line) for line in results if line.strip()], None)
+
+## RunBatch shards the variants and keeps one blender worker per core busy until they're all built.
+## Shards are small, so a slow donut doesn't leave the other cores idle at the end, but big enough to pay for blender's start-up.
+## Every record is written to manifest.jsonl in the output directory.
+## Gives back (records, failures): the records, and a (shard file, message) pair for every shard whose blender failed.
+## Parameters:
+##  variants -- a list of parameter dictionaries, like MakeVariants gives.
+##  outputDirectory -- where the .blend, .glb and metadata files go.
+##  blender -- the blender executable.
+##  workers -- how many blender processes to run at once.  Defaults to one per core.
+##  shardSize -- how many variants each blender process builds before exiting.
+def RunBatch(variants, outputDirectory, blender="blender", workers=None, shardSize=25):
+    workers = workers or os.cpu_count()
+    shardDirectory = os.path.join(outputDirectory, "shards")
+    os.makedirs(shardDirectory, exist_ok=True)
+
+    shardPaths = []
+    for start in range(0, len(variants), shardSize):
+        shardPath = os.path.join(shardDirectory, "shard_%05d.json" % (start // shardSize))
+        with open(shardPath, "w") as shard:
+            json.dump(variants[start:start + shardSize], shard)
+        shardPaths.append(shardPath)
+
+    records = []
+    failures = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(RunShard, blender, shardPath, outputDirectory): shardPath for shardPath in shardPaths}
+        for future in concurrent.futures.as_completed(futures):
+            shardRecords, error = future.result()
+            records.extend(shardRecords)
+            if error is not None:
+                failures.append((futures[future], error))
+
+    records.sort(key=lambda record: record['id'])
+    with open(os.path.join(outputDirectory, "manifest.jsonl"), "w") as manifest:
+        for record in records:
+            manifest.write(json.dumps(record) + "\n")
+    return(records, sorted(failures))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build donut variants in parallel headless blender workers.")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--blender", default="blender")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--shard-size", type=int, default=25)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    records, failures = RunBatch(MakeVariants(args.count, args.seed), args.out, args.blender, args.workers, args.shard_size)
+    elapsed = time.perf_counter() - started
+    for shardPath, error in failures:
+        print("shard failed:", shardPath, error, file=sys.stderr)
+    print(f"built {len(records)} of {args.count} donuts in {elapsed:.1f}s ({len(records) / max(elapsed, 1e-9):.2f} donuts/s)")
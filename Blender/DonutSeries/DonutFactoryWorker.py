@@ -0,0 +1,133 @@
+## DonutFactoryWorker builds a shard of donut variants inside one headless blender, for DonutFactory.py.
+## It follows the tutorial pipeline -- donut, icing, drips -- but with every step done on vertex arrays, so it needs no viewport, selection or edit mode.
+## Usage (DonutFactory.py does this for you):
+##  blender -b --factory-startup --python DonutFactoryWorker.py -- shard.json outputDirectory results.jsonl
+
+import bpy
+import numpy as np
+import importlib.util
+import json
+import math
+import os
+import sys
+import time
+
+## LoadImranLibrary loads one of my helper libraries from the SceneBasics folder next to this one.
+library_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "SceneBasics", "")
+def LoadImranLibrary(module_name):
+    spec = importlib.util.spec_from_file_location(module_name, library_path + module_name + ".py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return(module)
+
+ml = LoadImranLibrary("ImranMeshLib")
+
+## ClearScene removes every object and mesh, so each variant starts from nothing.
+def ClearScene():
+    bpy.data.batch_remove(list(bpy.data.objects) + list(bpy.data.meshes))
+    ml.SharedKDTreeCache.Invalidate()
+    ml.SharedBVHTreeCache.Invalidate()
+    pass
+
+## MakeDonut creates and lumps up the torus for one variant.
+def MakeDonut(variant, rng):
+    donut = ml.NewPrimitiveObject("Donut", ml.mp.Torus, collection=bpy.context.scene.collection, smooth=True, major_segments=variant['majorSegments'], minor_segments=variant['minorSegments'], major_radius=variant['majorRadius'], minor_radius=variant['minorRadius'])
+    mesh = donut.data
+
+    ## Lumps are proportional moves centered on random vertices, like the hand-placed ones in the tutorial.
+    coords = ml.ReadVertexCoordinates(mesh)
+    centers = coords[rng.choice(len(coords), variant['lumpCount'], replace=False)]
+    displacements = rng.normal(0.0, variant['lumpScale'], (variant['lumpCount'], 3))
+    radii = rng.uniform(0.8, 2.0, variant['lumpCount']) * variant['minorRadius']
+    edits = [(centers[i], displacements[i], radii[i], ml.ProportionalFalloffs.Smooth) for i in range(variant['lumpCount'])]
+    ml.ProportionalTranslateMesh(mesh, edits, snapToVertices=False)
+
+    ## Irregular dough from seeded noise along the normals.
+    ml.NoiseDisplaceMesh(mesh, amplitude=variant['noiseAmplitude'], frequency=variant['noiseFrequency'], octaves=3, seed=variant['seed'])
+
+    ## Render-only subdivision, like Andrew's settings.
+    subdivision = donut.modifiers.new("Subdivision", 'SUBSURF')
+    subdivision.levels = 0
+    subdivision.render_levels = 2
+    return(donut)
+
+## MakeIcing copies the top of the donut into its own object, puffs it out and adds drips around the edge.
+def MakeIcing(donut, variant, rng):
+    mesh = donut.data
+    coords = ml.ReadVertexCoordinates(mesh).astype(np.float64)
+    faces = ml.ReadFaceArrays(mesh)
+
+    ## The icing is the faces whose vertices are all among the ones nearest a point far above the donut.
+    coverage = int(len(coords) * variant['icingCoverage'])
+    indices, distances = ml.FindNearestVertices(mesh, [(0, 0, 1)], coverage)
+    topVertices = ml.SelectionMask(len(coords), indices[0])
+    faceMask = np.logical_and.reduceat(topVertices[faces[2]], faces[0])
+    icingCoords, loopStarts, loopTotals, loopVertices, vertexMap = ml.ExtractFaces(coords, *faces, faceMask)
+
+    ## Lift the icing off the donut along the donut's normals.
+    normals = ml.VertexNormals(coords, *faces)[vertexMap]
+    icingCoords = ml.ShrinkFatten(icingCoords, normals, 0.002)
+
+    icingMesh = ml.NewMeshFromArrays("Icing", icingCoords, loopStarts, loopTotals, loopVertices, smooth=True)
+    icing = bpy.data.objects.new("Icing", icingMesh)
+    bpy.context.scene.collection.objects.link(icing)
+
+    ## Drips are downward proportional moves around the outer edge of the icing.
+    if variant['dripCount'] > 0:
+        thetas = rng.uniform(0.0, 2.0 * math.pi, variant['dripCount'])
+        ringRadius = variant['majorRadius'] + variant['minorRadius']
+        dripPts = np.stack((ringRadius * np.cos(thetas), ringRadius * np.sin(thetas), np.full(len(thetas), -0.01)), axis=1)
+        lengths = rng.uniform(0.5, 1.0, variant['dripCount']) * variant['dripLength']
+        edits = [(dripPts[i], (0, 0, -lengths[i]), variant['minorRadius'] * 0.3, ml.ProportionalFalloffs.Smooth) for i in range(variant['dripCount'])]
+        ml.ProportionalTranslateMesh(icingMesh, edits)
+
+    solidify = icing.modifiers.new("Solidify", 'SOLIDIFY')
+    solidify.offset = 1
+    solidify.thickness = 0.0025
+    return(icing)
+
+## BuildVariant builds, saves and describes one donut.
+def BuildVariant(variant, outputDirectory):
+    started = time.perf_counter()
+    ClearScene()
+    rng = np.random.default_rng(variant['seed'])
+    donut = MakeDonut(variant, rng)
+    icing = MakeIcing(donut, variant, rng)
+
+    blendPath = os.path.join(outputDirectory, variant['id'] + ".blend")
+    glbPath = os.path.join(outputDirectory, variant['id'] + ".glb")
+    bpy.ops.wm.save_as_mainfile(filepath=blendPath, copy=True, compress=True)
+    bpy.ops.export_scene.gltf(filepath=glbPath, export_format='GLB', export_apply=True)
+
+    ## Snapshots of the raw meshes, so analysis can memory-map them later without blender.
+    donutSnapshot = ml.SaveMeshSnapshot(donut.data, os.path.join(outputDirectory, variant['id'] + ".donut.imsnap"), {'object': donut.name})
+    icingSnapshot = ml.SaveMeshSnapshot(icing.data, os.path.join(outputDirectory, variant['id'] + ".icing.imsnap"), {'object': icing.name})
+
+    coords = ml.ReadVertexCoordinates(donut.data)
+    record = dict(variant)
+    record.update({
+        'blend': blendPath,
+        'glb': glbPath,
+        'snapshots': [donutSnapshot, icingSnapshot],
+        'donutVertices': len(donut.data.vertices),
+        'icingVertices': len(icing.data.vertices),
+        'boundsMin': coords.min(axis=0).tolist(),
+        'boundsMax': coords.max(axis=0).tolist(),
+        'seconds': time.perf_counter() - started,
+        'worker': os.getpid(),
+    })
+    with open(os.path.join(outputDirectory, variant['id'] + ".json"), "w") as metadata:
+        json.dump(record, metadata, indent=1)
+    return(record)
+
+
+## blender passes our own arguments after "--"
+shardPath, outputDirectory, resultPath = sys.argv[sys.argv.index("--") + 1:][:3]
+os.makedirs(outputDirectory, exist_ok=True)
+bpy.ops.wm.read_factory_settings(use_empty=True)
+with open(shardPath) as shard:
+    variants = json.load(shard)
+with open(resultPath, "w") as results:
+    for variant in variants:
+        results.write(json.dumps(BuildVariant(variant, outputDirectory)) + "\n")
@@ -0,0 +1,105 @@
+## This script times my mesh library against the old one-vertex-at-a-time way of doing things.
+## Run it from blender's scripting tab, or headless with: blender -b --python BenchmarkMeshLib.py
+
+import bpy
+import mathutils
+import numpy as np
+import importlib.util
+import sys
+import time
+
+## LoadImranLibrary loads one of my helper libraries from the SceneBasics folder by file path, as blender doesn't know about it.
+github_drive = "f"
+library_path = github_drive + ":/github/technicalsmartistry/Blender/SceneBasics/"
+def LoadImranLibrary(module_name):
+    spec = importlib.util.spec_from_file_location(module_name, library_path + module_name + ".py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return(module)
+
+ml = LoadImranLibrary("ImranMeshLib")
+
+## TimeIt runs a function a few times and gives back the best wall clock time in seconds.
+def TimeIt(function, repeats=3):
+    best = None
+    for i in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return(best)
+
+## MakePointCloudMesh makes a mesh with only vertices in it -- enough to benchmark vertex reads and KD trees.
+def MakePointCloudMesh(vertexCount, name="BenchmarkPoints"):
+    rng = np.random.default_rng(1)
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(vertexCount)
+    mesh.vertices.foreach_set("co", rng.random(vertexCount * 3, dtype=np.float32))
+    mesh.update()
+    return(mesh)
+
+## OldKDTreeFromObject is the per-vertex loop the scripts used before the library existed.
+def OldKDTreeFromObject(dataItem):
+    kd = mathutils.kdtree.KDTree(len(dataItem.vertices))
+    for i, v in enumerate(dataItem.vertices):
+        kd.insert(v.co, i)
+    kd.balance()
+    return(kd)
+
+## OldReadCoordinates reads every vertex position one python object at a time.
+def OldReadCoordinates(dataItem):
+    return([v.co[:] for v in dataItem.vertices])
+
+## BenchmarkVertexExtraction compares per-vertex reads and tree builds with the foreach_get path at 10k, 100k and 1M vertices.
+def BenchmarkVertexExtraction(sizes=(10_000, 100_000, 1_000_000)):
+    print("vertices | read loop | read foreach_get | speedup | tree loop | tree from array | speedup")
+    for size in sizes:
+        mesh = MakePointCloudMesh(size)
+        oldRead = TimeIt(lambda: OldReadCoordinates(mesh))
+        newRead = TimeIt(lambda: ml.ReadMeshArrays(mesh))
+        oldTree = TimeIt(lambda: OldKDTreeFromObject(mesh), repeats=1)
+        newTree = TimeIt(lambda: ml.BuildKDTree(ml.ReadVertexCoordinates(mesh)), repeats=1)
+        print(f"{size:>8} | {oldRead:9.4f} | {newRead:16.4f} | {oldRead / newRead:6.1f}x | {oldTree:9.4f} | {newTree:15.4f} | {oldTree / newTree:6.1f}x")
+        bpy.data.meshes.remove(mesh)
+    pass
+
+## ModifierSubdivide is the old way: add a subsurf modifier to an object and apply it.
+def ModifierSubdivide(worldObject, levels):
+    bpy.context.view_layer.objects.active = worldObject
+    modifier = worldObject.modifiers.new("Subdivision", 'SUBSURF')
+    modifier.levels = levels
+    bpy.ops.object.modifier_apply(modifier=modifier.name)
+    pass
+
+## BenchmarkSubdivision compares adding and applying a subsurf modifier with subdividing the arrays directly, at levels 1 to 3.
+## Each run starts from a fresh torus, so both sides subdivide the same mesh.
+def BenchmarkSubdivision(levels=(1, 2, 3), major_segments=96, minor_segments=24):
+    print("levels | faces after | modifier apply | arrays | speedup")
+    for level in levels:
+        def Fresh():
+            return(ml.NewPrimitiveObject("BenchmarkTorus", ml.mp.Torus, major_segments=major_segments, minor_segments=minor_segments))
+        def Remove(worldObject):
+            mesh = worldObject.data
+            bpy.data.objects.remove(worldObject)
+            bpy.data.meshes.remove(mesh)
+
+        worldObject = Fresh()
+        start = time.perf_counter()
+        ModifierSubdivide(worldObject, level)
+        oldTime = time.perf_counter() - start
+        faces = len(worldObject.data.polygons)
+        Remove(worldObject)
+
+        worldObject = Fresh()
+        start = time.perf_counter()
+        ml.SubdivideMesh(worldObject.data, ml.SubdivisionMethods.CatmullClark, level)
+        newTime = time.perf_counter() - start
+        Remove(worldObject)
+        print(f"{level:>6} | {faces:>11} | {oldTime:14.4f} | {newTime:6.4f} | {oldTime / newTime:6.1f}x")
+    pass
+
+
+BenchmarkVertexExtraction()
+BenchmarkSubdivision()
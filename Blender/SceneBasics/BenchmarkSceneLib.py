@@ -0,0 +1,95 @@
+## This script times building a scene one operator at a time against building it through the data API inside my scene library's bulk build.
+## Each bpy.ops call from python evaluates the view layer before and after it runs, so the operator build pays for the whole scene on every call,
+## while the data API build is evaluated once, when the bulk build ends.
+## Run it from blender's scripting tab, or headless with: blender -b --python BenchmarkSceneLib.py
+
+import bpy
+import importlib.util
+import sys
+import time
+
+## LoadImranLibrary loads one of my helper libraries from the SceneBasics folder by file path, as blender doesn't know about it.
+github_drive = "f"
+library_path = github_drive + ":/github/technicalsmartistry/Blender/SceneBasics/"
+def LoadImranLibrary(module_name):
+    spec = importlib.util.spec_from_file_location(module_name, library_path + module_name + ".py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return(module)
+
+sl = LoadImranLibrary("ImranSceneLib")
+
+## ClearBenchmarkObjects deletes everything the benchmark made, so each run starts from the same scene.
+def ClearBenchmarkObjects():
+    doomed = [item for item in bpy.data.objects if item.name.startswith("Benchmark")]
+    bpy.data.batch_remove(doomed)
+    bpy.data.orphans_purge(do_recursive=True)
+    pass
+
+## BuildWithOperators builds the kind of scene the helper classes do: add a cube and a bone per item, select, toggle modes and parent.
+def BuildWithOperators(objectCount):
+    for i in range(objectCount):
+        bpy.ops.object.select_all(action='DESELECT')
+        bpy.ops.mesh.primitive_cube_add(size=0.5, location=(i % 20, i // 20, 0))
+        cube = bpy.context.object
+        cube.name = "BenchmarkCube"
+        bpy.ops.object.editmode_toggle()
+        bpy.ops.object.editmode_toggle()
+
+        bpy.ops.object.armature_add(enter_editmode=False, location=(i % 20, i // 20, 0))
+        armature = bpy.context.object
+        armature.name = "BenchmarkArmature"
+
+        bpy.ops.object.select_all(action='DESELECT')
+        cube.select_set(True)
+        armature.select_set(True)
+        bpy.context.view_layer.objects.active = armature
+        bpy.ops.object.parent_set(type='OBJECT')
+    pass
+
+## cube_vertices and cube_faces are the half-meter cube primitive_cube_add(size=0.5) makes.
+cube_vertices = [(x, y, z) for x in (-0.25, 0.25) for y in (-0.25, 0.25) for z in (-0.25, 0.25)]
+cube_faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+
+## BuildWithDataAPI builds the same pairs straight through bpy.data -- no selection, mode switch or operator, so nothing is evaluated
+## until the bulk build ends.  The armatures get no bone, as bones can only be added in edit mode; parenting to the object doesn't need one.
+def BuildWithDataAPI(objectCount):
+    collection = bpy.context.collection
+    with sl.BulkSceneBuild():
+        for i in range(objectCount):
+            location = (i % 20, i // 20, 0)
+            mesh = bpy.data.meshes.new("BenchmarkCube")
+            mesh.from_pydata(cube_vertices, [], cube_faces)
+            cube = bpy.data.objects.new("BenchmarkCube", mesh)
+            cube.location = location
+            collection.objects.link(cube)
+
+            armature = bpy.data.objects.new("BenchmarkArmature", bpy.data.armatures.new("BenchmarkArmature"))
+            armature.location = location
+            collection.objects.link(armature)
+
+            ## parent_set keeps the child where it was with the parent's inverse -- matrix_basis is up to date without an evaluation.
+            cube.parent = armature
+            cube.matrix_parent_inverse = armature.matrix_basis.inverted()
+    pass
+
+## BenchmarkBulkSceneBuild compares building scenes of 50, 200 and 500 parented pairs with operators and through the data API.
+def BenchmarkBulkSceneBuild(sizes=(50, 200, 500)):
+    print("pairs | operators | data API + bulk build | speedup")
+    for size in sizes:
+        ClearBenchmarkObjects()
+        start = time.perf_counter()
+        BuildWithOperators(size)
+        oldTime = time.perf_counter() - start
+
+        ClearBenchmarkObjects()
+        start = time.perf_counter()
+        BuildWithDataAPI(size)
+        newTime = time.perf_counter() - start
+        print(f"{size:>5} | {oldTime:9.4f} | {newTime:21.4f} | {oldTime / newTime:6.1f}x")
+    ClearBenchmarkObjects()
+    pass
+
+
+BenchmarkBulkSceneBuild()
@@ -7,7 +7,25 @@ import pdb
 import math
 import operator
 import numpy as np
+import importlib.util
+import sys
 
+## LoadImranLibrary loads one of my helper libraries from the SceneBasics folder by file path, as blender doesn't know about it.
+github_drive = "f"
+library_path = github_drive + ":/github/technicalsmartistry/Blender/SceneBasics/"
+def LoadImranLibrary(module_name):
+    spec = importlib.util.spec_from_file_location(module_name, library_path + module_name + ".py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return(module)
+
+sl = LoadImranLibrary("ImranSceneLib")
+
+## While working on the look, load a smaller copy of the EXR -- 512, 1024 or 2048 -- and switch to 'full' for the final render.
+## The copies are made in the background the first time an EXR is used, so the first run still loads the full file.
+textureQuality = 1024
+pyramid = sl.TexturePyramid(quality=textureQuality)
 
 
 ### Basic -- load an EXR
@@ -15,6 +33,7 @@ import numpy as np
 ## get the node tree for the world and clear it.
 node_tree = bpy.context.scene.world.node_tree
 tree_nodes = bpy.context.scene.world.node_tree.nodes
+oldImages = [node.image for node in tree_nodes if node.type == 'TEX_ENVIRONMENT' and node.image is not None]
 tree_nodes.clear()
 
 ## add 3 nodes from left to right -- Environment Texture, Bacgkround, and output
@@ -32,7 +51,15 @@ link = links.new(node_environment.outputs["Color"], node_background.inputs["Colo
 link = links.new(node_background.outputs["Background"], node_output.inputs["Surface"])
 
 ## load the EXF/HDR into the environment node.
-node_environment.image = bpy.data.images.load("C:/github/technicalsmartistry/Blender/SceneBasics/amphitheatre_zanzibar_fort_4k.exr")
+exrFile = "C:/github/technicalsmartistry/Blender/SceneBasics/amphitheatre_zanzibar_fort_4k.exr"
+if textureQuality != 'full':
+    pyramid.Build([exrFile], wait=False)
+node_environment.image = pyramid.Load(exrFile)
+
+## running the script again reuses the loaded EXR -- and the one it replaces is removed, so copies don't stack up in bpy.data.images.
+for oldImage in oldImages:
+    if oldImage != node_environment.image:
+        sl.SharedImageRegistry.Release(oldImage)
 
 ### Advanced -- change the XYZ position of the EXR
 node_vector = tree_nodes.new(type='ShaderNodeMapping')
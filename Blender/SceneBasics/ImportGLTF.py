@@ -8,6 +8,8 @@ import math
 import operator
 import numpy as np
 import os
+import importlib.util
+import sys
 
 ## ImportGLTF imports a file and gives you back the imported objects, or None on error.
 ## importing doesn't give you the objects imported.  It gives you a result code, and selects the imported objects.
@@ -31,33 +33,33 @@ def ImportGLTF(filePath="", fileName=""):
     ## return a tuple with the objects, Status.
     return (objects, resultStatus)
 
-## Creates a collection with the specified name and links it in as a child of the top level collection
-def CreateCollectionWithName(name="woof"):
-    sceneCollection = bpy.context.scene.collection
-    newCollection = bpy.data.collections.new(name) ## also available via bpy.data.collection[name]
-    sceneCollection.children.link(newCollection) ## make the new collection visible
-    return(newCollection)
-
-def MoveObjectsBetweenCollections(objects, oldCollection, newCollection):
-    for item in objects:
-        newCollection.objects.link(item)
-        oldCollection.objects.unlink(item)
-        
+## The collection helpers live in my scene library.
+github_drive = "f"
+library_path = github_drive + ":/github/technicalsmartistry/Blender/SceneBasics/"
+def LoadImranLibrary(module_name):
+    spec = importlib.util.spec_from_file_location(module_name, library_path + module_name + ".py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return(module)
 
+sl = LoadImranLibrary("ImranSceneLib")
+collectionHelpers = sl.CollectionHelpers()
 
 ## import an object
 chest, status = ImportGLTF(filePath="C:\\temp", fileName="treasure_chest_4k.gltf")
 
-## create a collection called "chest"
-chestCollection = CreateCollectionWithName("Chest")
-
-## put the imported chest into the chest collection
-MoveObjectsBetweenCollections(chest, bpy.context.scene.collection, chestCollection)
-
-## let's duplicate the imported chest and move the duplicates around.
-bpy.ops.object.duplicate()
-chest2 = bpy.context.selected_objects
-bpy.ops.transform.translate(value=(2, 0, 0))
-chest2Collection = CreateCollectionWithName("Chest2")
-MoveObjectsBetweenCollections(chest2, chestCollection, chest2Collection)
+## put the imported chest into a collection called "Chest" to instance from
+chestCollection = collectionHelpers.MakeAssetCollection(chest, "Chest")
 
+## rather than duplicating the chest, place instances of it -- a 10 x 10 grid, 2 units apart, each turned a random amount.
+rng = np.random.default_rng(0)
+grid = np.stack(np.meshgrid(np.arange(10), np.arange(10), indexing='ij'), axis=-1).reshape(-1, 2) * 2.0
+angles = rng.uniform(0, 2 * math.pi, len(grid))
+transforms = np.tile(np.eye(4), (len(grid), 1, 1))
+transforms[:, 0, 0] = np.cos(angles)
+transforms[:, 0, 1] = -np.sin(angles)
+transforms[:, 1, 0] = np.sin(angles)
+transforms[:, 1, 1] = np.cos(angles)
+transforms[:, 0:2, 3] = grid
+chestInstances = collectionHelpers.InstanceCollection(chestCollection, transforms, "Chest")
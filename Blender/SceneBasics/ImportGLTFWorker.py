@@ -0,0 +1,45 @@
+## ImportGLTFWorker converts a shard of glTF files into .blend libraries inside one headless blender, for Importers.ImportGLTFParallel.
+## Each glTF ends up in its own .blend, with everything it imported in one collection named after the file, ready to append or link.
+## Usage (ImportGLTFParallel does this for you):
+##  blender -b --factory-startup --python ImportGLTFWorker.py -- shard.json results.jsonl
+
+import bpy
+import json
+import os
+import sys
+import time
+
+## ConvertGLTF imports one glTF into an empty file and saves it as a .blend, giving back a record of what happened.
+## Parameters:
+##  job -- a dictionary with the 'gltf' file to import, the 'blend' file to write and the 'collection' name to put it all in.
+def ConvertGLTF(job):
+    started = time.perf_counter()
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    collection = bpy.data.collections.new(job['collection'])
+    bpy.context.scene.collection.children.link(collection)
+    bpy.context.view_layer.active_layer_collection = bpy.context.view_layer.layer_collection.children[collection.name]
+
+    record = {'gltf': job['gltf'], 'blend': job['blend'], 'collection': collection.name, 'worker': os.getpid()}
+    try:
+        bpy.ops.import_scene.gltf(filepath=job['gltf'], loglevel=50)
+    except RuntimeError as error:
+        record.update({'error': str(error), 'seconds': time.perf_counter() - started})
+        return(record)
+
+    ## glTF imports can create their own child collections -- the top collection holds them all, so appending it brings the lot.
+    ## Images the glTF embedded only live in memory, so pack them to keep them in the .blend.
+    for image in bpy.data.images:
+        if image.packed_file is None and image.source == 'FILE' and not os.path.exists(bpy.path.abspath(image.filepath)):
+            image.pack()
+    bpy.ops.wm.save_as_mainfile(filepath=job['blend'], compress=False, relative_remap=False)
+    record.update({'objects': [item.name for item in collection.all_objects], 'seconds': time.perf_counter() - started})
+    return(record)
+
+
+## blender passes our own arguments after "--"
+shardPath, resultPath = sys.argv[sys.argv.index("--") + 1:][:2]
+with open(shardPath) as shard:
+    jobs = json.load(shard)
+with open(resultPath, "w") as results:
+    for job in jobs:
+        results.write(json.dumps(ConvertGLTF(job)) + "\n")
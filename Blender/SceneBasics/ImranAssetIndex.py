@@ -0,0 +1,411 @@
+## ImranAssetIndex walks an asset library folder and records what's inside every .blend, .gltf and .glb into a SQLite index,
+## so scripts can search for assets instead of hard-coding file paths and object names.
+## It reads the files directly -- the .blend datablock tables and the glTF JSON -- so it needs plain python only, no blender.
+## Files are parsed in parallel, one process per core, and re-indexing only re-reads files whose size or modified time changed.
+## Usage:
+##  python ImranAssetIndex.py C:\temp\AssetLibrary --category furniture --max-triangles 50000
+##
+## What gets recorded:
+##  files -- path, category (the first folder under the library), size, mtime, total triangles, any parse error
+##  assets -- every object and collection: name, type, vertices, triangles, and a bounding box where the file gives one
+##  textures -- every image each file uses
+
+import argparse
+import concurrent.futures
+import gzip
+import io
+import json
+import os
+import sqlite3
+import struct
+import time
+import numpy as np
+
+## zstandard is only needed for .blend files saved with zstd compression (blender 3.0 and later) -- without it those files are skipped.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+indexed_extensions = ('.blend', '.gltf', '.glb')
+
+## blend_object_types maps the object type numbers stored in .blend files to the names bpy uses.
+blend_object_types = {0: 'EMPTY', 1: 'MESH', 2: 'CURVE', 3: 'SURFACE', 4: 'FONT', 5: 'META', 10: 'LIGHT', 11: 'CAMERA', 12: 'SPEAKER',
+                      13: 'LIGHT_PROBE', 22: 'LATTICE', 25: 'ARMATURE', 26: 'GPENCIL', 27: 'CURVES', 28: 'POINTCLOUD', 29: 'VOLUME', 30: 'GREASEPENCIL'}
+
+## ReadBlendBytes gives back the bytes of a .blend, uncompressing gzip or zstd files.
+def ReadBlendBytes(path):
+    with open(path, "rb") as blend:
+        data = blend.read()
+    if data[:2] == b"\x1f\x8b":
+        return(gzip.decompress(data))
+    if data[:4] == b"\x28\xb5\x2f\xfd":
+        if zstandard is None:
+            raise ValueError("zstd compressed .blend needs the zstandard package")
+        ## blender writes zstd .blend files as many frames, so it can seek -- read across all of them.
+        return(zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True).read())
+    return(data)
+
+## BlendFile is a parsed .blend: its blocks, and the SDNA that describes the layout of every struct in them.
+class BlendFile():
+    def __init__(self, data) -> None:
+        if data[:7] != b"BLENDER":
+            raise ValueError("not a .blend file")
+        self.data = data
+        if data[7:9] == b"17": ## blender 5 header: BLENDER17-01v0500, and blocks with 64 bit lengths
+            self.pointerSize, self.endian, offset = 8, "<" if data[12:13] == b"v" else ">", 17
+            self.headFormat = self.endian + "4siQqq" ## code, SDNA index, old address, length, count
+        else: ## BLENDER-v405: pointer size, endianness, version
+            self.pointerSize = 8 if data[7:8] == b"-" else 4
+            self.endian = "<" if data[8:9] == b"v" else ">"
+            offset = 12
+            self.headFormat = self.endian + "4si" + ("Q" if self.pointerSize == 8 else "I") + "ii" ## code, length, old address, SDNA index, count
+
+        self.blocks = []
+        headSize = struct.calcsize(self.headFormat)
+        while offset + headSize <= len(data):
+            head = struct.unpack_from(self.headFormat, data, offset)
+            if data[7:9] == b"17":
+                code, sdnaIndex, address, length, count = head
+            else:
+                code, length, address, sdnaIndex, count = head
+            offset += headSize
+            if code == b"ENDB":
+                break
+            self.blocks.append({'code': code, 'sdna': sdnaIndex, 'address': address, 'offset': offset, 'length': length, 'count': count})
+            offset += length
+
+        dna = [block for block in self.blocks if block['code'] == b"DNA1"]
+        if len(dna) == 0:
+            raise ValueError("no SDNA block")
+        self.ReadSDNA(dna[0]['offset'])
+        pass
+
+    ## ReadSDNA reads the struct descriptions: names, types and their sizes, then every struct's fields.
+    def ReadSDNA(self, offset):
+        data = self.data
+
+        def ReadStrings(offset, count):
+            strings = []
+            for i in range(count):
+                end = data.index(b"\0", offset)
+                strings.append(data[offset:end].decode("latin-1"))
+                offset = end + 1
+            return(strings, (offset + 3) & ~3)
+
+        offset += 8 ## "SDNA" then "NAME"
+        count = struct.unpack_from(self.endian + "i", data, offset)[0]
+        names, offset = ReadStrings(offset + 4, count)
+        count = struct.unpack_from(self.endian + "i", data, offset + 4)[0] ## "TYPE"
+        types, offset = ReadStrings(offset + 8, count)
+        lengths = struct.unpack_from(self.endian + "%dh" % len(types), data, offset + 4) ## "TLEN"
+        offset = (offset + 4 + 2 * len(types) + 3) & ~3
+        count = struct.unpack_from(self.endian + "i", data, offset + 4)[0] ## "STRC"
+        offset += 8
+
+        self.structs = []
+        self.structByType = {}
+        for i in range(count):
+            typeIndex, fieldCount = struct.unpack_from(self.endian + "2h", data, offset)
+            fieldData = struct.unpack_from(self.endian + "%dh" % (2 * fieldCount), data, offset + 4)
+            offset += 4 + 4 * fieldCount
+            fields = {}
+            fieldOffset = 0
+            for field in range(fieldCount):
+                fieldType, fieldName = types[fieldData[2 * field]], names[fieldData[2 * field + 1]]
+                size = self.pointerSize if fieldName.startswith("*") or fieldName.startswith("(") else lengths[fieldData[2 * field]]
+                arrayCount = 1
+                for dimension in fieldName.split("[")[1:]:
+                    arrayCount *= int(dimension.rstrip("]"))
+                bareName = fieldName.split("[")[0].lstrip("*").strip("()")
+                fields[bareName] = (fieldOffset, fieldType, size * arrayCount, fieldName.startswith("*"))
+                fieldOffset += size * arrayCount
+            self.structs.append({'type': types[typeIndex], 'fields': fields})
+            self.structByType[types[typeIndex]] = self.structs[-1]
+        pass
+
+    ## Field reads one field of the struct at the start of a block, or gives back None if this blender version doesn't have it.
+    ## Parameters:
+    ##  block -- the block holding the struct.
+    ##  names -- the field's name, or a tuple of the names it's had in different blender versions.
+    def Field(self, block, names):
+        fields = self.structs[block['sdna']]['fields']
+        for name in (names if isinstance(names, tuple) else (names,)):
+            if name not in fields:
+                continue
+            fieldOffset, fieldType, size, isPointer = fields[name]
+            start = block['offset'] + fieldOffset
+            if isPointer:
+                return(struct.unpack_from(self.endian + ("Q" if self.pointerSize == 8 else "I"), self.data, start)[0])
+            if fieldType == "char":
+                return(self.data[start:start + size].split(b"\0")[0].decode("utf-8", "replace"))
+            if fieldType == "ID":
+                idName = self.structByType["ID"]['fields']['name']
+                return(self.data[start + idName[0]:start + idName[0] + idName[2]].split(b"\0")[0].decode("utf-8", "replace"))
+            formats = {'short': "h", 'int': "i", 'float': "f", 'char': "b", 'uchar': "B", 'ushort': "H"}
+            return(struct.unpack_from(self.endian + formats.get(fieldType, "i"), self.data, start)[0])
+        return(None)
+
+    ## Blocks gives back every block with a two letter ID code, like "OB" for objects or "ME" for meshes.
+    def Blocks(self, code):
+        return([block for block in self.blocks if block['code'][:2] == code.encode("ascii")])
+
+## IndexBlendFile lists a .blend's objects, collections and images straight from its datablocks.
+## .blend files don't store bounding boxes, so those are left empty.
+def IndexBlendFile(path):
+    blend = BlendFile(ReadBlendBytes(path))
+    meshes = {}
+    for block in blend.Blocks("ME"):
+        vertices = blend.Field(block, ("verts_num", "totvert")) or 0
+        faces = blend.Field(block, ("faces_num", "totpoly")) or 0
+        corners = blend.Field(block, ("corners_num", "totloop")) or 0
+        meshes[block['address']] = (vertices, max(corners - 2 * faces, 0))
+
+    assets = []
+    for block in blend.Blocks("OB"):
+        name = blend.Field(block, "id")
+        if not name: ## an object without an ID name can't be appended or linked, so it isn't an asset
+            continue
+        vertices, triangles = meshes.get(blend.Field(block, "data"), (0, 0))
+        assets.append({'name': name[2:], 'type': blend_object_types.get(blend.Field(block, "type"), 'UNKNOWN'),
+                       'vertices': vertices, 'triangles': triangles, 'bounds': None})
+    for block in blend.Blocks("GR"):
+        name = blend.Field(block, "id")
+        if name:
+            assets.append({'name': name[2:], 'type': 'COLLECTION', 'vertices': 0, 'triangles': 0, 'bounds': None})
+    textures = [blend.Field(block, ("filepath", "name")) for block in blend.Blocks("IM")]
+    return(assets, [texture for texture in textures if texture])
+
+## ReadGLTFJSON reads the JSON part of a .gltf or .glb file, without touching its buffers or images.
+def ReadGLTFJSON(path):
+    if path.lower().endswith(".glb"):
+        with open(path, "rb") as glb:
+            header = struct.unpack("<5I", glb.read(20)) ## magic, version, length, then the JSON chunk's length and type
+            return(json.loads(glb.read(header[3]).decode("utf-8")))
+    with open(path, encoding="utf-8") as gltf:
+        return(json.load(gltf))
+
+## GLTFNodeMatrix gives back a glTF node's local 4x4 matrix, from its matrix or its translation, rotation and scale.
+def GLTFNodeMatrix(node):
+    if 'matrix' in node:
+        return(np.array(node['matrix'], dtype=np.float64).reshape(4, 4).T) ## glTF stores matrices column by column
+    x, y, z, w = node.get('rotation', (0, 0, 0, 1))
+    rotation = np.array([[1 - 2*(y*y + z*z), 2*(x*y - z*w), 2*(x*z + y*w)],
+                         [2*(x*y + z*w), 1 - 2*(x*x + z*z), 2*(y*z - x*w)],
+                         [2*(x*z - y*w), 2*(y*z + x*w), 1 - 2*(x*x + y*y)]])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.asarray(node.get('scale', (1, 1, 1)))
+    matrix[:3, 3] = node.get('translation', (0, 0, 0))
+    return(matrix)
+
+## WalkGLTFNodes gives back (node index, node, world matrix) for every node under the roots, parents before their children.
+## Parameters:
+##  document -- the glTF JSON, from ReadGLTFJSON.
+##  roots -- the node indices to start from.  Defaults to every node without a parent.
+def WalkGLTFNodes(document, roots=None):
+    nodes = document.get('nodes', [])
+    if roots is None:
+        children = {child for node in nodes for child in node.get('children', [])}
+        roots = [index for index in range(len(nodes)) if index not in children]
+    walked = []
+    stack = [(root, np.eye(4)) for root in reversed(roots)]
+    while len(stack) > 0:
+        nodeIndex, parentMatrix = stack.pop()
+        node = nodes[nodeIndex]
+        world = parentMatrix @ GLTFNodeMatrix(node)
+        walked.append((nodeIndex, node, world))
+        stack.extend((child, world) for child in reversed(node.get('children', [])))
+    return(walked)
+
+## GLTFBoxCorners gives back the 8 corners of a POSITION accessor's min and max box, placed by a world matrix and converted to
+## blender's Z up -- the glTF spec requires min and max on POSITION, so no buffer is read.  Gives back None if the accessor has none.
+def GLTFBoxCorners(accessor, world):
+    if 'min' not in accessor or 'max' not in accessor:
+        return(None)
+    low, high = accessor['min'], accessor['max']
+    box = np.array([(x, y, z, 1.0) for x in (low[0], high[0]) for y in (low[1], high[1]) for z in (low[2], high[2])])
+    points = (box @ world.T)[:, :3]
+    return(np.stack((points[:, 0], -points[:, 2], points[:, 1]), axis=1)) ## glTF is Y up, blender is Z up
+
+## GLTFBounds works out the (min, max) corners of everything in a glTF's default scene, in blender's Z up coordinates.
+## Gives back None if the file has no meshes with bounds.
+def GLTFBounds(path):
+    document = ReadGLTFJSON(path)
+    meshes = document.get('meshes', [])
+    accessors = document.get('accessors', [])
+    roots = None
+    if len(document.get('scenes', [])) > 0:
+        roots = document['scenes'][document.get('scene', 0)].get('nodes', [])
+    corners = []
+    for nodeIndex, node, world in WalkGLTFNodes(document, roots):
+        for primitive in meshes[node['mesh']]['primitives'] if 'mesh' in node else []:
+            box = GLTFBoxCorners(accessors[primitive['attributes']['POSITION']], world)
+            if box is not None:
+                corners.append(box)
+    if len(corners) == 0:
+        return(None)
+    points = np.concatenate(corners)
+    return(points.min(axis=0), points.max(axis=0))
+
+## IndexGLTFFile lists a glTF's nodes, with triangle counts from the accessor counts and world bounding boxes from the POSITION
+## accessors' min and max, converted to blender's Z up.  No buffer is read.
+def IndexGLTFFile(path):
+    document = ReadGLTFJSON(path)
+    meshes = document.get('meshes', [])
+    accessors = document.get('accessors', [])
+    assets = []
+    for nodeIndex, node, world in WalkGLTFNodes(document):
+        asset = {'name': node.get('name', "node_%d" % nodeIndex), 'type': 'EMPTY', 'vertices': 0, 'triangles': 0, 'bounds': None}
+        if 'camera' in node:
+            asset['type'] = 'CAMERA'
+        corners = []
+        for primitive in meshes[node['mesh']]['primitives'] if 'mesh' in node else []:
+            asset['type'] = 'MESH'
+            position = accessors[primitive['attributes']['POSITION']]
+            asset['vertices'] += position.get('count', 0)
+            if primitive.get('mode', 4) == 4: ## triangles
+                asset['triangles'] += (accessors[primitive['indices']].get('count', 0) if 'indices' in primitive else position.get('count', 0)) // 3
+            box = GLTFBoxCorners(position, world)
+            if box is not None:
+                corners.append(box)
+        if len(corners) > 0:
+            points = np.concatenate(corners)
+            asset['bounds'] = (points.min(axis=0).tolist(), points.max(axis=0).tolist())
+        assets.append(asset)
+    textures = [image['uri'] for image in document.get('images', []) if 'uri' in image and not image['uri'].startswith("data:")]
+    return(assets, textures)
+
+## index_errors are the errors a broken or unusual file can raise while it's parsed.
+index_errors = (OSError, ValueError, KeyError, IndexError, TypeError, struct.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+## IndexFile parses one asset file, giving back a record for the index.  Errors are recorded rather than raised,
+## so one broken file doesn't stop the whole library being indexed.
+def IndexFile(path):
+    record = {'path': path, 'assets': [], 'textures': [], 'error': None}
+    try:
+        if path.lower().endswith(".blend"):
+            record['assets'], record['textures'] = IndexBlendFile(path)
+        else:
+            record['assets'], record['textures'] = IndexGLTFFile(path)
+    except index_errors as error:
+        record['error'] = str(error)
+    return(record)
+
+## AssetIndex is the SQLite index of one asset library folder.
+class AssetIndex():
+    ## Parameters:
+    ##  libraryPath -- the asset library folder.
+    ##  databasePath -- the SQLite file.  Defaults to asset_index.sqlite in the library folder.
+    def __init__(self, libraryPath, databasePath=None) -> None:
+        self.libraryPath = os.path.abspath(libraryPath)
+        self.databasePath = databasePath or os.path.join(self.libraryPath, "asset_index.sqlite")
+        self.connection = sqlite3.connect(self.databasePath)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, category TEXT, kind TEXT, size INTEGER, mtime REAL, triangles INTEGER, error TEXT);
+            CREATE TABLE IF NOT EXISTS assets (path TEXT, name TEXT, type TEXT, vertices INTEGER, triangles INTEGER,
+                                               minX REAL, minY REAL, minZ REAL, maxX REAL, maxY REAL, maxZ REAL);
+            CREATE TABLE IF NOT EXISTS textures (path TEXT, texture TEXT);
+            CREATE INDEX IF NOT EXISTS assets_by_path ON assets (path);
+            CREATE INDEX IF NOT EXISTS assets_by_type ON assets (type, triangles);
+            CREATE INDEX IF NOT EXISTS assets_by_name ON assets (name);
+            CREATE INDEX IF NOT EXISTS textures_by_path ON textures (path);
+            CREATE INDEX IF NOT EXISTS files_by_category ON files (category, triangles);
+        """)
+        pass
+
+    ## Category is the first folder of a file under the library, like "furniture" for furniture\chest\chest.gltf.
+    def Category(self, path):
+        parts = os.path.relpath(path, self.libraryPath).split(os.sep)
+        return(parts[0] if len(parts) > 1 else "")
+
+    ## Update indexes every new or changed file in the library, in parallel, and forgets files that were deleted.
+    ## Gives back {'indexed', 'unchanged', 'removed', 'errors', 'seconds'}.
+    ## Parameters:
+    ##  workers -- how many processes parse files.  Defaults to one per core.
+    def Update(self, workers=None):
+        started = time.perf_counter()
+        known = {row[0]: (row[1], row[2]) for row in self.connection.execute("SELECT path, size, mtime FROM files")}
+        onDisk = {}
+        for folder, subfolders, fileNames in os.walk(self.libraryPath):
+            for fileName in fileNames:
+                if fileName.lower().endswith(indexed_extensions):
+                    path = os.path.join(folder, fileName)
+                    status = os.stat(path)
+                    onDisk[path] = (status.st_size, status.st_mtime)
+        changed = [path for path, stamp in onDisk.items() if known.get(path) != stamp]
+        removed = [path for path in known if path not in onDisk]
+
+        errors = 0
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            records = list(pool.map(IndexFile, changed, chunksize=8))
+        with self.connection:
+            for path in changed + removed:
+                for table in ("files", "assets", "textures"):
+                    self.connection.execute("DELETE FROM %s WHERE path = ?" % table, (path,))
+            for record in records:
+                path = record['path']
+                errors += record['error'] is not None
+                self.connection.execute("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                        (path, self.Category(path), os.path.splitext(path)[1].lower().lstrip("."), onDisk[path][0], onDisk[path][1],
+                                         sum(asset['triangles'] for asset in record['assets']), record['error']))
+                self.connection.executemany("INSERT INTO assets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                            [(path, asset['name'], asset['type'], asset['vertices'], asset['triangles'],
+                                              *(asset['bounds'][0] + asset['bounds'][1] if asset['bounds'] else [None] * 6)) for asset in record['assets']])
+                self.connection.executemany("INSERT INTO textures VALUES (?, ?)", [(path, texture) for texture in record['textures']])
+        return({'indexed': len(changed), 'unchanged': len(onDisk) - len(changed), 'removed': len(removed), 'errors': errors,
+                'seconds': time.perf_counter() - started})
+
+    ## FindFiles gives back the asset files matching everything given, smallest first, as (path, category, triangles) rows.
+    ## Parameters:
+    ##  category -- the first folder under the library, like "furniture".
+    ##  maxTriangles -- only files with fewer triangles than this.
+    ##  kind -- "blend", "gltf" or "glb".
+    def FindFiles(self, category=None, maxTriangles=None, kind=None):
+        conditions, parameters = ["error IS NULL"], []
+        for clause, value in (("category = ?", category), ("triangles < ?", maxTriangles), ("kind = ?", kind)):
+            if value is not None:
+                conditions.append(clause)
+                parameters.append(value)
+        query = "SELECT path, category, triangles FROM files WHERE " + " AND ".join(conditions) + " ORDER BY triangles"
+        return(self.connection.execute(query, parameters).fetchall())
+
+    ## FindAssets gives back the objects and collections matching everything given, as (path, name, type, triangles) rows,
+    ## lightest first, then by name and path, so the same index always gives back the same order.
+    ## Parameters:
+    ##  name -- a SQL LIKE pattern, like "Cottage%".
+    ##  objectType -- "MESH", "COLLECTION", "ARMATURE" and so on.
+    ##  category -- the first folder under the library.
+    ##  maxTriangles -- only assets with fewer triangles than this.
+    def FindAssets(self, name=None, objectType=None, category=None, maxTriangles=None):
+        conditions, parameters = ["1"], []
+        for clause, value in (("assets.name LIKE ?", name), ("assets.type = ?", objectType), ("files.category = ?", category), ("assets.triangles < ?", maxTriangles)):
+            if value is not None:
+                conditions.append(clause)
+                parameters.append(value)
+        query = "SELECT assets.path, assets.name, assets.type, assets.triangles FROM assets JOIN files ON files.path = assets.path WHERE " + " AND ".join(conditions) + " ORDER BY assets.triangles, assets.name, assets.path"
+        return(self.connection.execute(query, parameters).fetchall())
+
+    ## Textures gives back the images an asset file uses.
+    def Textures(self, path):
+        return([row[0] for row in self.connection.execute("SELECT texture FROM textures WHERE path = ?", (path,))])
+
+    def Close(self):
+        self.connection.close()
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index an asset library of .blend and glTF files into SQLite, and search it.")
+    parser.add_argument("library", help="the asset library folder")
+    parser.add_argument("--db", default=None, help="the SQLite index file, asset_index.sqlite in the library by default")
+    parser.add_argument("--workers", type=int, default=None, help="parsing processes, one per core by default")
+    parser.add_argument("--category", default=None, help="list files in this category, like furniture")
+    parser.add_argument("--max-triangles", type=int, default=None, help="list files with fewer triangles than this")
+    arguments = parser.parse_args()
+
+    index = AssetIndex(arguments.library, arguments.db)
+    print(index.Update(arguments.workers))
+    if arguments.category is not None or arguments.max_triangles is not None:
+        for path, category, triangles in index.FindFiles(arguments.category, arguments.max_triangles):
+            print(triangles, path)
+    index.Close()
@@ -0,0 +1,1132 @@
+## This is a collection of mesh helpers I wrote up to treat meshes as arrays of points instead of one python vertex at a time.
+import bpy
+import bmesh
+import mathutils
+import mathutils.bvhtree
+import mathutils.kdtree
+import numpy as np
+import zlib
+import importlib.util
+import os
+import sys
+from enum import Enum
+
+## LoadSiblingLibrary loads another of my libraries that lives in the same folder as this one.
+def LoadSiblingLibrary(module_name):
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(os.path.dirname(os.path.abspath(__file__)), module_name + ".py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return(module)
+
+## Snapshots have no blender dependencies, so they live in their own file that plain python can load too.
+ms = LoadSiblingLibrary("ImranMeshSnapshot")
+mp = LoadSiblingLibrary("ImranMeshPrimitives")
+
+## Mesh to array layer.
+## Every foreach_get call below copies a whole attribute into one contiguous numpy buffer, instead of walking dataItem.vertices one python object at a time.
+## In edit mode, the mesh's vertex list is stale until you leave edit mode, so those reads come from the bmesh instead.
+
+## ReadVertexCoordinates gives back the vertex positions of a mesh as an (n, 3) float32 array.
+## Parameters:
+##  dataItem -- the 'MESH' we want the vertex positions of.
+def ReadVertexCoordinates(dataItem):
+    if dataItem.is_editmode:
+        bm = bmesh.from_edit_mesh(dataItem)
+        return(np.array([v.co[:] for v in bm.verts], dtype=np.float32).reshape(-1, 3))
+
+    coords = np.empty(len(dataItem.vertices) * 3, dtype=np.float32)
+    dataItem.vertices.foreach_get("co", coords)
+    return(coords.reshape(-1, 3))
+
+## ReadVertexNormals gives back the vertex normals blender has computed for the mesh as an (n, 3) float32 array.
+def ReadVertexNormals(dataItem):
+    if dataItem.is_editmode:
+        bm = bmesh.from_edit_mesh(dataItem)
+        return(np.array([v.normal[:] for v in bm.verts], dtype=np.float32).reshape(-1, 3))
+
+    normals = np.empty(len(dataItem.vertices) * 3, dtype=np.float32)
+    dataItem.vertices.foreach_get("normal", normals)
+    return(normals.reshape(-1, 3))
+
+## ReadVertexSelection gives back the selection state of every vertex as a boolean mask.
+def ReadVertexSelection(dataItem):
+    if dataItem.is_editmode:
+        bm = bmesh.from_edit_mesh(dataItem)
+        return(np.array([v.select for v in bm.verts], dtype=bool))
+
+    selected = np.empty(len(dataItem.vertices), dtype=bool)
+    dataItem.vertices.foreach_get("select", selected)
+    return(selected)
+
+## ReadMeshArrays reads coordinates, normals and selection flags in one go, for analysis that needs all three.
+## Returns a dictionary of numpy arrays keyed by 'co', 'normal' and 'select'.
+def ReadMeshArrays(dataItem):
+    return({'co': ReadVertexCoordinates(dataItem), 'normal': ReadVertexNormals(dataItem), 'select': ReadVertexSelection(dataItem)})
+
+## ReadFaceArrays gives back the face topology of a mesh as (loopStarts, loopTotals, loopVertices) int arrays.
+## Face f uses the vertices loopVertices[loopStarts[f] : loopStarts[f] + loopTotals[f]], in winding order.
+def ReadFaceArrays(dataItem):
+    if dataItem.is_editmode:
+        bm = bmesh.from_edit_mesh(dataItem)
+        bm.verts.index_update()
+        faces = [[v.index for v in face.verts] for face in bm.faces]
+        loopTotals = np.array([len(face) for face in faces], dtype=np.int64)
+        loopStarts = np.concatenate(([0], np.cumsum(loopTotals)[:-1])).astype(np.int64)
+        loopVertices = np.array([index for face in faces for index in face], dtype=np.int64)
+        return(loopStarts, loopTotals, loopVertices)
+
+    loopStarts = np.empty(len(dataItem.polygons), dtype=np.int32)
+    dataItem.polygons.foreach_get("loop_start", loopStarts)
+    loopTotals = np.empty(len(dataItem.polygons), dtype=np.int32)
+    dataItem.polygons.foreach_get("loop_total", loopTotals)
+    loopVertices = np.empty(len(dataItem.loops), dtype=np.int32)
+    dataItem.loops.foreach_get("vertex_index", loopVertices)
+    return(loopStarts.astype(np.int64), loopTotals.astype(np.int64), loopVertices.astype(np.int64))
+
+## WriteVertexCoordinates writes an (n, 3) array of positions back to the mesh in one go.
+## In edit mode, the bmesh owns the geometry, so we write through it and update the edit mesh instead.
+def WriteVertexCoordinates(dataItem, coords):
+    coords = np.ascontiguousarray(coords, dtype=np.float32).reshape(-1, 3)
+    if dataItem.is_editmode:
+        bm = bmesh.from_edit_mesh(dataItem)
+        for v, co in zip(bm.verts, coords.tolist()):
+            v.co = co
+        bmesh.update_edit_mesh(dataItem)
+        return
+
+    dataItem.vertices.foreach_set("co", coords.ravel())
+    dataItem.update()
+    pass
+
+## BuildKDTree builds a balanced KD tree straight from an (n, 3) array of points, where the tree index is the row index.
+def BuildKDTree(coords):
+    kd = mathutils.kdtree.KDTree(len(coords))
+    for i, co in enumerate(coords.tolist()):
+        kd.insert(co, i)
+    kd.balance()
+    return(kd)
+
+## KDTreeCache keeps one KD tree per mesh and only rebuilds it when the mesh's vertices actually change.
+## Meshes are keyed by their datablock pointer, and versioned by vertex count plus a checksum of the coordinates.
+## Checking the version is a single copy of the coordinates, which is much cheaper than re-inserting and balancing every vertex.
+class KDTreeCache():
+    def __init__(self) -> None:
+        self.trees = {} ## pointer -> (version, KD tree)
+        self.hits = 0
+        self.misses = 0
+        pass
+
+    ## MeshVersion computes the (vertex count, checksum) pair we use to decide if a cached tree is still good.
+    ## It also returns the coordinates it read, so a rebuild doesn't have to read them twice.
+    def MeshVersion(self, dataItem):
+        coords = ReadVertexCoordinates(dataItem)
+        version = (len(coords), zlib.crc32(coords.tobytes()))
+        return(version, coords)
+
+    ## GetTree gives back a balanced KD tree for the mesh, rebuilding it only when the mesh changed since the last call.
+    ## Parameters:
+    ##  dataItem -- the 'MESH' of the item we want a KD tree for.
+    def GetTree(self, dataItem):
+        key = dataItem.as_pointer()
+        version, coords = self.MeshVersion(dataItem)
+
+        cached = self.trees.get(key)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            return(cached[1])
+
+        # the mesh is new to us, or its vertices moved -- build a fresh tree.
+        self.misses += 1
+        kd = BuildKDTree(coords)
+        self.trees[key] = (version, kd)
+        return(kd)
+
+    ## Invalidate drops the cached tree for a mesh, or every cached tree if no mesh is given.
+    def Invalidate(self, dataItem=None):
+        if dataItem is None:
+            self.trees.clear()
+        else:
+            self.trees.pop(dataItem.as_pointer(), None)
+        pass
+
+    ## Stats reports how often the cache saved us a rebuild.
+    def Stats(self):
+        return({'hits': self.hits, 'misses': self.misses, 'meshes': len(self.trees)})
+
+## One cache shared by every script that loads this library.
+SharedKDTreeCache = KDTreeCache()
+
+## CreateKDTreeFromObject is a drop-in for the old per-script helpers, but goes through the shared cache.
+## Parameters:
+##  dataItem -- the 'MESH' of the item we want to generate a KD tree from.
+def CreateKDTreeFromObject(dataItem):
+    return(SharedKDTreeCache.GetTree(dataItem))
+
+## QueryKDTree finds the k nearest tree points for every row of an (n, 3) array of query points in one pass.
+## Returns (indices, distances), both shaped (n, k) and sorted nearest first.  When the tree has fewer than k points, the extra slots are -1 and inf.
+## Parameters:
+##  kd -- a balanced KD tree, like the ones from BuildKDTree or the cache.
+##  points -- an (n, 3) array, or a list of xyz tuples, of positions to query.
+##  k -- how many neighbours we want for each query point.
+def QueryKDTree(kd, points, k=1):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    indices = np.full((len(points), k), -1, dtype=np.int64)
+    distances = np.full((len(points), k), np.inf, dtype=np.float64)
+
+    for row, pt in enumerate(points.tolist()):
+        for column, (co, index, distance) in enumerate(kd.find_n(pt, k)):
+            indices[row, column] = index
+            distances[row, column] = distance
+    return(indices, distances)
+
+## FindNearestVertices is the batched version of the old one-point-at-a-time selection helpers.
+## It asks the shared cache for the mesh's tree once, then answers every query point against that one tree.
+## Parameters:
+##  dataItem -- the 'MESH' we want vertices from.
+##  points -- an (n, 3) array, or a list of xyz tuples, of positions to find vertices near.
+##  k -- how many vertices we want near each point.
+def FindNearestVertices(dataItem, points, k=1):
+    kd = SharedKDTreeCache.GetTree(dataItem)
+    return(QueryKDTree(kd, points, k))
+
+## SelectionOperations are the ways a new selection can be combined with what's already selected.
+class SelectionOperations(Enum):
+    Set = 'SET'             ## only the new vertices end up selected
+    Union = 'UNION'         ## add the new vertices to the selection
+    Intersect = 'INTERSECT' ## keep only vertices that are in both
+    Subtract = 'SUBTRACT'   ## remove the new vertices from the selection
+    Invert = 'INVERT'       ## flip the selection of the new vertices, or of everything if none are given
+
+## SelectionMask turns a list/array of vertex indices, or a boolean mask, into a boolean mask of vertexCount entries.
+def SelectionMask(vertexCount, selection):
+    if selection is None:
+        return(np.ones(vertexCount, dtype=bool))
+    selection = np.asarray(selection)
+    if selection.dtype == bool:
+        return(selection.reshape(vertexCount))
+    mask = np.zeros(vertexCount, dtype=bool)
+    mask[selection.astype(np.int64).ravel()] = True
+    return(mask)
+
+## CombineSelection works out the new selection mask from the current one, the requested vertices and an operation.
+def CombineSelection(current, requested, operation=SelectionOperations.Set):
+    match operation:
+        case SelectionOperations.Set:
+            return(requested.copy())
+        case SelectionOperations.Union:
+            return(current | requested)
+        case SelectionOperations.Intersect:
+            return(current & requested)
+        case SelectionOperations.Subtract:
+            return(current & ~requested)
+        case SelectionOperations.Invert:
+            return(current ^ requested)
+
+## ApplyVertexSelection writes a whole selection state to a mesh in one pass.
+## In object mode, the vertex, edge and face selections are all written with foreach_set -- edges and faces are selected when all their vertices are.
+## In edit mode, we look up the bmesh table once, touch only the vertices whose selection changes, and flush once at the end.
+## Returns the resulting selection mask.
+## Parameters:
+##  dataItem -- the 'MESH' we want to select vertices in.
+##  selection -- a list/array of vertex indices or a boolean mask.  None means every vertex, which is handy with Invert.
+##  operation -- one of SelectionOperations.
+def ApplyVertexSelection(dataItem, selection=None, operation=SelectionOperations.Set):
+    current = ReadVertexSelection(dataItem)
+    requested = SelectionMask(len(current), selection)
+    mask = CombineSelection(current, requested, operation)
+
+    if dataItem.is_editmode:
+        bm = bmesh.from_edit_mesh(dataItem)
+        bm.verts.ensure_lookup_table()
+        verts = bm.verts
+        for index in np.flatnonzero(mask != current).tolist():
+            verts[index].select = bool(mask[index])
+
+        # To update blender's UX with the selection change, we need to flush and update
+        bm.select_mode |= {'VERT'}
+        bm.select_flush_mode()
+        bmesh.update_edit_mesh(dataItem)
+        return(mask)
+
+    dataItem.vertices.foreach_set("select", mask)
+
+    edgeVertices = np.empty(len(dataItem.edges) * 2, dtype=np.int32)
+    dataItem.edges.foreach_get("vertices", edgeVertices)
+    dataItem.edges.foreach_set("select", mask[edgeVertices[0::2]] & mask[edgeVertices[1::2]])
+
+    if len(dataItem.polygons) > 0:
+        loopVertices = np.empty(len(dataItem.loops), dtype=np.int32)
+        dataItem.loops.foreach_get("vertex_index", loopVertices)
+        loopStarts = np.empty(len(dataItem.polygons), dtype=np.int32)
+        dataItem.polygons.foreach_get("loop_start", loopStarts)
+        dataItem.polygons.foreach_set("select", np.logical_and.reduceat(mask[loopVertices], loopStarts))
+
+    dataItem.update()
+    return(mask)
+
+## ProportionalFalloffs are the proportional editing curves blender offers, named the same as the operators' proportional_edit_falloff values.
+class ProportionalFalloffs(Enum):
+    Smooth = 'SMOOTH'
+    Sphere = 'SPHERE'
+    Root = 'ROOT'
+    InverseSquare = 'INVERSE_SQUARE'
+    Sharp = 'SHARP'
+    Linear = 'LINEAR'
+    Constant = 'CONSTANT'
+
+## FalloffWeights turns distances from an edit's center into proportional weights, using the same curves blender's transform code does.
+## Anything further than the radius gets a weight of 0, the center gets 1.
+## Parameters:
+##  distances -- an array of distances from the center of the edit.
+##  radii -- the proportional size, either one number or an array that broadcasts against distances.
+##  falloff -- one of ProportionalFalloffs.
+def FalloffWeights(distances, radii, falloff=ProportionalFalloffs.Smooth):
+    inside = distances <= radii
+    t = np.where(inside, (radii - distances) / radii, 0.0)
+    match falloff:
+        case ProportionalFalloffs.Smooth:
+            return(3.0 * t * t - 2.0 * t * t * t)
+        case ProportionalFalloffs.Sphere:
+            return(np.sqrt(np.maximum(2.0 * t - t * t, 0.0)))
+        case ProportionalFalloffs.Root:
+            return(np.sqrt(t))
+        case ProportionalFalloffs.InverseSquare:
+            return(t * (2.0 - t))
+        case ProportionalFalloffs.Sharp:
+            return(t * t)
+        case ProportionalFalloffs.Linear:
+            return(t)
+        case ProportionalFalloffs.Constant:
+            return(inside.astype(t.dtype))
+
+## ProportionalWeights works out a (edits, vertices) matrix of weights for a batch of edits that each have a center, radius and falloff.
+def ProportionalWeights(coords, centers, radii, falloffs):
+    distances = np.linalg.norm(coords[None, :, :] - centers[:, None, :], axis=2)
+    weights = np.zeros_like(distances)
+    for falloff in set(falloffs):
+        rows = np.array([f == falloff for f in falloffs])
+        weights[rows] = FalloffWeights(distances[rows], radii[rows, None], falloff)
+    return(weights)
+
+## ProportionalTranslate is the array version of bpy.ops.transform.translate with proportional editing turned on.
+## Every edit is a (center, displacement, radius, falloff) tuple.  The result is the same as running the operator once per edit, in order:
+## edits whose regions don't touch are summed in one numpy pass, and an edit that overlaps the ones before it waits for them to be applied,
+## so it sees where they moved the vertices.
+## Returns a new (n, 3) array of positions.
+## Parameters:
+##  coords -- an (n, 3) array of vertex positions.
+##  edits -- a list of (center, displacement, radius, falloff) tuples.
+##  centerVertices -- optional vertex indices, one per edit.  Each edit is then centered on wherever its vertex is when the edit runs,
+##                    the way the operator moves the selected vertex, and the center in the tuple is ignored.
+##  chunkSize -- how many edits to weigh at once, which bounds the size of the (edits, vertices) weight matrix.
+def ProportionalTranslate(coords, edits, centerVertices=None, chunkSize=64):
+    result = np.asarray(coords, dtype=np.float64).reshape(-1, 3).copy()
+    start = 0
+    while start < len(edits):
+        chunk = edits[start:start + chunkSize]
+        if centerVertices is not None:
+            centerIndices = np.asarray(centerVertices[start:start + chunkSize], dtype=np.int64)
+            centers = result[centerIndices]
+        else:
+            centers = np.array([edit[0] for edit in chunk], dtype=np.float64).reshape(-1, 3)
+        displacements = np.array([edit[1] for edit in chunk], dtype=np.float64).reshape(-1, 3)
+        radii = np.array([edit[2] for edit in chunk], dtype=np.float64)
+        weights = ProportionalWeights(result, centers, radii, [edit[3] for edit in chunk])
+
+        # take edits in order while none of them reaches a vertex an earlier one in the batch moved, before or after the move.
+        touched = np.zeros(len(result), dtype=bool)
+        batch = 0
+        for edit in range(len(chunk)):
+            if batch > 0:
+                moved = result[touched] + weights[:batch, touched].T @ displacements[:batch]
+                if (weights[edit] > 0)[touched].any() or (np.linalg.norm(moved - centers[edit], axis=1) < radii[edit]).any():
+                    break
+                if centerVertices is not None and touched[centerIndices[edit]]:
+                    break
+            touched |= weights[edit] > 0
+            batch += 1
+        result += weights[:batch].T @ displacements[:batch]
+        start += batch
+    return(result)
+
+## ProportionalTranslateMesh applies a batch of proportional translate edits straight to a mesh's vertices, with the same result as
+## running the operator once per edit.  Like selecting a vertex and pressing G, each edit is centered on the vertex nearest the requested
+## point -- picked from the mesh as it is before any of the edits, as the tutorial's edit mode selection did -- unless snapToVertices is False.
+## The positions are in the mesh's own (local) space, which is the same as world space for objects without a transform.
+## Parameters:
+##  dataItem -- the 'MESH' to deform.
+##  edits -- a list of (center, displacement, radius, falloff) tuples.
+##  snapToVertices -- center each edit on its nearest vertex, the way selecting a vertex and pressing G does.
+def ProportionalTranslateMesh(dataItem, edits, snapToVertices=True):
+    coords = ReadVertexCoordinates(dataItem)
+    centerVertices = None
+    if snapToVertices and len(edits) > 0:
+        indices, distances = FindNearestVertices(dataItem, [edit[0] for edit in edits], 1)
+        centerVertices = indices[:, 0]
+    WriteVertexCoordinates(dataItem, ProportionalTranslate(coords, edits, centerVertices))
+    return(dataItem)
+
+## FaceNormals computes a unit normal for every face from its vertex positions, using Newell's method so n-gons work too.
+def FaceNormals(coords, loopStarts, loopTotals, loopVertices):
+    faceOfLoop = np.repeat(np.arange(len(loopStarts)), loopTotals)
+    nextLoop = loopStarts[faceOfLoop] + (np.arange(len(loopVertices)) - loopStarts[faceOfLoop] + 1) % loopTotals[faceOfLoop]
+    crosses = np.cross(coords[loopVertices], coords[loopVertices[nextLoop]])
+    normals = np.zeros((len(loopStarts), 3), dtype=np.float64)
+    np.add.at(normals, faceOfLoop, crosses)
+    lengths = np.linalg.norm(normals, axis=1)
+    lengths[lengths == 0] = 1.0
+    return(normals / lengths[:, None])
+
+## VertexNormals computes unit vertex normals the way blender does: face normals weighted by the corner angle at the vertex.
+## Vertices that aren't part of any face point away from the origin, which is blender's fallback too.
+## Parameters:
+##  coords -- an (n, 3) array of vertex positions.
+##  loopStarts, loopTotals, loopVertices -- the face topology, as given by ReadFaceArrays.
+def VertexNormals(coords, loopStarts, loopTotals, loopVertices):
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+    faceOfLoop = np.repeat(np.arange(len(loopStarts)), loopTotals)
+    localIndex = np.arange(len(loopVertices)) - loopStarts[faceOfLoop]
+    nextLoop = loopStarts[faceOfLoop] + (localIndex + 1) % loopTotals[faceOfLoop]
+    previousLoop = loopStarts[faceOfLoop] + (localIndex - 1) % loopTotals[faceOfLoop]
+
+    # the angle of every face corner, between the edges going to the previous and next vertex.
+    toNext = coords[loopVertices[nextLoop]] - coords[loopVertices]
+    toPrevious = coords[loopVertices[previousLoop]] - coords[loopVertices]
+    toNext /= np.maximum(np.linalg.norm(toNext, axis=1), 1e-30)[:, None]
+    toPrevious /= np.maximum(np.linalg.norm(toPrevious, axis=1), 1e-30)[:, None]
+    angles = np.arccos(np.clip(np.einsum('ij,ij->i', toNext, toPrevious), -1.0, 1.0))
+
+    faceNormals = FaceNormals(coords, loopStarts, loopTotals, loopVertices)
+    normals = np.zeros_like(coords)
+    np.add.at(normals, loopVertices, faceNormals[faceOfLoop] * angles[:, None])
+
+    lengths = np.linalg.norm(normals, axis=1)
+    loose = lengths == 0
+    normals[loose] = coords[loose]
+    lengths[loose] = np.linalg.norm(coords[loose], axis=1)
+    lengths[lengths == 0] = 1.0
+    return(normals / lengths[:, None])
+
+## ShrinkFatten moves vertices along their normals -- the array version of alt-S.
+## Positive offsets fatten (move outward), negative offsets shrink.  Returns a new (n, 3) array.
+## Parameters:
+##  coords -- an (n, 3) array of vertex positions.
+##  normals -- an (n, 3) array of unit vertex normals, like the ones from VertexNormals.
+##  offsets -- how far to move each vertex: one number, or an array of n distances (a weight mask times a value works well).
+def ShrinkFatten(coords, normals, offsets):
+    offsets = np.broadcast_to(np.asarray(offsets, dtype=np.float64), (len(coords),))
+    return(np.asarray(coords, dtype=np.float64) + np.asarray(normals, dtype=np.float64) * offsets[:, None])
+
+## DistanceToSelection gives the distance from every vertex to its nearest selected vertex, which is what proportional editing measures.
+def DistanceToSelection(coords, selected, chunkSize=256):
+    selectedCoords = coords[np.asarray(selected, dtype=bool)]
+    distances = np.full(len(coords), np.inf)
+    for start in range(0, len(selectedCoords), chunkSize):
+        chunk = selectedCoords[start:start + chunkSize]
+        chunkDistances = np.linalg.norm(coords[None, :, :] - chunk[:, None, :], axis=2)
+        distances = np.minimum(distances, chunkDistances.min(axis=0))
+    return(distances)
+
+## ShrinkFattenSelection is the array version of bpy.ops.transform.shrink_fatten with proportional editing, run on a selection.
+## It works in object or edit mode and reads the selection from the mesh unless a mask is given.
+## Parameters:
+##  dataItem -- the 'MESH' to deform.
+##  value -- how far to move the selected vertices along their normals.
+##  radius -- the proportional size.  0 turns proportional editing off, so only the selection moves.
+##  falloff -- one of ProportionalFalloffs.
+##  selection -- optional vertex indices or boolean mask to use instead of the mesh's selection.
+def ShrinkFattenSelection(dataItem, value, radius=0.0, falloff=ProportionalFalloffs.Smooth, selection=None):
+    coords = ReadVertexCoordinates(dataItem).astype(np.float64)
+    if selection is None:
+        selected = ReadVertexSelection(dataItem)
+    else:
+        selected = SelectionMask(len(coords), selection)
+
+    if radius > 0:
+        weights = FalloffWeights(DistanceToSelection(coords, selected), radius, falloff)
+    else:
+        weights = selected.astype(np.float64)
+
+    normals = VertexNormals(coords, *ReadFaceArrays(dataItem))
+    WriteVertexCoordinates(dataItem, ShrinkFatten(coords, normals, weights * value))
+    return(dataItem)
+
+## ShrinkFattenMesh applies a batch of proportional shrink/fatten edits, each a (center, value, radius, falloff) tuple.
+## No selection state or edit mode is needed.  Each edit is centered on the vertex nearest the requested point, like selecting it and pressing alt-S.
+## Vertices are picked from the mesh as it is before any of the edits, as the tutorial's edit mode selection did.
+## By default all edits share one set of normals and go in one pass.
+## Set sequential to recompute normals between edits, which is what running the operator once per edit does when edits overlap.
+## Parameters:
+##  dataItem -- the 'MESH' to deform.
+##  edits -- a list of (center, value, radius, falloff) tuples.
+##  sequential -- apply the edits one after another instead of all at once.
+def ShrinkFattenMesh(dataItem, edits, sequential=False):
+    coords = ReadVertexCoordinates(dataItem).astype(np.float64)
+    faces = ReadFaceArrays(dataItem)
+    if len(edits) == 0:
+        return(dataItem)
+
+    indices, distances = FindNearestVertices(dataItem, [edit[0] for edit in edits], 1)
+    offsets = np.zeros(len(coords))
+    for index, (center, value, radius, falloff) in zip(indices[:, 0], edits):
+        if sequential and offsets.any():
+            coords = ShrinkFatten(coords, VertexNormals(coords, *faces), offsets)
+            offsets[:] = 0.0
+        distances = np.linalg.norm(coords - coords[index], axis=1)
+        offsets += FalloffWeights(distances, radius, falloff) * value
+
+    WriteVertexCoordinates(dataItem, ShrinkFatten(coords, VertexNormals(coords, *faces), offsets))
+    return(dataItem)
+
+## VertexNeighbours builds a compressed adjacency list from the face topology: the neighbours of vertex v are indices[offsets[v] : offsets[v + 1]].
+def VertexNeighbours(vertexCount, loopStarts, loopTotals, loopVertices):
+    faceOfLoop = np.repeat(np.arange(len(loopStarts)), loopTotals)
+    nextLoop = loopStarts[faceOfLoop] + (np.arange(len(loopVertices)) - loopStarts[faceOfLoop] + 1) % loopTotals[faceOfLoop]
+    edges = np.stack((loopVertices, loopVertices[nextLoop]), axis=1)
+    edges = np.unique(np.sort(edges, axis=1), axis=0)
+    pairs = np.concatenate((edges, edges[:, ::-1]))
+    pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+    offsets = np.zeros(vertexCount + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs[:, 0], minlength=vertexCount), out=offsets[1:])
+    return(offsets, pairs[:, 1])
+
+## NeighbourAverages gives the mean position of each listed vertex's neighbours -- the target the smooth brush pulls towards.
+def NeighbourAverages(coords, offsets, indices, vertices):
+    counts = offsets[vertices + 1] - offsets[vertices]
+    starts = np.repeat(offsets[vertices] - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+    gathered = coords[indices[starts + np.arange(counts.sum())]]
+    sums = np.zeros((len(vertices), 3))
+    np.add.at(sums, np.repeat(np.arange(len(vertices)), counts), gathered)
+    averages = coords[vertices].copy()
+    hasNeighbours = counts > 0
+    averages[hasNeighbours] = sums[hasNeighbours] / counts[hasNeighbours, None]
+    return(averages)
+
+## SculptBrushes are the kernels the sculpt engine knows how to apply.
+class SculptBrushes(Enum):
+    Draw = 'DRAW'       ## push vertices along the average normal under the brush
+    Inflate = 'INFLATE' ## push vertices along their own normals
+    Smooth = 'SMOOTH'   ## pull vertices towards the average of their neighbours
+    Crease = 'CREASE'   ## pinch vertices towards the stroke and push them in, for sharp grooves
+
+## SculptStroke is a brush path: an (n, 3) array of points, each with its own pressure and radius.
+class SculptStroke():
+    ## Parameters:
+    ##  points -- an (n, 3) array, or list of xyz tuples, of brush positions in the mesh's local space.
+    ##  pressure -- one pressure for the whole stroke, or one per point.  1 is full strength.
+    ##  radius -- one brush radius for the whole stroke, or one per point, in meters.
+    def __init__(self, points, pressure=1.0, radius=0.01) -> None:
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.pressure = np.broadcast_to(np.asarray(pressure, dtype=np.float64), (len(self.points),))
+        self.radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), (len(self.points),))
+        pass
+
+    ## Chunks splits the stroke into pieces of at most chunkSize points, so long strokes stream through with bounded memory.
+    def Chunks(self, chunkSize=256):
+        for start in range(0, len(self.points), chunkSize):
+            end = start + chunkSize
+            yield(SculptStroke(self.points[start:end], self.pressure[start:end], self.radius[start:end]))
+
+## SculptEngine sculpts a mesh from code instead of through the viewport: the same stroke always gives the same result.
+## It reads the mesh into arrays once, finds the vertices under each brush dab with the cached KD tree, and only writes back on Commit.
+## Dabs within one chunk are applied together, chunks are applied one after another.
+class SculptEngine():
+    ## Parameters:
+    ##  dataItem -- the 'MESH' to sculpt.
+    ##  falloff -- the ProportionalFalloffs curve used across the brush radius.
+    def __init__(self, dataItem, falloff=ProportionalFalloffs.Smooth) -> None:
+        self.dataItem = dataItem
+        self.falloff = falloff
+        self.restCoords = ReadVertexCoordinates(dataItem).astype(np.float64)
+        self.coords = self.restCoords.copy()
+        self.faces = ReadFaceArrays(dataItem)
+        self.neighbourOffsets, self.neighbourIndices = VertexNeighbours(len(self.coords), *self.faces)
+        self.tree = SharedKDTreeCache.GetTree(dataItem) ## indexes the rest positions -- see VerticesUnderStroke
+        self.normals = VertexNormals(self.coords, *self.faces)
+        self.maxDisplacement = 0.0
+        pass
+
+    ## VerticesUnderStroke finds every (dab, vertex) pair where the vertex is inside the dab's radius.
+    ## The tree indexes the rest positions, so we search a little wider by how far anything has moved, then measure with the current positions.
+    def VerticesUnderStroke(self, stroke):
+        dabs = []
+        vertices = []
+        for dab, (pt, radius) in enumerate(zip(stroke.points.tolist(), stroke.radius.tolist())):
+            found = self.tree.find_range(pt, radius + self.maxDisplacement)
+            dabs.extend([dab] * len(found))
+            vertices.extend([index for co, index, distance in found])
+        dabs = np.array(dabs, dtype=np.int64)
+        vertices = np.array(vertices, dtype=np.int64)
+        distances = np.linalg.norm(self.coords[vertices] - stroke.points[dabs], axis=1)
+        inside = distances <= stroke.radius[dabs]
+        return(dabs[inside], vertices[inside], distances[inside])
+
+    ## ApplyStroke runs a brush along a stroke.
+    ## Parameters:
+    ##  stroke -- a SculptStroke.
+    ##  brush -- one of SculptBrushes.
+    ##  strength -- how hard the brush pushes.  Draw, inflate and crease move up to strength * radius per dab.
+    ##  direction -- 1 adds material, -1 subtracts it (holding ctrl in the viewport).
+    ##  snapToSurface -- move each stroke point onto the nearest vertex first, so strokes can be drawn roughly.
+    ##  chunkSize -- how many dabs to apply together.
+    def ApplyStroke(self, stroke, brush=SculptBrushes.Draw, strength=0.5, direction=1, snapToSurface=False, chunkSize=256):
+        if snapToSurface:
+            indices, distances = QueryKDTree(self.tree, stroke.points, 1)
+            stroke = SculptStroke(self.coords[indices[:, 0]], stroke.pressure, stroke.radius)
+
+        for chunk in stroke.Chunks(chunkSize):
+            dabs, vertices, distances = self.VerticesUnderStroke(chunk)
+            if len(vertices) == 0:
+                continue
+            weights = FalloffWeights(distances, chunk.radius[dabs], self.falloff) * chunk.pressure[dabs] * strength
+            reach = chunk.radius[dabs] * direction
+
+            match brush:
+                case SculptBrushes.Draw:
+                    dabNormals = np.zeros((len(chunk.points), 3))
+                    np.add.at(dabNormals, dabs, self.normals[vertices] * weights[:, None])
+                    dabNormals /= np.maximum(np.linalg.norm(dabNormals, axis=1), 1e-30)[:, None]
+                    moves = dabNormals[dabs] * (weights * reach)[:, None]
+                case SculptBrushes.Inflate:
+                    moves = self.normals[vertices] * (weights * reach)[:, None]
+                case SculptBrushes.Smooth:
+                    # overlapping dabs each pull towards the average -- share one capped move between them by weight, so a vertex
+                    # under many dabs goes to the weighted average of their targets and never past it.
+                    averages = NeighbourAverages(self.coords, self.neighbourOffsets, self.neighbourIndices, vertices)
+                    totalWeights = np.bincount(vertices, weights=weights, minlength=len(self.coords))[vertices]
+                    share = weights / np.maximum(totalWeights, 1e-30) * np.minimum(totalWeights, 1.0)
+                    moves = (averages - self.coords[vertices]) * share[:, None]
+                case SculptBrushes.Crease:
+                    pinch = (chunk.points[dabs] - self.coords[vertices]) * (weights * 0.5)[:, None]
+                    moves = pinch - self.normals[vertices] * (weights * reach)[:, None]
+
+            displacement = SumRows(vertices, moves, len(self.coords))
+            self.coords += displacement
+            # the biggest move this chunk bounds how much further anything got from rest, without measuring every vertex.
+            self.maxDisplacement += float(np.linalg.norm(displacement[vertices], axis=1).max())
+
+        self.maxDisplacement = float(np.linalg.norm(self.coords - self.restCoords, axis=1).max()) if len(self.coords) > 0 else 0.0
+        # normals drift as we push vertices around -- refresh them once per stroke rather than once per dab.
+        self.normals = VertexNormals(self.coords, *self.faces)
+        return(self)
+
+    ## Commit writes the sculpted positions back to the mesh.
+    def Commit(self):
+        WriteVertexCoordinates(self.dataItem, self.coords)
+        return(self.dataItem)
+
+## BVHTreeCache keeps one BVH tree per mesh for ray casts and nearest-surface lookups, rebuilt only when the mesh changes.
+## It's versioned like the KD tree cache, plus the face count, as the surface depends on the faces too.
+class BVHTreeCache():
+    def __init__(self) -> None:
+        self.trees = {} ## pointer -> (version, BVH tree)
+        self.hits = 0
+        self.misses = 0
+        pass
+
+    ## GetTree gives back a BVH tree of the mesh's faces in the mesh's local space.
+    ## Parameters:
+    ##  dataItem -- the 'MESH' we want a BVH tree for.
+    def GetTree(self, dataItem):
+        key = dataItem.as_pointer()
+        coords = ReadVertexCoordinates(dataItem)
+        loopStarts, loopTotals, loopVertices = ReadFaceArrays(dataItem)
+        version = (len(coords), len(loopStarts), zlib.crc32(coords.tobytes()), zlib.crc32(loopVertices.tobytes()))
+
+        cached = self.trees.get(key)
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            return(cached[1])
+
+        self.misses += 1
+        faces = [face.tolist() for face in np.split(loopVertices, loopStarts[1:])] if len(loopStarts) > 0 else []
+        bvh = mathutils.bvhtree.BVHTree.FromPolygons(coords.tolist(), faces)
+        self.trees[key] = (version, bvh)
+        return(bvh)
+
+    ## Invalidate drops the cached tree for a mesh, or every cached tree if no mesh is given.
+    def Invalidate(self, dataItem=None):
+        if dataItem is None:
+            self.trees.clear()
+        else:
+            self.trees.pop(dataItem.as_pointer(), None)
+        pass
+
+    ## Stats reports how often the cache saved us a rebuild.
+    def Stats(self):
+        return({'hits': self.hits, 'misses': self.misses, 'meshes': len(self.trees)})
+
+## One BVH cache shared by every script that loads this library.
+SharedBVHTreeCache = BVHTreeCache()
+
+## ProjectionModes are the ways a point can find its spot on a target surface.
+class ProjectionModes(Enum):
+    Nearest = 'NEAREST'          ## the closest point on the surface, like the shrinkwrap modifier's default
+    AlongNormal = 'ALONG_NORMAL' ## cast a ray along the point's normal, both ways, and take the closer hit
+
+## ProjectPoints projects an (n, 3) array of points onto the surface in a BVH tree, in one call.
+## Returns (projected, hit), where projected is an (n, 3) array and hit is a boolean mask of points that found the surface.
+## Points that miss stay where they were.
+## Parameters:
+##  bvh -- the target surface's BVH tree.
+##  points -- an (n, 3) array of points in the tree's space.
+##  mode -- one of ProjectionModes.
+##  normals -- an (n, 3) array of directions, needed for AlongNormal.
+##  offset -- how far to stay off the surface, along the surface normal.
+##  blend -- 1 snaps fully onto the surface, 0 leaves points alone.  One number or one per point.
+##  maxDistance -- ignore surface hits further away than this.
+def ProjectPoints(bvh, points, mode=ProjectionModes.Nearest, normals=None, offset=0.0, blend=1.0, maxDistance=1.0e10):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    targets = points.copy()
+    surfaceNormals = np.zeros_like(points)
+    hit = np.zeros(len(points), dtype=bool)
+
+    match mode:
+        case ProjectionModes.Nearest:
+            for i, pt in enumerate(points.tolist()):
+                location, normal, index, distance = bvh.find_nearest(pt, maxDistance)
+                if location is not None:
+                    targets[i] = location
+                    surfaceNormals[i] = normal
+                    hit[i] = True
+        case ProjectionModes.AlongNormal:
+            directions = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+            for i, (pt, direction) in enumerate(zip(points.tolist(), directions.tolist())):
+                best = None
+                for sign in (1.0, -1.0):
+                    location, normal, index, distance = bvh.ray_cast(pt, [sign * d for d in direction], maxDistance)
+                    if location is not None and (best is None or distance < best[2]):
+                        best = (location, normal, distance)
+                if best is not None:
+                    targets[i] = best[0]
+                    surfaceNormals[i] = best[1]
+                    hit[i] = True
+
+    targets += surfaceNormals * offset
+    blend = np.broadcast_to(np.asarray(blend, dtype=np.float64), (len(points),))
+    projected = points + (targets - points) * (blend * hit)[:, None]
+    return(projected, hit)
+
+## ProjectMeshOntoMesh conforms one mesh object onto another's surface without a shrinkwrap modifier apply round-trip.
+## The target's BVH tree comes from the shared cache, and the source vertices are moved into the target's space and back, so object transforms are respected.
+## Returns the hit mask.
+## Parameters:
+##  sourceObject -- the object whose vertices move, like the icing.
+##  targetObject -- the object whose surface we project onto, like the donut.
+##  mode, offset, blend, maxDistance -- see ProjectPoints.
+##  selection -- optional vertex indices or boolean mask to project only part of the source.
+def ProjectMeshOntoMesh(sourceObject, targetObject, mode=ProjectionModes.Nearest, offset=0.0, blend=1.0, maxDistance=1.0e10, selection=None):
+    source = sourceObject.data
+    bvh = SharedBVHTreeCache.GetTree(targetObject.data)
+
+    toTarget = np.array(targetObject.matrix_world.inverted() @ sourceObject.matrix_world)
+    coords = ReadVertexCoordinates(source).astype(np.float64)
+    points = coords @ toTarget[:3, :3].T + toTarget[:3, 3]
+
+    normals = None
+    if mode == ProjectionModes.AlongNormal:
+        normals = VertexNormals(coords, *ReadFaceArrays(source)) @ np.linalg.inv(toTarget[:3, :3])
+        normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-30)[:, None]
+
+    mask = SelectionMask(len(coords), selection)
+    blend = np.broadcast_to(np.asarray(blend, dtype=np.float64), (len(coords),)) * mask
+    projected, hit = ProjectPoints(bvh, points, mode, normals, offset, blend, maxDistance)
+
+    back = np.linalg.inv(toTarget)
+    WriteVertexCoordinates(source, projected @ back[:3, :3].T + back[:3, 3])
+    return(hit & mask)
+
+## ExtractFaces cuts the faces in faceMask out of a mesh's arrays, keeping only the vertices they use.
+## Returns (coords, loopStarts, loopTotals, loopVertices, vertexMap), where vertexMap[i] is the original index of new vertex i.
+def ExtractFaces(coords, loopStarts, loopTotals, loopVertices, faceMask):
+    faceMask = np.asarray(faceMask, dtype=bool)
+    keptLoops = np.repeat(faceMask, loopTotals)
+    vertexMap, newLoopVertices = np.unique(loopVertices[keptLoops], return_inverse=True)
+    newLoopTotals = loopTotals[faceMask]
+    newLoopStarts = np.concatenate(([0], np.cumsum(newLoopTotals)[:-1])).astype(np.int64)
+    return(coords[vertexMap], newLoopStarts, newLoopTotals, newLoopVertices.astype(np.int64), vertexMap)
+
+## WriteMeshArrays replaces all of a mesh's geometry with new vertex and face arrays, using foreach_set -- no operators, context or selection.
+## Edges are worked out from the faces.  Loose edges, like a circle's, can be passed in as an (m, 2) array.
+## The mesh has to be in object mode.
+## Parameters:
+##  mesh -- the 'MESH' datablock to fill.
+##  coords -- an (n, 3) array of vertex positions.
+##  loopStarts, loopTotals, loopVertices -- the face topology, like ReadFaceArrays gives.
+##  edges -- an optional (m, 2) array of extra edges.
+##  smooth -- shade the faces smooth: True/False for every face, or one flag per face.
+##  materials -- optional material index for each face.
+def WriteMeshArrays(mesh, coords, loopStarts=(), loopTotals=(), loopVertices=(), edges=None, smooth=False, materials=None):
+    mesh.clear_geometry()
+    coords = np.ascontiguousarray(coords, dtype=np.float32).reshape(-1, 3)
+    mesh.vertices.add(len(coords))
+    mesh.vertices.foreach_set("co", coords.ravel())
+
+    if edges is not None and len(edges) > 0:
+        edges = np.ascontiguousarray(edges, dtype=np.int32).reshape(-1, 2)
+        mesh.edges.add(len(edges))
+        mesh.edges.foreach_set("vertices", edges.ravel())
+
+    if len(loopStarts) > 0:
+        mesh.loops.add(len(loopVertices))
+        mesh.loops.foreach_set("vertex_index", np.ascontiguousarray(loopVertices, dtype=np.int32))
+        mesh.polygons.add(len(loopStarts))
+        mesh.polygons.foreach_set("loop_start", np.ascontiguousarray(loopStarts, dtype=np.int32))
+        if not mesh.polygons.bl_rna.properties["loop_total"].is_readonly: ## blender 4 works the totals out from the starts
+            mesh.polygons.foreach_set("loop_total", np.ascontiguousarray(loopTotals, dtype=np.int32))
+        mesh.polygons.foreach_set("use_smooth", np.ascontiguousarray(np.broadcast_to(smooth, (len(loopStarts),)), dtype=bool))
+        if materials is not None:
+            mesh.polygons.foreach_set("material_index", np.ascontiguousarray(materials, dtype=np.int32))
+
+    mesh.update(calc_edges=True)
+    mesh.validate()
+    return(mesh)
+
+## NewMeshFromArrays creates a new mesh datablock straight from vertex and face arrays.  See WriteMeshArrays for the parameters.
+def NewMeshFromArrays(name, coords, loopStarts=(), loopTotals=(), loopVertices=(), edges=None, smooth=False):
+    mesh = bpy.data.meshes.new(name)
+    return(WriteMeshArrays(mesh, coords, loopStarts, loopTotals, loopVertices, edges, smooth))
+
+## PerlinNoise is seeded, repeatable 3D gradient noise (Ken Perlin's improved noise) evaluated for whole arrays of points at once.
+## The same seed always gives the same surface, unlike select_random plus operator transforms.
+class PerlinNoise():
+    ## the 12 cube edge directions improved perlin noise uses as gradients.
+    gradients = np.array([[1, 1, 0], [-1, 1, 0], [1, -1, 0], [-1, -1, 0],
+                          [1, 0, 1], [-1, 0, 1], [1, 0, -1], [-1, 0, -1],
+                          [0, 1, 1], [0, -1, 1], [0, 1, -1], [0, -1, -1]], dtype=np.float32)
+
+    def __init__(self, seed=0) -> None:
+        rng = np.random.default_rng(seed)
+        permutation = rng.permutation(256)
+        self.permutation = np.concatenate((permutation, permutation)).astype(np.intp)
+        self.offset = rng.uniform(0.0, 256.0, 3) ## moves the lattice, so different seeds don't all pass through 0 at the origin
+
+        # look the gradient up straight from the hash, one table per axis, so evaluating is a few gathers and multiply-adds.
+        hashedGradients = self.gradients[self.permutation % 12]
+        self.gradientX = hashedGradients[:, 0].copy()
+        self.gradientY = hashedGradients[:, 1].copy()
+        self.gradientZ = hashedGradients[:, 2].copy()
+        pass
+
+    ## Evaluate gives the noise value, roughly -1 to 1, at every row of an (n, 3) array of points.
+    def Evaluate(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3) + self.offset
+        cell = np.floor(points)
+        local = (points - cell).astype(np.float32)
+        cell = cell.astype(np.intp) & 255
+        p = self.permutation
+
+        # hash the corners of each point's lattice cell.
+        a = p[cell[:, 0]] + cell[:, 1]
+        b = p[cell[:, 0] + 1] + cell[:, 1]
+        aa = p[a] + cell[:, 2]
+        ab = p[a + 1] + cell[:, 2]
+        ba = p[b] + cell[:, 2]
+        bb = p[b + 1] + cell[:, 2]
+
+        x, y, z = local[:, 0], local[:, 1], local[:, 2]
+        x1, y1, z1 = x - 1.0, y - 1.0, z - 1.0
+        def Corner(hashed, cx, cy, cz):
+            hashed = p[hashed]
+            return(self.gradientX[hashed] * cx + self.gradientY[hashed] * cy + self.gradientZ[hashed] * cz)
+
+        # blend the 8 corners together along x, then y, then z.
+        fade = local * local * local * (local * (local * 6.0 - 15.0) + 10.0)
+        u, v, w = fade[:, 0], fade[:, 1], fade[:, 2]
+        def Lerp(t, low, high):
+            return(low + t * (high - low))
+        bottom = Lerp(v, Lerp(u, Corner(aa, x, y, z), Corner(ba, x1, y, z)), Lerp(u, Corner(ab, x, y1, z), Corner(bb, x1, y1, z)))
+        top = Lerp(v, Lerp(u, Corner(aa + 1, x, y, z1), Corner(ba + 1, x1, y, z1)), Lerp(u, Corner(ab + 1, x, y1, z1), Corner(bb + 1, x1, y1, z1)))
+        return(Lerp(w, bottom, top).astype(np.float64))
+
+    ## Fractal sums octaves of noise (fBm): each octave is lacunarity times finer and gain times weaker than the last.
+    ## The result is scaled back to roughly -1 to 1.
+    def Fractal(self, points, octaves=4, lacunarity=2.0, gain=0.5):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        total = np.zeros(len(points))
+        amplitude = 1.0
+        frequency = 1.0
+        norm = 0.0
+        for octave in range(octaves):
+            total += amplitude * self.Evaluate(points * frequency)
+            norm += amplitude
+            amplitude *= gain
+            frequency *= lacunarity
+        return(total / norm)
+
+## NoiseDisplaceMesh roughens a mesh by moving every vertex along its normal by seeded fractal noise -- Andrew's irregular dough, from code.
+## Parameters:
+##  dataItem -- the 'MESH' to displace.
+##  amplitude -- the largest distance a vertex moves, in meters.
+##  frequency -- how many noise bumps per meter.  Higher is finer.
+##  octaves, lacunarity, gain -- see PerlinNoise.Fractal.  1 octave is plain perlin noise.
+##  seed -- the same seed gives the same bumps every time.
+##  selection -- optional vertex indices or boolean mask, or an array of per-vertex weights, to limit the displacement.
+def NoiseDisplaceMesh(dataItem, amplitude=0.001, frequency=50.0, octaves=4, lacunarity=2.0, gain=0.5, seed=0, selection=None):
+    coords = ReadVertexCoordinates(dataItem).astype(np.float64)
+    normals = VertexNormals(coords, *ReadFaceArrays(dataItem))
+    offsets = amplitude * PerlinNoise(seed).Fractal(coords * frequency, octaves, lacunarity, gain)
+    if selection is not None:
+        selection = np.asarray(selection)
+        weights = selection if selection.dtype.kind == 'f' else SelectionMask(len(coords), selection)
+        offsets *= weights
+    WriteVertexCoordinates(dataItem, ShrinkFatten(coords, normals, offsets))
+    return(dataItem)
+
+## attribute_layouts maps a mesh attribute data type to (the foreach property, components per element, numpy dtype).
+attribute_layouts = {
+    'FLOAT': ('value', 1, np.float32),
+    'INT': ('value', 1, np.int32),
+    'INT8': ('value', 1, np.int8),
+    'BOOLEAN': ('value', 1, bool),
+    'FLOAT2': ('vector', 2, np.float32),
+    'INT32_2D': ('value', 2, np.int32),
+    'FLOAT_VECTOR': ('vector', 3, np.float32),
+    'FLOAT_COLOR': ('color', 4, np.float32),
+    'BYTE_COLOR': ('color', 4, np.float32),
+    'QUATERNION': ('value', 4, np.float32),
+}
+
+## AttributeDomainSize is how many elements an attribute on the given domain has.
+def AttributeDomainSize(dataItem, domain):
+    match domain:
+        case 'POINT':
+            return(len(dataItem.vertices))
+        case 'EDGE':
+            return(len(dataItem.edges))
+        case 'FACE':
+            return(len(dataItem.polygons))
+        case 'CORNER':
+            return(len(dataItem.loops))
+    return(None)
+
+## SnapshotArrays reads everything a mesh snapshot stores -- positions, normals, faces, the active UV map and other attributes -- into numpy arrays.
+## Call it in object mode, as UVs and attributes aren't kept up to date in edit mode.
+## Returns (arrays, metadata), ready for ImranMeshSnapshot.SaveMeshSnapshot.
+def SnapshotArrays(dataItem):
+    loopStarts, loopTotals, loopVertices = ReadFaceArrays(dataItem)
+    arrays = {
+        'co': ReadVertexCoordinates(dataItem),
+        'normal': ReadVertexNormals(dataItem),
+        'loopStarts': loopStarts.astype(np.int32),
+        'loopTotals': loopTotals.astype(np.int32),
+        'loopVertices': loopVertices.astype(np.int32),
+    }
+    metadata = {'name': dataItem.name, 'attributes': {}}
+
+    if dataItem.uv_layers.active is not None:
+        uv = np.empty(len(dataItem.loops) * 2, dtype=np.float32)
+        dataItem.uv_layers.active.data.foreach_get("uv", uv)
+        arrays['uv'] = uv.reshape(-1, 2)
+        metadata['uvName'] = dataItem.uv_layers.active.name
+
+    uvNames = set(layer.name for layer in dataItem.uv_layers)
+    for attribute in dataItem.attributes:
+        # skip blender's internal attributes, positions and UV maps, which are stored above.
+        if attribute.name.startswith(".") or attribute.name == "position" or attribute.name in uvNames:
+            continue
+        layout = attribute_layouts.get(attribute.data_type)
+        size = AttributeDomainSize(dataItem, attribute.domain)
+        if layout is None or size is None:
+            continue
+        values = np.empty(size * layout[1], dtype=layout[2])
+        attribute.data.foreach_get(layout[0], values)
+        key = "attr." + attribute.domain + "." + attribute.name
+        arrays[key] = values.reshape(size, layout[1]) if layout[1] > 1 else values
+        metadata['attributes'][key] = {'name': attribute.name, 'domain': attribute.domain, 'type': attribute.data_type}
+    return(arrays, metadata)
+
+## SaveMeshSnapshot writes a mesh to a snapshot file that ImranMeshSnapshot can memory-map later, with or without blender.
+## Parameters:
+##  dataItem -- the 'MESH' to save.
+##  path -- where to write it.  .imsnap is a good extension.
+##  metadata -- optional extra information to keep with the mesh.
+def SaveMeshSnapshot(dataItem, path, metadata=None):
+    arrays, meshMetadata = SnapshotArrays(dataItem)
+    meshMetadata.update(metadata or {})
+    return(ms.SaveMeshSnapshot(path, arrays, meshMetadata))
+
+## MeshFromSnapshot builds a new mesh datablock from a snapshot, or a path to one, without operators.
+def MeshFromSnapshot(snapshot, name=None):
+    if isinstance(snapshot, str):
+        snapshot = ms.LoadMeshSnapshot(snapshot)
+    metadata = snapshot.metadata
+    mesh = NewMeshFromArrays(name or metadata.get('name', "Snapshot"), snapshot['co'], snapshot['loopStarts'], snapshot['loopTotals'], snapshot['loopVertices'])
+
+    if 'uv' in snapshot:
+        layer = mesh.uv_layers.new(name=metadata.get('uvName', "UVMap"))
+        layer.data.foreach_set("uv", np.ascontiguousarray(snapshot['uv']).ravel())
+
+    for key, description in metadata.get('attributes', {}).items():
+        layout = attribute_layouts[description['type']]
+        attribute = mesh.attributes.get(description['name'])
+        if attribute is None:
+            attribute = mesh.attributes.new(description['name'], description['type'], description['domain'])
+        attribute.data.foreach_set(layout[0], np.ascontiguousarray(snapshot[key]).ravel())
+    mesh.update()
+    return(mesh)
+
+## NewPrimitiveObject creates a primitive object straight from generated arrays -- no operator, context, selection or undo push.
+## The object is named after its mesh, linked into the collection and handed back.
+## Parameters:
+##  name -- the name for the mesh and object.  Blender adds .001 and so on if it's taken.
+##  generator -- one of the ImranMeshPrimitives generators, like mp.Torus.
+##  location -- where to put the object.
+##  collection -- the collection to link the object into.  Defaults to the active collection, where the operators put things.
+##  smooth -- shade the faces smooth.
+##  parameters -- passed to the generator, like radius=2.
+def NewPrimitiveObject(name, generator, location=(0, 0, 0), collection=None, smooth=False, **parameters):
+    coords, loopStarts, loopTotals, loopVertices, edges = generator(**parameters)
+    mesh = NewMeshFromArrays(name, coords, loopStarts, loopTotals, loopVertices, edges, smooth)
+    newObject = bpy.data.objects.new(mesh.name, mesh)
+    newObject.location = location
+    (collection or bpy.context.collection).objects.link(newObject)
+    return(newObject)
+
+## SubdivisionMethods are the ways SubdivideArrays can place the new vertices.  The values match the subdivision modifier's.
+class SubdivisionMethods(Enum):
+    Simple = 'SIMPLE'               ## split the faces but keep the shape
+    CatmullClark = 'CATMULL_CLARK'  ## split the faces and smooth the shape
+
+## SumRows adds up the rows of values that share an index, giving back a (count, columns) array.  bincount per axis is much quicker than np.add.at.
+def SumRows(indices, values, count):
+    return(np.stack([np.bincount(indices, weights=values[:, axis], minlength=count) for axis in range(values.shape[1])], axis=1))
+
+## MeshAdjacency is the edge and face adjacency subdivision needs, worked out once from the face arrays.
+class MeshAdjacency():
+    def __init__(self, vertexCount, loopStarts, loopTotals, loopVertices) -> None:
+        self.faceOfLoop = np.repeat(np.arange(len(loopStarts)), loopTotals)
+        localIndex = np.arange(len(loopVertices)) - loopStarts[self.faceOfLoop]
+        self.nextLoop = loopStarts[self.faceOfLoop] + (localIndex + 1) % loopTotals[self.faceOfLoop]
+        self.previousLoop = loopStarts[self.faceOfLoop] + (localIndex - 1) % loopTotals[self.faceOfLoop]
+
+        # every loop walks one edge, from its vertex to the next one in the face.
+        # each edge gets a single integer key, as unique on one column is much quicker than on rows.
+        nextVertices = loopVertices[self.nextLoop]
+        keys = np.minimum(loopVertices, nextVertices).astype(np.int64) * vertexCount + np.maximum(loopVertices, nextVertices)
+        keys, self.edgeOfLoop = np.unique(keys, return_inverse=True)
+        self.edges = np.stack((keys // vertexCount, keys % vertexCount), axis=1)
+        self.edgeOfLoop = self.edgeOfLoop.ravel()
+        self.edgeFaceCount = np.bincount(self.edgeOfLoop, minlength=len(self.edges))
+        self.boundaryEdge = self.edgeFaceCount == 1
+
+        self.valence = np.bincount(self.edges.ravel(), minlength=vertexCount)
+        self.vertexFaceCount = np.bincount(loopVertices, minlength=vertexCount)
+        self.boundaryVertex = np.bincount(self.edges[self.boundaryEdge].ravel(), minlength=vertexCount) > 0
+        pass
+
+## LimitPositions moves every vertex of an all-quad mesh to where Catmull-Clark subdivision would take it after infinitely many levels.
+## Interior vertices of valence n go to (n*n*P + 4*(edge neighbours) + (diagonal neighbours)) / (n*(n + 5)), boundary vertices to
+## (previous + 4*P + next) / 6 along the boundary curve, and loose vertices stay put.
+## Parameters:
+##  coords -- an (n, 3) array of vertex positions.
+##  loopStarts, loopTotals, loopVertices -- the face topology.  Every face must be a quad, as after a level of SubdivideArrays.
+def LimitPositions(coords, loopStarts, loopTotals, loopVertices):
+    adjacency = MeshAdjacency(len(coords), loopStarts, loopTotals, loopVertices)
+    edgeSums = SumRows(adjacency.edges.ravel(), coords[adjacency.edges[:, ::-1].ravel()], len(coords))
+    diagonalSums = SumRows(loopVertices, coords[loopVertices[adjacency.nextLoop[adjacency.nextLoop]]], len(coords))
+    valence = np.maximum(adjacency.valence, 1)[:, None]
+    limits = (valence * valence * coords + 4.0 * edgeSums + diagonalSums) / (valence * (valence + 5.0))
+
+    boundaryEdges = adjacency.edges[adjacency.boundaryEdge]
+    boundarySums = SumRows(boundaryEdges.ravel(), coords[boundaryEdges[:, ::-1].ravel()], len(coords))
+    boundary = adjacency.boundaryVertex
+    limits[boundary] = (4.0 * coords[boundary] + boundarySums[boundary]) / 6.0
+
+    loose = adjacency.vertexFaceCount == 0
+    limits[loose] = coords[loose]
+    return(limits)
+
+## SubdivideArrays splits every n-gon into n quads, one level at a time, straight on the mesh arrays.
+## Catmull-Clark uses the standard face/edge/vertex point rules, with boundary edges and vertices kept on the boundary curve.
+## Returns (coords, loopStarts, loopTotals, loopVertices, parentFaces), where parentFaces gives each new face's face in the input mesh.
+## Parameters:
+##  coords -- an (n, 3) array of vertex positions.
+##  loopStarts, loopTotals, loopVertices -- the face topology, like ReadFaceArrays gives.
+##  method -- one of SubdivisionMethods.
+##  levels -- how many times to subdivide.  Each level roughly quadruples the face count.
+##  limitSurface -- for Catmull-Clark, put the final vertices on the limit surface, like the modifier's "Use Limit Surface" (on by default there too).
+##   Turn it off for the plain subdivision step, which sits slightly outside the limit surface.
+def SubdivideArrays(coords, loopStarts, loopTotals, loopVertices, method=SubdivisionMethods.CatmullClark, levels=1, limitSurface=True):
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+    parentFaces = np.arange(len(loopStarts))
+    for level in range(levels):
+        adjacency = MeshAdjacency(len(coords), loopStarts, loopTotals, loopVertices)
+        faceOfLoop = adjacency.faceOfLoop
+
+        facePoints = SumRows(faceOfLoop, coords[loopVertices], len(loopStarts)) / loopTotals[:, None]
+        midpoints = coords[adjacency.edges].mean(axis=1)
+
+        if method == SubdivisionMethods.Simple:
+            vertexPoints = coords
+            edgePoints = midpoints
+        else:
+            # edge points average the edge's ends and the face points either side.  Boundary edges stay at their midpoint.
+            edgeFaceSums = SumRows(adjacency.edgeOfLoop, facePoints[faceOfLoop], len(adjacency.edges))
+            edgePoints = midpoints.copy()
+            interior = ~adjacency.boundaryEdge
+            edgePoints[interior] = (coords[adjacency.edges[interior]].sum(axis=1) + edgeFaceSums[interior]) / (2.0 + adjacency.edgeFaceCount[interior, None])
+
+            # interior vertices move to (F + 2R + (n - 3)P) / n.
+            faceAverage = SumRows(loopVertices, facePoints[faceOfLoop], len(coords)) / np.maximum(adjacency.vertexFaceCount, 1)[:, None]
+            edgeAverage = SumRows(adjacency.edges.ravel(), np.repeat(midpoints, 2, axis=0), len(coords))
+            valence = np.maximum(adjacency.valence, 1)[:, None]
+            edgeAverage /= valence
+            vertexPoints = (faceAverage + 2.0 * edgeAverage + (valence - 3.0) * coords) / valence
+
+            # boundary vertices move to 3/4 of themselves plus 1/8 of each boundary neighbour.
+            boundaryEdges = adjacency.edges[adjacency.boundaryEdge]
+            boundarySums = SumRows(boundaryEdges.ravel(), coords[boundaryEdges[:, ::-1].ravel()], len(coords))
+            boundary = adjacency.boundaryVertex
+            vertexPoints[boundary] = 0.75 * coords[boundary] + 0.125 * boundarySums[boundary]
+
+            # vertices no face uses stay put.
+            loose = adjacency.vertexFaceCount == 0
+            vertexPoints[loose] = coords[loose]
+
+        # new vertices: the moved originals, then one per edge, then one per face.
+        edgeBase = len(coords)
+        faceBase = edgeBase + len(adjacency.edges)
+        quads = np.stack((loopVertices, edgeBase + adjacency.edgeOfLoop, faceBase + faceOfLoop, edgeBase + adjacency.edgeOfLoop[adjacency.previousLoop]), axis=1)
+
+        coords = np.concatenate((vertexPoints, edgePoints, facePoints))
+        loopTotals = np.full(len(quads), 4, dtype=np.int64)
+        loopStarts = np.arange(len(quads), dtype=np.int64) * 4
+        loopVertices = quads.ravel()
+        parentFaces = parentFaces[faceOfLoop]
+
+    if limitSurface and levels > 0 and method == SubdivisionMethods.CatmullClark:
+        coords = LimitPositions(coords, loopStarts, loopTotals, loopVertices)
+    return(coords, loopStarts, loopTotals, loopVertices, parentFaces)
+
+## SubdivideMesh subdivides a mesh in place, like adding and applying a subdivision modifier with its default settings, but without the modifier stack,
+## selection or mode switches.  Catmull-Clark vertices end up on the limit surface, as the modifier's "Use Limit Surface" puts them.
+## Face smoothing and material indices carry over to the new faces.  UV maps and other attributes aren't carried over.
+## Parameters:
+##  dataItem -- the 'MESH' to subdivide.
+##  method -- one of SubdivisionMethods.
+##  levels -- how many times to subdivide.
+##  limitSurface -- see SubdivideArrays.
+def SubdivideMesh(dataItem, method=SubdivisionMethods.CatmullClark, levels=1, limitSurface=True):
+    coords = ReadVertexCoordinates(dataItem)
+    loopStarts, loopTotals, loopVertices = ReadFaceArrays(dataItem)
+    coords, loopStarts, loopTotals, loopVertices, parentFaces = SubdivideArrays(coords, loopStarts, loopTotals, loopVertices, method, levels, limitSurface)
+
+    if dataItem.is_editmode:
+        # the bmesh owns the geometry in edit mode -- fill a scratch mesh and load the bmesh from it in one go.
+        bm = bmesh.from_edit_mesh(dataItem)
+        smooth = np.array([face.smooth for face in bm.faces], dtype=bool)
+        materials = np.array([face.material_index for face in bm.faces], dtype=np.int32)
+        scratch = WriteMeshArrays(bpy.data.meshes.new(dataItem.name + "_subdivided"), coords, loopStarts, loopTotals, loopVertices, smooth=smooth[parentFaces], materials=materials[parentFaces])
+        bm.clear()
+        bm.from_mesh(scratch)
+        bmesh.update_edit_mesh(dataItem)
+        bpy.data.meshes.remove(scratch)
+        return(dataItem)
+
+    smooth = np.empty(len(dataItem.polygons), dtype=bool)
+    dataItem.polygons.foreach_get("use_smooth", smooth)
+    materials = np.empty(len(dataItem.polygons), dtype=np.int32)
+    dataItem.polygons.foreach_get("material_index", materials)
+    return(WriteMeshArrays(dataItem, coords, loopStarts, loopTotals, loopVertices, smooth=smooth[parentFaces], materials=materials[parentFaces]))
@@ -0,0 +1,115 @@
+## ImranMeshPrimitives computes the vertex and face arrays of blender's basic primitives with numpy, without bpy.
+## Every generator gives back (coords, loopStarts, loopTotals, loopVertices, edges) -- the same layout ImranMeshLib reads and writes.
+## Face f uses the vertices loopVertices[loopStarts[f] : loopStarts[f] + loopTotals[f]], wound so the normals point outward.
+## edges only holds loose edges, like a circle's -- edges of faces are worked out when the mesh is built.
+## Defaults match the bpy.ops.mesh.primitive_*_add operators.
+
+import numpy as np
+
+## FacesFromArray turns an (f, k) array of same-sized faces into (loopStarts, loopTotals, loopVertices).
+def FacesFromArray(faces):
+    faces = np.asarray(faces, dtype=np.int64)
+    loopTotals = np.full(len(faces), faces.shape[1] if faces.ndim == 2 else 0, dtype=np.int64)
+    loopStarts = np.arange(len(faces), dtype=np.int64) * (faces.shape[1] if faces.ndim == 2 else 0)
+    return(loopStarts, loopTotals, faces.ravel())
+
+## JoinFaces concatenates several (loopStarts, loopTotals, loopVertices) face sets into one.
+def JoinFaces(*faceSets):
+    loopTotals = np.concatenate([faces[1] for faces in faceSets]).astype(np.int64)
+    loopVertices = np.concatenate([faces[2] for faces in faceSets]).astype(np.int64)
+    loopStarts = np.concatenate(([0], np.cumsum(loopTotals)[:-1])).astype(np.int64)
+    return(loopStarts, loopTotals, loopVertices)
+
+## NoEdges is the empty loose edge array most primitives give back.
+def NoEdges():
+    return(np.zeros((0, 2), dtype=np.int64))
+
+## Circle is a ring of vertices joined by edges, with no face.
+def Circle(radius=1.0, vertices=32):
+    angles = np.arange(vertices) * (2.0 * np.pi / vertices)
+    coords = np.stack((radius * np.cos(angles), radius * np.sin(angles), np.zeros(vertices)), axis=1)
+    ring = np.arange(vertices)
+    edges = np.stack((ring, (ring + 1) % vertices), axis=1)
+    empty = np.zeros(0, dtype=np.int64)
+    return(coords, empty, empty, empty, edges)
+
+## Cylinder is a tube with radius r and height h, centered on the origin, capped with an n-gon at each end.
+def Cylinder(radius=1.0, depth=2.0, vertices=32):
+    angles = np.arange(vertices) * (2.0 * np.pi / vertices)
+    ring = np.stack((radius * np.cos(angles), radius * np.sin(angles)), axis=1)
+    bottom = np.column_stack((ring, np.full(vertices, -depth / 2.0)))
+    top = np.column_stack((ring, np.full(vertices, depth / 2.0)))
+    coords = np.concatenate((bottom, top))
+
+    index = np.arange(vertices)
+    following = (index + 1) % vertices
+    sides = np.stack((index, following, following + vertices, index + vertices), axis=1)
+    bottomCap = index[::-1][None, :]
+    topCap = (index + vertices)[None, :]
+    loopStarts, loopTotals, loopVertices = JoinFaces(FacesFromArray(sides), FacesFromArray(bottomCap), FacesFromArray(topCap))
+    return(coords, loopStarts, loopTotals, loopVertices, NoEdges())
+
+## UVSphere is a sphere made of rings of vertices, with triangle fans at the poles.
+def UVSphere(radius=1.0, segments=32, ring_count=16):
+    # rings 1 .. ring_count-1 between the poles, each with segments vertices.
+    polar = np.arange(1, ring_count) * (np.pi / ring_count)
+    azimuth = np.arange(segments) * (2.0 * np.pi / segments)
+    sinPolar = np.sin(polar)[:, None]
+    rings = np.stack((sinPolar * np.cos(azimuth), sinPolar * np.sin(azimuth), np.repeat(np.cos(polar)[:, None], segments, axis=1)), axis=2)
+    coords = np.concatenate((rings.reshape(-1, 3), [(0.0, 0.0, 1.0), (0.0, 0.0, -1.0)])) * radius
+    northPole = len(coords) - 2
+    southPole = len(coords) - 1
+
+    segment = np.arange(segments)
+    following = (segment + 1) % segments
+    ringStarts = np.arange(ring_count - 2)[:, None] * segments
+    quads = np.stack((ringStarts + segment, ringStarts + segments + segment, ringStarts + segments + following, ringStarts + following), axis=2).reshape(-1, 4)
+    northFan = np.stack((np.full(segments, northPole), segment, following), axis=1)
+    lastRing = (ring_count - 2) * segments
+    southFan = np.stack((np.full(segments, southPole), lastRing + following, lastRing + segment), axis=1)
+    loopStarts, loopTotals, loopVertices = JoinFaces(FacesFromArray(quads), FacesFromArray(northFan), FacesFromArray(southFan))
+    return(coords, loopStarts, loopTotals, loopVertices, NoEdges())
+
+## IcoSphere is a sphere of evenly spread triangles: an icosahedron split subdivisions - 1 times, like blender's.
+def IcoSphere(radius=1.0, subdivisions=2):
+    golden = (1.0 + 5.0 ** 0.5) / 2.0
+    coords = np.array([[-1, golden, 0], [1, golden, 0], [-1, -golden, 0], [1, -golden, 0],
+                       [0, -1, golden], [0, 1, golden], [0, -1, -golden], [0, 1, -golden],
+                       [golden, 0, -1], [golden, 0, 1], [-golden, 0, -1], [-golden, 0, 1]], dtype=np.float64)
+    triangles = np.array([[0, 11, 5], [0, 5, 1], [0, 1, 7], [0, 7, 10], [0, 10, 11],
+                          [1, 5, 9], [5, 11, 4], [11, 10, 2], [10, 7, 6], [7, 1, 8],
+                          [3, 9, 4], [3, 4, 2], [3, 2, 6], [3, 6, 8], [3, 8, 9],
+                          [4, 9, 5], [2, 4, 11], [6, 2, 10], [8, 6, 7], [9, 8, 1]], dtype=np.int64)
+    coords /= np.linalg.norm(coords, axis=1)[:, None]
+
+    # each split adds a vertex in the middle of every edge and turns every triangle into 4.
+    for split in range(max(subdivisions - 1, 0)):
+        corners = np.concatenate((triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]))
+        edges, edgeOfCorner = np.unique(np.sort(corners, axis=1), axis=0, return_inverse=True)
+        edgeOfCorner = edgeOfCorner.reshape(3, -1).T + len(coords)
+        midpoints = coords[edges].mean(axis=1)
+        coords = np.concatenate((coords, midpoints / np.linalg.norm(midpoints, axis=1)[:, None]))
+        a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+        ab, bc, ca = edgeOfCorner[:, 0], edgeOfCorner[:, 1], edgeOfCorner[:, 2]
+        triangles = np.concatenate((np.stack((a, ab, ca), axis=1), np.stack((b, bc, ab), axis=1), np.stack((c, ca, bc), axis=1), np.stack((ab, bc, ca), axis=1)))
+
+    loopStarts, loopTotals, loopVertices = FacesFromArray(triangles)
+    return(coords * radius, loopStarts, loopTotals, loopVertices, NoEdges())
+
+## Torus is a donut: a ring of minor_segments circles of minor_radius, spun major_radius away from the center.
+## Vertex order and faces follow blender's own torus add-on, so vertex indices line up with primitive_torus_add.
+def Torus(major_radius=1.0, minor_radius=0.25, major_segments=48, minor_segments=12):
+    majorAngles = np.arange(major_segments) * (2.0 * np.pi / major_segments)
+    minorAngles = np.arange(minor_segments) * (2.0 * np.pi / minor_segments)
+    distance = major_radius + np.cos(minorAngles) * minor_radius
+    coords = np.stack((np.cos(majorAngles)[:, None] * distance, np.sin(majorAngles)[:, None] * distance, np.broadcast_to(np.sin(minorAngles) * minor_radius, (major_segments, minor_segments))), axis=2).reshape(-1, 3)
+
+    total = major_segments * minor_segments
+    major = np.repeat(np.arange(major_segments), minor_segments)
+    minor = np.tile(np.arange(minor_segments), major_segments)
+    i1 = np.arange(total)
+    i2 = major * minor_segments + (minor + 1) % minor_segments
+    i3 = (i1 + minor_segments) % total
+    i4 = (i2 + minor_segments) % total
+    loopStarts, loopTotals, loopVertices = FacesFromArray(np.stack((i1, i3, i4, i2), axis=1))
+    return(coords, loopStarts, loopTotals, loopVertices, NoEdges())
@@ -0,0 +1,117 @@
+## ImranMeshSnapshot saves and loads mesh geometry as contiguous typed arrays, so it can be inspected and reused without a blender session.
+## It only needs numpy -- no bpy -- so plain python, analysis scripts and worker processes can all load it.
+##
+## File layout:
+##  8 bytes   -- the magic string b"IMSNAP01"
+##  8 bytes   -- the length of the header, as a little endian unsigned 64 bit integer
+##  header    -- utf-8 JSON: {"arrays": {name: {"dtype", "shape", "offset"}}, "metadata": {...}}
+##  the raw bytes of every array, each starting on a 64 byte boundary, at the offset the header gives.
+##
+## Because every array is raw bytes at a known offset, loading memory-maps the file and hands back numpy views -- nothing is copied or parsed.
+##
+## Array names the mesh library uses:
+##  co (n, 3) float32, normal (n, 3) float32 -- vertex positions and normals
+##  loopStarts, loopTotals (faces,) int32, loopVertices (loops,) int32 -- face topology
+##  uv (loops, 2) float32 -- the active UV map
+##  attr.<DOMAIN>.<name> -- any other mesh attribute, with its data type in the metadata
+
+import json
+import os
+import numpy as np
+
+snapshot_magic = b"IMSNAP01"
+snapshot_alignment = 64
+
+## SaveMeshSnapshot writes a dictionary of numpy arrays, plus some JSON-able metadata, to one snapshot file.
+## The file is written next to the target and renamed into place, so readers never see half a snapshot.
+## Parameters:
+##  path -- where to write the snapshot.  .imsnap is a good extension.
+##  arrays -- a dictionary of name -> numpy array.
+##  metadata -- an optional dictionary of extra information, like the object name.
+def SaveMeshSnapshot(path, arrays, metadata=None):
+    layout = {}
+    offset = 0
+    contiguous = {}
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        contiguous[name] = array
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += -(-array.nbytes // snapshot_alignment) * snapshot_alignment
+
+    # array offsets in the header are relative to the data start, which comes after the padded header.
+    header = json.dumps({'arrays': layout, 'metadata': metadata or {}}).encode("utf-8")
+    dataStart = -(-(len(snapshot_magic) + 8 + len(header)) // snapshot_alignment) * snapshot_alignment
+    header = header + b" " * (dataStart - len(snapshot_magic) - 8 - len(header))
+
+    temporaryPath = path + ".tmp"
+    with open(temporaryPath, "wb") as snapshot:
+        snapshot.write(snapshot_magic)
+        snapshot.write(np.uint64(len(header)).tobytes())
+        snapshot.write(header)
+        for name, array in contiguous.items():
+            snapshot.seek(dataStart + layout[name]['offset'])
+            snapshot.write(array.tobytes())
+        snapshot.truncate(dataStart + offset)
+    os.replace(temporaryPath, path)
+    return(path)
+
+## ReadSnapshotHeader reads just the header of a snapshot, giving back (layout, metadata, dataStart).
+def ReadSnapshotHeader(path):
+    with open(path, "rb") as snapshot:
+        magic = snapshot.read(len(snapshot_magic))
+        if magic != snapshot_magic:
+            raise ValueError(path + " is not a mesh snapshot")
+        headerLength = int(np.frombuffer(snapshot.read(8), dtype="<u8")[0])
+        header = json.loads(snapshot.read(headerLength).decode("utf-8"))
+    return(header['arrays'], header['metadata'], len(snapshot_magic) + 8 + headerLength)
+
+## MeshSnapshot is a loaded snapshot: its arrays are read-only views into the memory-mapped file.
+class MeshSnapshot():
+    ## Parameters:
+    ##  path -- the snapshot file to open.
+    ##  mmap -- memory-map the file (zero copy).  False reads everything into memory instead.
+    def __init__(self, path, mmap=True) -> None:
+        layout, self.metadata, dataStart = ReadSnapshotHeader(path)
+        self.path = path
+        if mmap:
+            buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        else:
+            buffer = np.fromfile(path, dtype=np.uint8)
+
+        self.arrays = {}
+        for name, entry in layout.items():
+            dtype = np.dtype(entry['dtype'])
+            shape = tuple(entry['shape'])
+            start = dataStart + entry['offset']
+            count = int(np.prod(shape, dtype=np.int64))
+            self.arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(shape)
+        pass
+
+    def __getitem__(self, name):
+        return(self.arrays[name])
+
+    def __contains__(self, name):
+        return(name in self.arrays)
+
+    ## VertexCount is how many vertices the mesh has.
+    def VertexCount(self):
+        return(len(self.arrays['co']))
+
+    ## FaceCount is how many faces the mesh has.
+    def FaceCount(self):
+        return(len(self.arrays['loopStarts']) if 'loopStarts' in self.arrays else 0)
+
+    ## TriangleCount is how many triangles the faces would make: an n-gon makes n - 2.
+    def TriangleCount(self):
+        if 'loopTotals' not in self.arrays:
+            return(0)
+        return(int(self.arrays['loopTotals'].sum()) - 2 * self.FaceCount())
+
+    ## Bounds gives back the (min, max) corners of the vertex positions.
+    def Bounds(self):
+        co = self.arrays['co']
+        return(co.min(axis=0), co.max(axis=0))
+
+## LoadMeshSnapshot opens a snapshot, memory-mapped by default.
+def LoadMeshSnapshot(path, mmap=True):
+    return(MeshSnapshot(path, mmap))
@@ -7,11 +7,932 @@ import math
 import operator
 import numpy as np
 import os
+import functools
+import concurrent.futures
+import json
+import subprocess
+import tempfile
+import time
+import hashlib
+import shutil
+import threading
+import urllib.parse
+import importlib.util
+import sys
 
-class Importers():
+## LoadSiblingLibrary loads another of my libraries that lives in the same folder as this one.
+def LoadSiblingLibrary(module_name):
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(os.path.dirname(os.path.abspath(__file__)), module_name + ".py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return(module)
+
+## The asset index reads glTF and .blend files in plain python -- its glTF bounds serve the proxies here too.
+ai = LoadSiblingLibrary("ImranAssetIndex")
+
+## The headless worker script ImportGLTFParallel runs, next to this library.
+gltf_worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ImportGLTFWorker.py")
+
+## RunBlenderWorkers deals jobs round robin into a shard per worker and runs each shard through a worker script in its own headless blender.
+## Each worker reads its shard's JSON and writes one JSON record per job to a results file.
+## Gives back (records, failures): every record the workers wrote, and a (job, message) pair for each job of a shard whose blender failed.
+## A failed blender's partial results are dropped, as is anything left from an earlier run.  Workers run with --python-exit-code,
+## so a worker script that raises counts as failed instead of exiting cleanly after half its shard.
+## Parameters:
+##  workerScript -- the worker script to run, like gltf_worker_script.
+##  jobs -- a list of JSON-able job dictionaries.
+##  workDirectory -- where the shard and results files go.
+##  workers -- how many blender processes to run at once.  Defaults to one per core, and never more than there are jobs.
+##  blender -- the blender executable.  Defaults to the one running this script.
+def RunBlenderWorkers(workerScript, jobs, workDirectory, workers=None, blender=None):
+    if len(jobs) == 0:
+        return([], [])
+    blender = blender or bpy.app.binary_path
+    workers = max(1, min(workers or os.cpu_count(), len(jobs)))
+    shards = [jobs[worker::workers] for worker in range(workers)]
+
+    def RunShard(worker):
+        shardPath = os.path.join(workDirectory, "shard_%02d.json" % worker)
+        resultPath = os.path.join(workDirectory, "shard_%02d.results.jsonl" % worker)
+        with open(shardPath, "w") as shard:
+            json.dump(shards[worker], shard)
+        if os.path.exists(resultPath):
+            os.remove(resultPath)
+        completed = subprocess.run([blender, "-b", "--factory-startup", "--python-exit-code", "1", "--python", workerScript, "--", shardPath, resultPath], capture_output=True, text=True)
+        if completed.returncode != 0 or not os.path.exists(resultPath):
+            return([], "blender worker exited with code %d: %s" % (completed.returncode, completed.stderr[-2000:].strip()))
+        with open(resultPath) as results:
+            return([json.loads(line) for line in results if line.strip()], None)
+
+    records = []
+    failures = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        for shard, (shardRecords, error) in zip(shards, pool.map(RunShard, range(workers))):
+            records.extend(shardRecords)
+            failures.extend((job, error) for job in shard if error is not None)
+    return(records, failures)
+## The headless worker script TexturePyramid.Build runs, next to this library.
+texture_worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "TexturePyramidWorker.py")
+
+## BulkSceneBuild wraps a stretch of script that builds a lot of scene through the data API, and evaluates the scene once at the end.
+## Every bpy.ops call from python updates the view layer before and after it runs, so a chain of select_all, mode_set, editmode_toggle
+## and parent_set pays a depsgraph evaluation per call, and each one gets slower the bigger the scene is.  Data API calls -- objects.new,
+## objects.link, select_set, constraints.new, setting a parent -- only tag what changed, so a build made of them costs one evaluation,
+## on exit, however many objects it makes.  Operators called inside still evaluate as usual, so the saving comes from using fewer of them.
+## (Undo isn't the cost: operators called from a script never record undo steps of their own.)
+## Use it as a context manager:
+##  with BulkSceneBuild():
+##      ...
+## or as a decorator on a function or method that builds a scene:
+##  @BulkSceneBuild()
+##  def BuildVillage(): ...
+## Bulk builds can nest -- only the outermost one updates the view layer.
+class BulkSceneBuild():
+    depth = 0
+
+    ## Parameters:
+    ##  updateOnExit -- update the view layer once on exit, so later code sees the finished scene.
+    def __init__(self, updateOnExit=True) -> None:
+        self.updateOnExit = updateOnExit
+        pass
+
+    def __enter__(self):
+        BulkSceneBuild.depth += 1
+        return(self)
+
+    def __exit__(self, exceptionType, exceptionValue, traceback):
+        BulkSceneBuild.depth -= 1
+        if BulkSceneBuild.depth == 0 and self.updateOnExit:
+            bpy.context.view_layer.update()
+        return(False) ## never swallow an exception from the build
+
+    ## __call__ lets a BulkSceneBuild decorate a function, so every call to it is one bulk build.
+    def __call__(self, function):
+        @functools.wraps(function)
+        def Wrapped(*args, **kwargs):
+            with BulkSceneBuild(self.updateOnExit):
+                return(function(*args, **kwargs))
+        return(Wrapped)
+
+## SceneIndex keeps dictionaries of a scene's objects by name, by the data they own and by type, so lookups don't search the scene.
+## It's rebuilt lazily: the depsgraph handler below, and anything in this library that adds or removes objects, marks it stale,
+## and the next lookup rebuilds it in one pass.  Scripts can rename or delete objects between depsgraph updates, so every hit is
+## checked too -- a stale answer triggers one rebuild instead of being handed back.  A key that isn't there is checked against the scene
+## directly, and only rebuilds the index if the scene does have it, like an object renamed since the last rebuild.
+class SceneIndex():
+    ## Parameters:
+    ##  sceneName -- the name of the scene to index.
+    def __init__(self, sceneName='Scene') -> None:
+        self.sceneName = sceneName
+        self.stale = True
+        self.byName = {}
+        self.byData = {}
+        self.byType = {}
+        self.objectCount = 0
+        self.rebuilds = 0
+        self.lookups = 0
+        self.misses = 0
+        pass
+
+    ## Invalidate marks the index stale, so the next lookup rebuilds it.
+    def Invalidate(self):
+        self.stale = True
+        pass
+
+    ## Rebuild indexes every object in the scene in one pass.
+    def Rebuild(self):
+        self.byName = {}
+        self.byData = {}
+        self.byType = {}
+        objects = bpy.data.scenes[self.sceneName].objects
+        for item in objects:
+            self.byName[item.name] = item
+            if item.data is not None:
+                self.byData.setdefault(item.data.as_pointer(), item) ## shared data belongs to the first object found using it
+            self.byType.setdefault(item.type, []).append(item)
+        self.objectCount = len(objects)
+        self.stale = False
+        self.rebuilds += 1
+        pass
+
+    ## Ensure rebuilds the index if it's stale, or if objects were added or removed since it was built.
+    def Ensure(self):
+        if self.stale or self.objectCount != len(bpy.data.scenes[self.sceneName].objects):
+            self.Rebuild()
+        pass
+
+    ## Lookup finds key in one of the dictionaries and checks the answer is still right, rebuilding once if it isn't.
+    ## A miss only rebuilds if the scene says the object might be there after all -- say it was renamed, which doesn't change the object count.
+    ## Parameters:
+    ##  table -- 'byName' or 'byData'.
+    ##  key -- the key in that table.
+    ##  isStillValid -- checks an object found in the table still matches the key.
+    ##  mightExist -- a quick check, without the index, of whether a missing key could be in the scene now.
+    def Lookup(self, table, key, isStillValid, mightExist):
+        self.lookups += 1
+        self.Ensure()
+        found = getattr(self, table).get(key)
+        if found is None:
+            self.misses += 1
+            if not mightExist():
+                return(None)
+        else:
+            try:
+                if isStillValid(found):
+                    return(found)
+            except ReferenceError: ## the object was removed since the index was built
+                pass
+        self.Rebuild()
+        return(getattr(self, table).get(key))
+
+    ## ObjectByName gives back the scene object called name, or None.
+    def ObjectByName(self, name):
+        return(self.Lookup('byName', name, lambda found: found.name == name, lambda: bpy.data.scenes[self.sceneName].objects.get(name) is not None))
+
+    ## OwnerOfData gives back the scene object using a datablock, like a mesh or armature, or None.
+    ## Data nothing uses can't have an owner, so looking it up never rebuilds.
+    def OwnerOfData(self, datablock):
+        return(self.Lookup('byData', datablock.as_pointer(), lambda found: found.data == datablock, lambda: datablock.users > 0))
+
+    ## ObjectsOfType gives back a list of the scene objects of one type, or of any of a tuple of types.
+    def ObjectsOfType(self, types):
+        self.lookups += 1
+        self.Ensure()
+        if isinstance(types, str):
+            types = (types,)
+        return([item for objectType in types for item in self.byType.get(objectType, ()) if IsAlive(item)])
+
+    ## Stats reports how often the index had to be rebuilt, and how many lookups found nothing.
+    def Stats(self):
+        return({'lookups': self.lookups, 'misses': self.misses, 'rebuilds': self.rebuilds, 'objects': self.objectCount})
+
+## One index per scene, shared by every script that loads this library.
+scene_indexes = {}
+
+## GetSceneIndex gives back the shared index for a scene, the current scene if none is given.
+def GetSceneIndex(scene=None):
+    sceneName = scene if isinstance(scene, str) else (scene or bpy.context.scene).name
+    if sceneName not in scene_indexes:
+        scene_indexes[sceneName] = SceneIndex(sceneName)
+    return(scene_indexes[sceneName])
+
+## InvalidateSceneIndexes marks every scene index stale.
+def InvalidateSceneIndexes():
+    for index in scene_indexes.values():
+        index.Invalidate()
+    pass
+
+## SceneIndexDepsgraphUpdate marks the indexes stale when the depsgraph reports object, collection or scene changes.
+@bpy.app.handlers.persistent
+def SceneIndexDepsgraphUpdate(scene, depsgraph=None):
+    if depsgraph is None or any(isinstance(update.id, (bpy.types.Object, bpy.types.Collection, bpy.types.Scene)) for update in depsgraph.updates):
+        InvalidateSceneIndexes()
+    pass
+
+## RegisterSceneIndexHandler adds the depsgraph handler, replacing the one from any earlier load of this library.
+def RegisterSceneIndexHandler():
+    handlers = bpy.app.handlers.depsgraph_update_post
+    for handler in list(handlers):
+        if getattr(handler, "__name__", "") == SceneIndexDepsgraphUpdate.__name__:
+            handlers.remove(handler)
+    handlers.append(SceneIndexDepsgraphUpdate)
+    pass
+
+RegisterSceneIndexHandler()
+
+## NameSync keeps object names and their data's names the same, like the outliner rename scripts do, but only renames what changed.
+## Every rename runs blender's unique-name check against every other name, so renaming the whole scene each time gets slow on big scenes.
+## NameSync remembers the names each object had after the last sync in each direction, and only looks at objects that are new or were renamed since.
+## The two directions are remembered apart, so syncing one way doesn't hide changes from a sync the other way.
+## Objects are found again by pointer, and the names are checked too, as blender can reuse a deleted object's memory for a new one.
+class NameSync():
+    ## Parameters:
+    ##  sceneName -- the name of the scene to keep in sync.
+    def __init__(self, sceneName='Scene') -> None:
+        self.sceneName = sceneName
+        self.synced = {True: {}, False: {}} ## objectsFromData -> object pointer -> (object name, data pointer, data name) after the last sync that way
+        pass
+
+    ## SyncState is what NameSync remembers about an object: its name, and which data it has under which name.
+    @staticmethod
+    def SyncState(item):
+        return((item.name, item.data.as_pointer(), item.data.name))
+
+    ## ChangedObjects gives back the objects with data that are new, or whose object or data name changed, since the last sync in the given direction.
+    ## Objects without data, like empties, can't be synced and are left out.
+    ## Parameters:
+    ##  objectsFromData -- the direction, as for Sync.
+    def ChangedObjects(self, objectsFromData=True):
+        synced = self.synced[bool(objectsFromData)]
+        changed = []
+        for item in bpy.data.scenes[self.sceneName].objects:
+            if item.data is not None and synced.get(item.as_pointer()) != self.SyncState(item):
+                changed.append(item)
+        return(changed)
+
+    ## Sync renames the changed objects, or their data, and remembers the names they end up with.
+    ## A name blender had to make unique, like "Cube.001", is remembered as is, so it isn't renamed again on every sync.
+    ## Gives back a report dictionary: {'changed', 'renamed', 'avoided'} -- 'avoided' is how many renames renaming every object would have cost on top.
+    ## Parameters:
+    ##  objectsFromData -- True to rename objects after their data, False to rename data after their objects.
+    def Sync(self, objectsFromData=True):
+        changed = self.ChangedObjects(objectsFromData)
+        renamed = 0
+        for item in changed:
+            if objectsFromData and item.name != item.data.name:
+                item.name = item.data.name
+                renamed += 1
+            elif not objectsFromData and item.data.name != item.name:
+                item.data.name = item.name
+                renamed += 1
+
+        # remember every object in the scene as it is now, which also drops objects that have gone.
+        withData = [item for item in bpy.data.scenes[self.sceneName].objects if item.data is not None]
+        self.synced[bool(objectsFromData)] = {item.as_pointer(): self.SyncState(item) for item in withData}
+        if renamed > 0:
+            InvalidateSceneIndexes()
+        return({'changed': len(changed), 'renamed': renamed, 'avoided': len(withData) - renamed})
+
+    ## Forget drops everything remembered, so the next sync checks every object again.
+    def Forget(self):
+        for synced in self.synced.values():
+            synced.clear()
+        pass
+
+## One name sync per scene, shared by every script that loads this library.
+name_syncs = {}
+
+## GetNameSync gives back the shared name sync for a scene, the current scene if none is given.
+def GetNameSync(scene=None):
+    sceneName = scene if isinstance(scene, str) else (scene or bpy.context.scene).name
+    if sceneName not in name_syncs:
+        name_syncs[sceneName] = NameSync(sceneName)
+    return(name_syncs[sceneName])
+
+## estimated_element_bytes is roughly how much memory one element of each kind of geometry takes, for the freed memory estimates.
+## Blender doesn't report memory per datablock, so the reset helpers add these up from the element and attribute counts instead.
+## The figures are the packed sizes of the arrays blender keeps -- allocator overhead, undo copies and GPU buffers aren't counted.
+estimated_element_bytes = {'vertices': 12, 'edges': 8, 'loops': 8, 'polygons': 12, 'bones': 512, 'points': 40, 'datablock': 1024}
+estimated_attribute_bytes = {'FLOAT': 4, 'INT': 4, 'FLOAT_VECTOR': 12, 'FLOAT_COLOR': 16, 'BYTE_COLOR': 4, 'STRING': 8, 'BOOLEAN': 1,
+                             'FLOAT2': 8, 'INT8': 1, 'INT32_2D': 8, 'QUATERNION': 16, 'FLOAT4X4': 64}
+
+## EstimateDatablockBytes gives an estimate, in bytes, of a datablock's size from its element and attribute counts.
+## Anything that isn't geometry counts as one small fixed-size block.
+def EstimateDatablockBytes(datablock):
+    size = estimated_element_bytes['datablock']
+    for collectionName in ('vertices', 'edges', 'loops', 'polygons', 'bones', 'points'):
+        elements = getattr(datablock, collectionName, None)
+        if elements is not None:
+            size += len(elements) * estimated_element_bytes[collectionName]
+    for attribute in getattr(datablock, 'attributes', ()):
+        if not attribute.name.startswith("."): ## internal attributes are counted with the geometry above
+            size += len(attribute.data) * estimated_attribute_bytes.get(attribute.data_type, 4)
+    return(size)
+
+## SceneReset empties a scene of given types of objects straight through bpy.data, without selecting anything or calling bpy.ops.object.delete.
+## Deleting objects with the delete operator leaves their meshes, armatures and materials behind as orphans, so every run of a script
+## that resets the scene grows the file.  SceneReset unlinks the objects from the scene, like the operator, then removes what only they were using.
+class SceneReset():
+    def __init__(self) -> None:
+        pass
+
+    ## DeleteObjectsOfType deletes every object of the given types from a scene, and the data it leaves orphaned.
+    ## Like bpy.ops.object.delete(use_global=False), objects are only unlinked from this scene -- one still linked into another scene stays there.
+    ## Gives back a report dictionary: {'unlinked', 'objects', 'data', 'materials', 'estimatedBytes'} -- how many objects were unlinked,
+    ## how many of each were removed, and an estimate of the bytes freed, from EstimateDatablockBytes.  It's not a measurement.
+    ## Parameters:
+    ##  types -- the object types to delete, like ('MESH',) or ('ARMATURE',).
+    ##  scene -- the scene to clear, the current scene if None.
+    ##  purgeOrphans -- also remove the object data and materials nothing else uses any more.
+    def DeleteObjectsOfType(self, types=('MESH',), scene=None, purgeOrphans=True):
+        scene = bpy.data.scenes[scene] if isinstance(scene, str) else (scene or bpy.context.scene)
+        doomed = GetSceneIndex(scene).ObjectsOfType(types)
+        report = {'unlinked': len(doomed), 'objects': 0, 'data': 0, 'materials': 0, 'estimatedBytes': 0}
+        if len(doomed) == 0:
+            return(report)
+
+        ## removing an object that's being edited or sculpted isn't safe -- drop back to object mode first.
+        if bpy.context.object is not None and bpy.context.object.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+        ## remember what the objects were using, then unlink them from every collection in this scene.
+        data = {item.data for item in doomed if item.data is not None}
+        materials = {material for block in data for material in getattr(block, 'materials', ()) if material is not None}
+        doomedSet = set(doomed)
+        for collection in [scene.collection] + list(scene.collection.children_recursive):
+            for item in [item for item in collection.objects if item in doomedSet]:
+                collection.objects.unlink(item)
+        InvalidateSceneIndexes()
+
+        ## objects no other scene uses any more go in one batch, as the operator frees them too.
+        orphanObjects = [item for item in doomed if item.users == 0]
+        report['objects'] = len(orphanObjects)
+        report['estimatedBytes'] = len(orphanObjects) * estimated_element_bytes['datablock']
+        bpy.data.batch_remove(orphanObjects)
+        if not purgeOrphans:
+            return(report)
+
+        ## only remove what these objects orphaned -- anything still used elsewhere, or kept with a fake user, stays.
+        orphanData = [block for block in data if block.users == 0]
+        report['data'] = len(orphanData)
+        report['estimatedBytes'] += sum(EstimateDatablockBytes(block) for block in orphanData)
+        bpy.data.batch_remove(orphanData)
+
+        orphanMaterials = [material for material in materials if material.users == 0]
+        report['materials'] = len(orphanMaterials)
+        report['estimatedBytes'] += len(orphanMaterials) * estimated_element_bytes['datablock']
+        bpy.data.batch_remove(orphanMaterials)
+        return(report)
+
+    ## DeleteAllMeshObjects deletes every 'MESH' object and the meshes it orphans.
+    def DeleteAllMeshObjects(self, scene=None):
+        return(self.DeleteObjectsOfType(('MESH',), scene))
+
+    ## DeleteAllArmatureObjects deletes every 'ARMATURE' object and the armatures it orphans.
+    def DeleteAllArmatureObjects(self, scene=None):
+        return(self.DeleteObjectsOfType(('ARMATURE',), scene))
+
+## ImportCache keeps converted imports on disk as small .blend libraries, keyed by a hash of the source file's contents and the import options.
+## The first import of a file converts it as usual and stores what it made; every later import of the same bytes is just a library append.
+## The cache is kept under a size cap by dropping the least recently used entries, and counts hits and misses for each run.
+class ImportCache():
+    ## Parameters:
+    ##  directory -- where the cached .blend files and the index live.  Defaults to a folder in the system temp directory.
+    ##  maxBytes -- the most disk the cache may use before old entries are dropped.
+    def __init__(self, directory=None, maxBytes=4 * 1024**3) -> None:
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "ImranImportCache")
+        self.maxBytes = maxBytes
+        self.indexPath = os.path.join(self.directory, "index.json")
+        self.boundsPath = os.path.join(self.directory, "bounds.json")
+        self.digestsPath = os.path.join(self.directory, "digests.json")
+        self.runStarted = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.entries = {}
+        if os.path.exists(self.indexPath):
+            with open(self.indexPath) as index:
+                self.entries = json.load(index)
+        self.bounds = {}
+        if os.path.exists(self.boundsPath):
+            with open(self.boundsPath) as bounds:
+                self.bounds = json.load(bounds)
+        self.digests = {} ## source file -> [size, modified time in ns, sha256 of its contents]
+        if os.path.exists(self.digestsPath):
+            with open(self.digestsPath) as digests:
+                self.digests = json.load(digests)
+        pass
+
+    ## SourceFiles gives back the files an import reads: the file itself, plus the buffers and images a .gltf points to.
+    def SourceFiles(self, filePath):
+        files = [filePath]
+        if filePath.lower().endswith(".gltf"):
+            with open(filePath, encoding="utf-8") as gltf:
+                document = json.load(gltf)
+            for item in document.get('buffers', []) + document.get('images', []):
+                uri = item.get('uri', "")
+                if uri != "" and not uri.startswith("data:"):
+                    files.append(os.path.join(os.path.dirname(filePath), urllib.parse.unquote(uri)))
+        return(files)
+
+    ## FileDigest gives back the sha256 of a file's contents, and whether it had to read the file for it.
+    ## The digest is remembered with the file's size and modified time, so a file that hasn't changed since isn't read again.
+    def FileDigest(self, sourceFile):
+        sourceFile = os.path.abspath(sourceFile)
+        status = os.stat(sourceFile)
+        remembered = self.digests.get(sourceFile)
+        if remembered is not None and remembered[0] == status.st_size and remembered[1] == status.st_mtime_ns:
+            return(remembered[2], False)
+
+        digest = hashlib.sha256()
+        with open(sourceFile, "rb") as source:
+            for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                digest.update(chunk)
+        self.digests[sourceFile] = [status.st_size, status.st_mtime_ns, digest.hexdigest()]
+        return(digest.hexdigest(), True)
+
+    ## Key hashes the contents of every file an import reads, together with the import options, into one cache key.
+    ## Parameters:
+    ##  filePath -- the file being imported.
+    ##  options -- a dictionary of whatever else changes the result, like the importer and the object name.
+    def Key(self, filePath, options=None):
+        digest = hashlib.sha256(json.dumps(options or {}, sort_keys=True).encode("utf-8"))
+        hashed = False
+        for sourceFile in self.SourceFiles(filePath):
+            fileDigest, read = self.FileDigest(sourceFile)
+            digest.update(os.path.basename(sourceFile).encode("utf-8"))
+            digest.update(fileDigest.encode("utf-8"))
+            hashed = hashed or read
+        if hashed:
+            self.SaveJSON(self.digestsPath, self.digests)
+        return(digest.hexdigest())
+
+    ## Lookup gives back the cache entry for a key, or None.  A hit marks the entry as just used.
+    ## The index is only written when it changes: a stale entry is dropped, or an entry is used for the first time this run.
+    ## Later hits in the same run don't change what Evict keeps, so they stay in memory.
+    def Lookup(self, key):
+        entry = self.entries.get(key)
+        if entry is None or not os.path.exists(entry['blend']):
+            self.misses += 1
+            if self.entries.pop(key, None) is not None:
+                self.Save()
+            return(None)
+        firstUse = entry['lastUsed'] < self.runStarted
+        entry['lastUsed'] = time.time()
+        self.hits += 1
+        if firstUse:
+            self.Save()
+        return(entry)
+
+    ## Path gives back where the .blend for a key goes.
+    def Path(self, key):
+        return(os.path.join(self.directory, key + ".blend"))
+
+    ## Store records a .blend already written to Path(key) as the entry for key, then drops old entries if the cache is over its cap.
+    ## Parameters:
+    ##  key -- the key from Key().
+    ##  source -- the file that was imported, for reference.
+    ##  objects -- the names of the objects in the .blend to append on a hit.
+    ##  collections -- the names of the collections in the .blend to append on a hit, instead of the objects.
+    def Store(self, key, source, objects=[], collections=[]):
+        blendPath = self.Path(key)
+        self.entries[key] = {'blend': blendPath, 'source': source, 'objects': list(objects), 'collections': list(collections),
+                             'bytes': os.path.getsize(blendPath), 'lastUsed': time.time()}
+        self.Evict()
+        self.Save()
+        return(self.entries[key])
+
+    ## Evict drops the least recently used entries until the cache fits under its cap.  Entries used during this run are never dropped,
+    ## as the scene may still be linked to them.
+    def Evict(self):
+        total = sum(entry['bytes'] for entry in self.entries.values())
+        for key, entry in sorted(self.entries.items(), key=lambda item: item[1]['lastUsed']):
+            if total <= self.maxBytes or entry['lastUsed'] >= self.runStarted:
+                break
+            if os.path.exists(entry['blend']):
+                os.remove(entry['blend'])
+            total -= entry['bytes']
+            del self.entries[key]
+            self.evictions += 1
+        pass
+
+    ## Save writes the index next to the cached files.
+    def Save(self):
+        self.SaveJSON(self.indexPath, self.entries, indent=1)
+        pass
+
+    ## SaveJSON writes one of the cache's json files, renamed into place so a crash never leaves half a file.
+    def SaveJSON(self, path, value, indent=None):
+        temporaryPath = path + ".tmp"
+        with open(temporaryPath, "w") as jsonFile:
+            json.dump(value, jsonFile, indent=indent)
+        os.replace(temporaryPath, path)
+        pass
+
+    ## Bounds gives back the (min, max) corners remembered for a key, or None.  Proxies use them to stand in for unloaded assets.
+    def Bounds(self, key):
+        return(self.bounds.get(key))
+
+    ## RememberBounds keeps the (min, max) corners of an import.  Bounds are tiny, so they're kept even after the entry is evicted.
+    def RememberBounds(self, key, bounds):
+        if bounds is None:
+            return
+        bounds = [np.asarray(corner).tolist() for corner in bounds]
+        if self.bounds.get(key) != bounds:
+            self.bounds[key] = bounds
+            self.SaveJSON(self.boundsPath, self.bounds)
+        pass
+
+    ## Append brings a cached entry's collections, or objects, into a collection of the current scene, and gives back the objects.
+    def Append(self, entry, collection=None):
+        collection = collection or bpy.context.collection
+        with bpy.data.libraries.load(entry['blend'], link=False) as (dataFrom, dataTo):
+            if len(entry['collections']) > 0:
+                dataTo.collections = list(entry['collections'])
+            else:
+                dataTo.objects = list(entry['objects'])
+
+        objects = []
+        for newCollection in dataTo.collections:
+            if newCollection is not None:
+                collection.children.link(newCollection)
+                objects.extend(newCollection.all_objects)
+        for newObject in dataTo.objects:
+            if newObject is not None:
+                collection.objects.link(newObject)
+                newObject.select_set(True)
+                objects.append(newObject)
+        InvalidateSceneIndexes()
+        return(objects)
+
+    ## Stats reports this run's hits, misses and evictions, and how big the cache is.
+    def Stats(self):
+        return({'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': len(self.entries),
+                'bytes': sum(entry['bytes'] for entry in self.entries.values())})
+
+## blend_data_collections maps the type names ImportFromBlendFile takes -- the folder names inside a .blend -- to bpy.data collections.
+blend_data_collections = {'Object': 'objects', 'Collection': 'collections', 'Mesh': 'meshes', 'Material': 'materials',
+                          'Image': 'images', 'NodeTree': 'node_groups', 'Armature': 'armatures', 'World': 'worlds'}
+
+## IsAlive checks a datablock we kept a reference to still exists -- removed datablocks raise ReferenceError when touched.
+def IsAlive(datablock):
+    try:
+        return(datablock is not None and datablock.name is not None)
+    except ReferenceError:
+        return(False)
+
+## LibraryRegistry remembers every datablock linked from a .blend library, so linking the same asset again reuses it instead of
+## reading the library again.  Linked data lives once in memory however many times it's placed in the scene.
+class LibraryRegistry():
     def __init__(self) -> None:
+        self.linked = {} ## (library path, type, name) -> linked datablock
+        self.reads = 0
+        self.reuses = 0
+        pass
+
+    ## Link gives back the linked datablock for an item in a library, reading the library only if it hasn't been linked yet.
+    ## Gives back None if the library doesn't have the item.
+    ## Parameters:
+    ##  blendFile -- the .blend library.
+    ##  objectType -- the type folder in the library, like "Object" or "Collection".
+    ##  objectName -- the name of the item.
+    def Link(self, blendFile, objectType, objectName):
+        key = (os.path.normcase(os.path.abspath(blendFile)), objectType, objectName)
+        datablock = self.linked.get(key)
+        if IsAlive(datablock):
+            self.reuses += 1
+            return(datablock)
+
+        dataName = blend_data_collections[objectType]
+        with bpy.data.libraries.load(blendFile, link=True) as (dataFrom, dataTo):
+            setattr(dataTo, dataName, [objectName] if objectName in getattr(dataFrom, dataName) else [])
+        self.reads += 1
+        found = [item for item in getattr(dataTo, dataName) if item is not None]
+        datablock = found[0] if len(found) > 0 else None
+        self.linked[key] = datablock
+        return(datablock)
+
+    ## Libraries gives back the libraries the registry has linked from.
+    def Libraries(self):
+        return({item.library for item in self.linked.values() if IsAlive(item)})
+
+    ## Stats reports how often a link was served without reading the library.
+    def Stats(self):
+        return({'reads': self.reads, 'reuses': self.reuses, 'linked': len(self.linked), 'libraries': len(self.Libraries())})
+
+## One library registry shared by every script that loads this library.
+SharedLibraryRegistry = LibraryRegistry()
+
+## image_key_property is the custom property that stamps an image with the path, modified time and size it was loaded from.  It's saved
+## with the file, so an ImageRegistry in a later run -- or after the library is loaded again -- still finds the images loaded before.
+image_key_property = "imran_image_key"
+
+## ImageRegistry loads each image file once, keyed by its path and modified time, and hands back the same datablock every time after,
+## so re-running a scene script doesn't stack another copy of a multi-hundred-MB EXR in bpy.data.images.  Editing the file makes a new key,
+## so the new version is loaded.  Images nothing uses any more can be released, and Stats reports how much image memory is resident.
+class ImageRegistry():
+    def __init__(self) -> None:
+        self.loaded = {} ## key -> image datablock
+        self.reads = 0
+        self.reuses = 0
+        self.released = 0
+        pass
+
+    ## Key names an image file by its absolute path, modified time and size.
+    def Key(self, imagePath):
+        imagePath = os.path.normcase(os.path.abspath(imagePath))
+        status = os.stat(imagePath)
+        return("%s|%f|%d" % (imagePath, status.st_mtime, status.st_size))
+
+    ## Matches checks an image we kept still exists, and still reads the file its key says -- scripts can repoint images.
+    def Matches(self, image, key):
+        if not IsAlive(image) or image.get(image_key_property) != key:
+            return(False)
+        return(os.path.normcase(os.path.abspath(bpy.path.abspath(image.filepath))) == key.rsplit("|", 2)[0])
+
+    ## Load gives back the image for a file, loading it only if no image already in the file was loaded from the same version of it.
+    def Load(self, imagePath):
+        key = self.Key(imagePath)
+        image = self.loaded.get(key)
+        if not self.Matches(image, key):
+            image = next((item for item in bpy.data.images if self.Matches(item, key)), None)
+        if image is not None:
+            self.reuses += 1
+        else:
+            image = bpy.data.images.load(imagePath)
+            image[image_key_property] = key
+            self.reads += 1
+        self.loaded[key] = image
+        return(image)
+
+    ## Release removes an image if nothing uses it any more.  Gives back whether it was removed.
+    def Release(self, image):
+        if not IsAlive(image) or image.use_fake_user or image.users > 0:
+            return(False)
+        bpy.data.images.remove(image)
+        self.released += 1
+        return(True)
+
+    ## ReleaseUnused removes every image the registry loaded that nothing uses any more.  Gives back how many were removed.
+    def ReleaseUnused(self):
+        released = [key for key, image in self.loaded.items() if self.Release(image)]
+        for key in released:
+            del self.loaded[key]
+        self.loaded = {key: image for key, image in self.loaded.items() if IsAlive(image)}
+        return(len(released))
+
+    ## ResidentBytes estimates the memory taken by the pixels of images that are loaded: width x height x channels, at 4 bytes a channel
+    ## for float images like EXR and HDR, and 1 for 8 bit ones.  GPU copies and mipmaps aren't counted.
+    ## Parameters:
+    ##  images -- the images to count.  Defaults to every image in the file.
+    def ResidentBytes(self, images=None):
+        total = 0
+        for image in images if images is not None else bpy.data.images:
+            if image.has_data:
+                total += image.size[0] * image.size[1] * image.channels * (4 if image.is_float else 1)
+        return(total)
+
+    ## Stats reports how often a load was served from an image already in the file, how many were released, and the resident image memory.
+    def Stats(self):
+        images = [image for image in self.loaded.values() if IsAlive(image)]
+        return({'reads': self.reads, 'reuses': self.reuses, 'released': self.released, 'images': len(images),
+                'registryBytes': self.ResidentBytes(images), 'residentBytes': self.ResidentBytes()})
+
+## One image registry shared by every script that loads this library.
+SharedImageRegistry = ImageRegistry()
+
+## full_resolution_property is the custom property that remembers an image's own file when a TexturePyramid points it at a smaller copy.
+full_resolution_property = "imran_full_resolution"
+
+## TexturePyramid keeps downscaled copies of images -- 512, 1k and 2k on the longest side -- so look-dev can load a small copy of a 4k
+## texture or environment map instead of decoding the whole thing.  Copies are made once by headless blender workers, and kept on disk
+## keyed by the source's path, size and modified time, so editing a source makes new copies.
+## quality picks the tier for the session: one of the tiers, or 'full' for final renders.  Images without a copy of that tier yet
+## -- still building, or already smaller than it -- load at full resolution.
+class TexturePyramid():
+    ## Parameters:
+    ##  directory -- where the copies and the index live.  Defaults to a folder in the system temp directory.
+    ##  quality -- the tier to load this session, or 'full'.
+    ##  tiers -- the sizes of the longest side to make copies at.
+    def __init__(self, directory=None, quality='full', tiers=(512, 1024, 2048)) -> None:
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "ImranTexturePyramid")
+        self.quality = quality
+        self.tiers = sorted(tiers, reverse=True)
+        self.indexPath = os.path.join(self.directory, "index.json")
+        self.hits = 0
+        self.misses = 0
+        self.built = 0
+        self.background = None
+        self.lastBuild = {}
+        self.entriesLock = threading.Lock() ## a background Build never changes entries in place -- it swaps in a new dictionary under this
+        os.makedirs(self.directory, exist_ok=True)
+        self.entries = {}
+        if os.path.exists(self.indexPath):
+            with open(self.indexPath) as index:
+                self.entries = json.load(index)
+        pass
+
+    ## Key names a source image by its path, size and modified time -- hashing hundreds of MB of EXR would cost more than it saves.
+    def Key(self, imagePath):
+        status = os.stat(imagePath)
+        stamp = "%s|%d|%f" % (os.path.normcase(os.path.abspath(imagePath)), status.st_size, status.st_mtime)
+        return(hashlib.sha256(stamp.encode("utf-8")).hexdigest()[:24])
+
+    ## Path gives back the file to load for an image at a quality: the tier's copy if there is one, otherwise the image itself.
+    ## Parameters:
+    ##  imagePath -- the full resolution image.
+    ##  quality -- the tier, or 'full'.  Defaults to the session's quality.
+    def Path(self, imagePath, quality=None):
+        quality = quality or self.quality
+        if quality == 'full' or not os.path.exists(imagePath):
+            return(imagePath)
+        entry = self.entries.get(self.Key(imagePath))
+        tierPath = entry['tiers'].get(str(quality)) if entry is not None else None
+        if tierPath is None or not os.path.exists(tierPath):
+            self.misses += 1
+            return(imagePath)
+        self.hits += 1
+        return(tierPath)
+
+    ## Load loads an image at the session's quality, through an ImageRegistry so loading it again reuses the same image.
+    ## Parameters:
+    ##  imagePath -- the full resolution image.
+    ##  quality -- the tier, or 'full'.  Defaults to the session's quality.
+    ##  images -- the ImageRegistry to load through.  Defaults to the shared one.
+    def Load(self, imagePath, quality=None, images=None):
+        image = (images or SharedImageRegistry).Load(self.Path(imagePath, quality))
+        image[full_resolution_property] = imagePath
+        return(image)
+
+    ## Build makes the copies of every image that doesn't have them yet, on one headless blender per core.
+    ## Gives back {'built', 'skipped', 'errors', 'seconds'}, where errors maps each image that failed to why, or with wait=False a
+    ## concurrent.futures.Future of it, so a script can carry on at full resolution while the copies are made and pick them up with
+    ## SetQuality once they're done.  Stats reports the last build either way.
+    ## Parameters:
+    ##  imagePaths -- the full resolution images.
+    ##  workers -- how many blender processes to run at once.  Defaults to one per core, and never more than there are images.
+    ##  blender -- the blender executable for the workers.  Defaults to the one running this script.
+    ##  wait -- wait for the copies, or build them in the background.
+    def Build(self, imagePaths=[], workers=None, blender=None, wait=True):
+        blender = blender or bpy.app.binary_path
+        if not wait:
+            self.background = self.background or concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            return(self.background.submit(self.Build, imagePaths, workers, blender, True))
+        started = time.perf_counter()
+
+        ## one job per image without copies.
+        jobs = []
+        keys = {}
+        for imagePath in dict.fromkeys(imagePaths):
+            if not os.path.exists(imagePath):
+                continue
+            key = self.Key(imagePath)
+            if key in self.entries:
+                continue
+            stem, extension = os.path.splitext(os.path.basename(imagePath))
+            keys[imagePath] = key
+            jobs.append({'source': imagePath, 'tiers': [[size, os.path.join(self.directory, "%s_%s_%d%s" % (stem, key[:8], size, extension))] for size in self.tiers]})
+        records, failures = RunBlenderWorkers(texture_worker_script, jobs, self.directory, workers, blender)
+        errors = {job['source']: error for job, error in failures}
+        newEntries = {}
+        for record in records:
+            if record['source'] not in keys:
+                continue
+            if 'error' in record:
+                errors[record['source']] = record['error']
+                continue
+            newEntries[keys[record['source']]] = {'source': record['source'], 'size': record['size'], 'tiers': record['tiers']}
+
+        ## Stats, Path and SetQuality may be reading entries on the main thread, so build the new index aside and swap it in whole.
+        with self.entriesLock:
+            entries = dict(self.entries)
+            entries.update(newEntries)
+            self.Save(entries)
+            self.entries = entries
+            self.built += sum(len(entry['tiers']) for entry in newEntries.values())
+        self.lastBuild = {'built': len(jobs) - len(errors), 'skipped': len(imagePaths) - len(jobs), 'errors': errors, 'seconds': time.perf_counter() - started}
+        return(self.lastBuild)
+
+    ## ImageFiles gives back the full resolution files behind images in the file -- the ones a pyramid can make copies of.
+    ## Packed and linked images are left out, as their pixels don't come from a file we can swap.
+    def ImageFiles(self, images=None):
+        files = []
+        for image in images if images is not None else bpy.data.images:
+            if image.source == 'FILE' and image.packed_file is None and image.library is None:
+                files.append(image.get(full_resolution_property, bpy.path.abspath(image.filepath)))
+        return(files)
+
+    ## SetQuality changes the session's quality and points every image already loaded at the copy for it, remembering each image's own
+    ## file so it can go back to 'full'.  blender only reads an image's pixels when they're needed, so repointing images straight after an
+    ## import means the 4k originals are never decoded.
+    ## Gives back how many images were repointed.
+    ## Parameters:
+    ##  quality -- the tier, or 'full'.
+    ##  images -- the images to repoint.  Defaults to every image in the file.
+    def SetQuality(self, quality, images=None):
+        self.quality = quality
+        repointed = 0
+        for image in images if images is not None else bpy.data.images:
+            if image.source != 'FILE' or image.packed_file is not None or image.library is not None:
+                continue
+            fullPath = image.get(full_resolution_property, bpy.path.abspath(image.filepath))
+            wantedPath = self.Path(fullPath)
+            if os.path.normcase(bpy.path.abspath(image.filepath)) != os.path.normcase(wantedPath):
+                image[full_resolution_property] = fullPath
+                image.filepath = wantedPath ## setting the path reloads the image from it
+                repointed += 1
+        return(repointed)
+
+    ## Save writes the index next to the copies, renamed into place so a crash never leaves half an index.
+    ## Parameters:
+    ##  entries -- the index to write.  Defaults to the current one.
+    def Save(self, entries=None):
+        temporaryPath = self.indexPath + ".tmp"
+        with open(temporaryPath, "w") as index:
+            json.dump(self.entries if entries is None else entries, index, indent=1)
+        os.replace(temporaryPath, self.indexPath)
+        pass
+
+    ## Stats reports this session's quality, how often a copy was served instead of the full image, and how big the pyramid is.
+    def Stats(self):
+        entries = self.entries ## one read, so a background build swapping in a new index can't change it half way through
+        paths = [path for entry in entries.values() for path in entry['tiers'].values() if os.path.exists(path)]
+        return({'quality': self.quality, 'hits': self.hits, 'misses': self.misses, 'built': self.built, 'images': len(entries),
+                'bytes': sum(os.path.getsize(path) for path in paths), 'lastBuild': self.lastBuild})
+
+## proxy_property is the custom property that marks a stand-in and says how to load the real thing.  It's saved with the file,
+## so a layout saved with proxies in it can still be swapped to full resolution later.
+proxy_property = "imran_proxy"
+
+## ObjectsBounds gives back the world space (min, max) corners of a list of objects, from their bounding boxes.
+def ObjectsBounds(objects):
+    corners = []
+    for item in objects:
+        matrix = np.array(item.matrix_world)
+        box = np.column_stack((np.array(item.bound_box), np.ones(8)))
+        corners.append((box @ matrix.T)[:, :3])
+    if len(corners) == 0:
+        return(None)
+    points = np.concatenate(corners)
+    return(points.min(axis=0), points.max(axis=0))
+
+## NewBoundsProxy makes a wireframe box the size of bounds, to stand in for an asset that hasn't been loaded yet.
+## Parameters:
+##  name -- the asset's name.  The proxy is called name + " Proxy".
+##  bounds -- the (min, max) corners of the asset.
+##  details -- a dictionary of how to load the real asset, saved in the proxy's custom property.
+def NewBoundsProxy(name, bounds, details):
+    low, high = bounds
+    corners = [(x, y, z) for x in (low[0], high[0]) for y in (low[1], high[1]) for z in (low[2], high[2])]
+    faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    mesh = bpy.data.meshes.new(name + " Proxy")
+    mesh.from_pydata(corners, [], faces)
+    proxy = bpy.data.objects.new(name + " Proxy", mesh)
+    proxy.display_type = 'WIRE'
+    proxy.hide_render = True
+    proxy[proxy_property] = json.dumps(details)
+    bpy.context.collection.objects.link(proxy)
+    return(proxy)
+
+## CopyObjects places another copy of a group of objects, sharing their data like alt-D does, with parents inside the group remapped
+## to the copies.  Gives back the copies in the same order.
+def CopyObjects(objects):
+    copies = {item: item.copy() for item in objects}
+    for original, copy in copies.items():
+        for collection in original.users_collection:
+            collection.objects.link(copy)
+        if original.parent in copies:
+            copy.parent = copies[original.parent]
+    return([copies[item] for item in objects])
+
+class Importers():
+    ## Parameters:
+    ##  cache -- an ImportCache to keep converted imports in, or None to always import from scratch.
+    ##  libraries -- the LibraryRegistry linked imports share.  Defaults to the shared one.
+    ##  proxies -- lay out with bounding box stand-ins instead of loading assets.  ResolveProxies swaps the real assets in -- call it
+    ##             before rendering, as proxies don't render.  Assets whose bounds aren't known yet are loaded in full, and remembered for next time.
+    ##  textures -- a TexturePyramid to load images and environment maps from at its quality, or None to always load them in full.
+    ##  images -- the ImageRegistry environment maps are loaded through.  Defaults to the shared one.
+    def __init__(self, cache=None, libraries=None, proxies=False, textures=None, images=None) -> None:
+        self.cache = cache
+        self.libraries = libraries or SharedLibraryRegistry
+        self.proxies = proxies
+        self.textures = textures
+        self.images = images or SharedImageRegistry
+        self.parallelStats = {}
         pass
 
+    ## Stats reports what the last ImportGLTFParallel did, and the state of the cache, libraries, texture pyramid and images the importer uses.
+    def Stats(self):
+        stats = {'parallel': self.parallelStats, 'libraries': self.libraries.Stats(), 'images': self.images.Stats()}
+        if self.cache is not None:
+            stats['cache'] = self.cache.Stats()
+        if self.textures is not None:
+            stats['textures'] = self.textures.Stats()
+        return(stats)
+
     ## ImportGLTF imports a file and gives you back the imported objects, or None on error.
     ## importing doesn't give you the objects imported.  It gives you a result code, and selects the imported objects.
     ## The blender API here is poorly designed.  Why not do something like object, err = import(), and set the object to None on error?
@@ -24,42 +945,281 @@ class Importers():
         ## deselect all.
         bpy.ops.object.select_all(action='DESELECT')
 
-        ## Import the actual GLTF
+        ## In proxy mode a box from the glTF's own bounds stands in for it.
         file = filePath + os.sep + fileName
+        if self.proxies:
+            bounds = ai.GLTFBounds(file)
+            if bounds is not None:
+                proxy = NewBoundsProxy(os.path.splitext(fileName)[0], bounds, {'kind': 'gltf', 'file': file})
+                return ([proxy], {'FINISHED'})
+
+        ## A cached conversion of the same file is just an append.
+        if self.cache is not None:
+            key = self.cache.Key(file, {'importer': 'gltf'})
+            entry = self.cache.Lookup(key)
+            if entry is not None:
+                return (self.UseTextureTier(self.cache.Append(entry)), {'FINISHED'})
+
+        ## Import the actual GLTF
         resultStatus = bpy.ops.import_scene.gltf(filepath=file, files=[{"name":fileName, "name":fileName}], loglevel=50)
 
         ## Save the selected objects array from import.
         objects = bpy.context.selected_objects
 
+        ## keep what the import made for next time -- absolute paths, so textures still resolve from the cache folder.
+        if self.cache is not None and 'FINISHED' in resultStatus:
+            bpy.data.libraries.write(self.cache.Path(key), set(objects), path_remap='ABSOLUTE')
+            self.cache.Store(key, file, objects=[item.name for item in objects])
+
         ## return a tuple with the objects, Status.
-        return (objects, resultStatus)
+        return (self.UseTextureTier(objects), resultStatus)
+
+    ## ImportGLTFParallel imports many glTF files at once.  Headless blender workers, one per core, each turn a share of the files into
+    ## .blend libraries, then the main blender appends (or links) all of them in one pass with bpy.data.libraries.load.
+    ## Parsing buffers and decoding textures happens in the workers, so the wall clock time goes down with more cores.
+    ## With an import cache, files converted on an earlier run skip the workers and are appended straight from the cache.
+    ## Gives back (objects, errors): objects maps each glTF path to its imported objects, errors maps each failed glTF path to a message.
+    ## Stats() then reports how many files were converted or came from the cache, and how long each step took.
+    ## Parameters:
+    ##  filePaths -- the full paths of the .gltf or .glb files to import.
+    ##  workDirectory -- where the intermediate .blend files go.  Defaults to a folder in the system temp directory.
+    ##  workers -- how many blender processes to run at once.  Defaults to one per core, and never more than there are files.
+    ##  link -- link the collections instead of appending them, so the .blend libraries stay the source of the data.
+    ##  blender -- the blender executable for the workers.  Defaults to the one running this script.
+    def ImportGLTFParallel(self, filePaths=[], workDirectory=None, workers=None, link=False, blender=None):
+        if len(filePaths) == 0:
+            return ({}, {"": "No glTF files given"})
+        if self.proxies:
+            return ({filePath: self.ImportGLTF(os.path.dirname(filePath), os.path.basename(filePath))[0] for filePath in filePaths}, {})
+        workDirectory = workDirectory or os.path.join(tempfile.gettempdir(), "ImranGLTFImports")
+        os.makedirs(workDirectory, exist_ok=True)
+
+        ## one job per file not already in the cache, dealt round robin into a shard per worker.
+        jobs = []
+        records = []
+        for index, filePath in enumerate(filePaths):
+            stem = os.path.splitext(os.path.basename(filePath))[0]
+            job = {'gltf': filePath, 'blend': os.path.join(workDirectory, "%04d_%s.blend" % (index, stem)), 'collection': stem}
+            if self.cache is not None:
+                job['key'] = self.cache.Key(filePath, {'importer': 'gltf-parallel'})
+                entry = self.cache.Lookup(job['key'])
+                if entry is not None:
+                    records.append({'gltf': filePath, 'blend': entry['blend'], 'collection': entry['collections'][0]})
+                    continue
+            jobs.append(job)
+        started = time.perf_counter()
+        workerRecords, failures = RunBlenderWorkers(gltf_worker_script, jobs, workDirectory, workers, blender)
+        keys = {job['gltf']: job.get('key') for job in jobs}
+        for record in workerRecords:
+            ## move each new conversion into the cache, so the next run skips the worker.
+            if self.cache is not None and 'error' not in record:
+                shutil.move(record['blend'], self.cache.Path(keys[record['gltf']]))
+                record['blend'] = self.cache.Store(keys[record['gltf']], record['gltf'], record['objects'], [record['collection']])['blend']
+            records.append(record)
+        records.extend({'gltf': job['gltf'], 'error': error} for job, error in failures)
+        converted = time.perf_counter() - started
+
+        ## bring every converted collection into the scene in one pass.
+        objects = {}
+        errors = {filePath: "Worker did not convert the file" for filePath in filePaths}
+        sceneCollection = bpy.context.scene.collection
+        for record in records:
+            if 'error' in record:
+                errors[record['gltf']] = record['error']
+                continue
+            with bpy.data.libraries.load(record['blend'], link=link) as (dataFrom, dataTo):
+                dataTo.collections = [record['collection']]
+            for collection in dataTo.collections:
+                if collection is None:
+                    continue
+                if link:
+                    instance = bpy.data.objects.new(collection.name, None) ## linked collections go in as an instance, like File > Link does
+                    instance.instance_type = 'COLLECTION'
+                    instance.instance_collection = collection
+                    sceneCollection.objects.link(instance)
+                    objects[record['gltf']] = [instance]
+                else:
+                    sceneCollection.children.link(collection)
+                    objects[record['gltf']] = list(collection.all_objects)
+                del errors[record['gltf']]
+        InvalidateSceneIndexes()
+        self.UseTextureTier([item for placed in objects.values() for item in placed])
+        self.parallelStats = {'converted': len(jobs), 'fromCache': len(filePaths) - len(jobs), 'failed': len(errors),
+                              'convertSeconds': converted, 'appendSeconds': time.perf_counter() - started - converted}
+        return (objects, errors)
 
     ## ImportFromBlendFile takes objects, collections, meshes, or other items from 
     ## blend files and imports them into the existing scene
-    def ImportFromBlendFile(self, blendFile="", objectType="Object", objectName=""):
+    ## Appending copies everything the item uses into this file.  With link=True the item is linked instead, so placing the same asset
+    ## many times shares one copy of its meshes, materials and images -- see LinkFromBlendFile.
+    def ImportFromBlendFile(self, blendFile="", objectType="Object", objectName="", link=False, override=True):
         if blendFile == "" or objectName == "":
             return (None, "Invalid blend file or object name")
         
         ## deselect all
         bpy.ops.object.select_all(action='DESELECT')
 
+        ## In proxy mode a box stands in for the item -- .blend files don't say how big things are without loading them,
+        ## so the bounds come from the import cache, recorded the last time the item was loaded in full.
+        if self.cache is not None:
+            key = self.cache.Key(blendFile, {'importer': 'blend', 'type': objectType, 'name': objectName})
+            if self.proxies and self.cache.Bounds(key) is not None:
+                details = {'kind': 'blend', 'blendFile': blendFile, 'objectType': objectType, 'objectName': objectName, 'link': link, 'override': override}
+                proxy = NewBoundsProxy(objectName, self.cache.Bounds(key), details)
+                return ([proxy], {'FINISHED'})
+
+        if link:
+            objects, resultStatus = self.LinkFromBlendFile(blendFile, objectType, objectName, override)
+            if self.cache is not None and objects is not None:
+                self.cache.RememberBounds(key, ObjectsBounds(objects))
+            return (objects, resultStatus)
+
+        ## A cached copy holds just this item and what it uses, so appending from it skips reading the whole source file.
+        if self.cache is not None:
+            entry = self.cache.Lookup(key)
+            if entry is not None:
+                objects = self.cache.Append(entry)
+                self.cache.RememberBounds(key, ObjectsBounds(objects))
+                return (objects, {'FINISHED'})
+
         ## append the actual object.
         resultStatus = bpy.ops.wm.append(filepath=os.path.join(blendFile, objectType, objectName), directory=os.path.join(blendFile, objectType), filename=objectName)
 
         ## Save the selected objects array from import.
         objects = bpy.context.selected_objects
 
+        if self.cache is not None and 'FINISHED' in resultStatus:
+            bpy.data.libraries.write(self.cache.Path(key), set(objects), path_remap='ABSOLUTE')
+            self.cache.Store(key, blendFile, objects=[item.name for item in objects])
+            self.cache.RememberBounds(key, ObjectsBounds(objects))
+
         ## return a tuple with the objects, Status.
         return (objects, resultStatus)
+
+    ## LinkFromBlendFile places a linked object or collection from a .blend library in the scene, reading the library only the first time.
+    ## Each placement is a new, movable object, but its meshes, materials and images stay the linked ones, so they're only in memory once.
+    ## Gives back (objects, status) like the other importers.
+    ## Parameters:
+    ##  blendFile -- the .blend library.
+    ##  objectType -- "Object" or "Collection".  Other types, like "Mesh", can't be placed in a scene by themselves, and give back (None, message).
+    ##  objectName -- the name of the item in the library.
+    ##  override -- make a library override, so the placed hierarchy can be posed and edited.  False places a plain local object
+    ##              (or collection instance) that uses the linked data as is -- lighter, but the linked data can't be changed.
+    def LinkFromBlendFile(self, blendFile="", objectType="Object", objectName="", override=True):
+        if objectType not in ("Object", "Collection"):
+            return (None, "LinkFromBlendFile places an Object or a Collection, not a " + str(objectType) + " -- use SharedLibraryRegistry.Link to link other data")
+        datablock = self.libraries.Link(blendFile, objectType, objectName)
+        if datablock is None:
+            return (None, objectName + " not found in " + blendFile)
+
+        collection = bpy.context.collection
+        if override:
+            placed = datablock.override_hierarchy_create(bpy.context.scene, bpy.context.view_layer)
+            if objectType == "Object":
+                if len(placed.users_collection) == 0:
+                    collection.objects.link(placed)
+                objects = [placed] + list(placed.children_recursive)
+            else:
+                if placed not in bpy.context.scene.collection.children_recursive:
+                    collection.children.link(placed)
+                objects = list(placed.all_objects)
+        elif objectType == "Object":
+            placed = datablock.copy() ## a local object that points at the linked mesh
+            collection.objects.link(placed)
+            objects = [placed]
+        else:
+            placed = bpy.data.objects.new(datablock.name, None)
+            placed.instance_type = 'COLLECTION'
+            placed.instance_collection = datablock
+            collection.objects.link(placed)
+            objects = [placed]
+
+        for item in objects:
+            item.select_set(True)
+        InvalidateSceneIndexes()
+        return (objects, {'FINISHED'})
     
+    ## ResolveProxies swaps proxies for the real assets, keeping wherever the proxies were moved to during layout.
+    ## glTF proxies are loaded together through ImportGLTFParallel, each file once -- an asset placed more than once gets a copy per proxy
+    ## that shares its data.  A deferred world HDR is loaded too.  A proxy whose asset fails to load is kept, so nothing silently disappears.
+    ## Call it before rendering: it uses operators, so it can't run from a render handler.
+    ## Gives back (resolved, errors): how many proxies were resolved, and a map of each kept proxy's name to why its asset didn't load.
+    ## Parameters:
+    ##  proxies -- the proxy objects to resolve.  Defaults to every proxy in the scene.
+    def ResolveProxies(self, proxies=None):
+        proxies = proxies if proxies is not None else [item for item in bpy.context.scene.objects if proxy_property in item]
+        proxyMode = self.proxies
+        self.proxies = False
+        resolved = 0
+        errors = {}
+        with BulkSceneBuild():
+            pending = [(proxy, json.loads(proxy[proxy_property]), proxy.matrix_world.copy()) for proxy in proxies]
+            gltfFiles = list(dict.fromkeys(details['file'] for proxy, details, matrix in pending if details['kind'] == 'gltf'))
+            gltfObjects, gltfErrors = self.ImportGLTFParallel(gltfFiles) if len(gltfFiles) > 0 else ({}, {})
+
+            ## copy each glTF once per extra proxy before anything is moved, so every copy starts from the asset's own position.
+            placements = {}
+            for gltfFile in gltfFiles:
+                objects = gltfObjects.get(gltfFile)
+                count = sum(1 for proxy, details, matrix in pending if details.get('file') == gltfFile)
+                placements[gltfFile] = [objects] + [CopyObjects(objects) for copy in range(count - 1)] if objects else []
+
+            for proxy, details, matrix in pending:
+                if details['kind'] == 'gltf':
+                    objects = placements[details['file']].pop(0) if len(placements[details['file']]) > 0 else None
+                    error = gltfErrors.get(details['file'], "the glTF import gave back nothing")
+                else:
+                    objects, error = self.ImportFromBlendFile(details['blendFile'], details['objectType'], details['objectName'], details['link'], details['override'])
+                if not objects:
+                    errors[proxy.name] = str(error)
+                    continue
+
+                ## the proxy was made at the asset's own position, so its matrix is exactly how far layout moved the asset.
+                for item in objects:
+                    if item.parent is None or item.parent not in objects:
+                        item.matrix_world = matrix @ item.matrix_world
+                mesh = proxy.data
+                bpy.data.objects.remove(proxy)
+                bpy.data.meshes.remove(mesh)
+                resolved += 1
+
+            world = bpy.context.scene.world
+            if world is not None and proxy_property in world:
+                details = json.loads(world[proxy_property])
+                del world[proxy_property]
+                self.ImportHDRorEXRIntoWorld(details['exrFile'], details['position'])
+        self.proxies = proxyMode
+        InvalidateSceneIndexes()
+        return(resolved, errors)
+
+    ## UseTextureTier points the image textures of imported objects' materials at the texture pyramid's copies for this session's quality,
+    ## and starts making copies in the background for any images that don't have them yet.  Gives back the objects.
+    def UseTextureTier(self, objects):
+        if self.textures is None or objects is None:
+            return(objects)
+        images = {node.image for item in objects for slot in item.material_slots if slot.material is not None and slot.material.node_tree is not None
+                  for node in slot.material.node_tree.nodes if node.type == 'TEX_IMAGE' and node.image is not None}
+        if self.textures.quality != 'full':
+            self.textures.Build(self.textures.ImageFiles(images), wait=False)
+        self.textures.SetQuality(self.textures.quality, images)
+        return(objects)
+
     ## Import an EXR/HDR light map as a large dome/sphere mapped as a world background texture/light source
+    ## In proxy mode the HDR isn't loaded -- the world remembers it, and ResolveProxies loads it later.
+    ## Images come from the importer's ImageRegistry, so running this again with the same file reuses the loaded image, and the
+    ## environment map it replaces is removed if nothing else uses it.
     def ImportHDRorEXRIntoWorld(self, exrFile="", position=[0, 0, 0]):
         if exrFile == "":
             return("No exr or hdr file specified")
 
+        if self.proxies:
+            bpy.context.scene.world[proxy_property] = json.dumps({'kind': 'world', 'exrFile': exrFile, 'position': list(position)})
+            return("Deferred until the proxies are resolved")
+
         ## get the node tree for the world and clear it.
         node_tree = bpy.context.scene.world.node_tree
         tree_nodes = bpy.context.scene.world.node_tree.nodes
+        oldImages = [node.image for node in tree_nodes if node.type == 'TEX_ENVIRONMENT' and node.image is not None]
         tree_nodes.clear()
 
         ## add 3 nodes from left to right -- Environment Texture, Bacgkround, and output
@@ -76,8 +1236,18 @@ class Importers():
         link = links.new(node_environment.outputs["Color"], node_background.inputs["Color"])
         link = links.new(node_background.outputs["Background"], node_output.inputs["Surface"])
 
-        ## load the EXF/HDR into the environment node.
-        node_environment.image = bpy.data.images.load(exrFile)
+        ## load the EXF/HDR into the environment node -- from the texture pyramid's copy for this session's quality, if there is one.
+        if self.textures is not None:
+            if self.textures.quality != 'full':
+                self.textures.Build([exrFile], wait=False)
+            node_environment.image = self.textures.Load(exrFile, images=self.images)
+        else:
+            node_environment.image = self.images.Load(exrFile)
+
+        ## let go of the environment maps this one replaced, unless something else still uses them.
+        for oldImage in oldImages:
+            if oldImage != node_environment.image:
+                self.images.Release(oldImage)
 
         ### Advanced -- change the XYZ position of the EXR
         node_vector = tree_nodes.new(type='ShaderNodeMapping')
@@ -116,6 +1286,49 @@ class CollectionHelpers():
     def GetMasterCollection(self):
         return(bpy.context.scene.collection)
 
+    ## MakeAssetCollection moves objects, like an imported asset, into a collection of their own to instance from.
+    ## The collection stays in the scene but is excluded from the view layer, so only its instances show and render.
+    ## Parameters:
+    ##  objects -- the objects that make up the asset.
+    ##  name -- the name of the asset collection.
+    def MakeAssetCollection(self, objects, name="ImranAsset"):
+        assetCollection = self.CreateCollectionWithName(name)
+        for item in objects:
+            for oldCollection in list(item.users_collection):
+                oldCollection.objects.unlink(item)
+            assetCollection.objects.link(item)
+        bpy.context.view_layer.layer_collection.children[assetCollection.name].exclude = True
+        InvalidateSceneIndexes()
+        return(assetCollection)
+
+    ## InstanceCollection places a collection instance at every transform in an (n, 4, 4) array, all in one go.
+    ## Each instance is an empty pointing at the collection, so it costs the same few hundred bytes however heavy the asset is --
+    ## unlike bpy.ops.object.duplicate, which copies every object and relies on the selection.
+    ## The instances go in a new collection of their own, so their transforms can be written with one foreach_set.
+    ## Gives back the collection holding the instances.
+    ## Parameters:
+    ##  collection -- the collection to instance, like MakeAssetCollection gives.
+    ##  transforms -- an (n, 4, 4) array of world matrices, rows by columns like mathutils.Matrix, translation in the last column.
+    ##  name -- the name of the instances' collection, and the base name of each instance.  Defaults to the asset's name.
+    ##  parent -- the collection to put the instances' collection in.  Defaults to the scene collection.
+    def InstanceCollection(self, collection, transforms, name=None, parent=None):
+        transforms = np.asarray(transforms, dtype=np.float32).reshape(-1, 4, 4)
+        name = name or collection.name
+        with BulkSceneBuild():
+            instances = bpy.data.collections.new(name + " Instances")
+            (parent or self.GetMasterCollection()).children.link(instances)
+            for index in range(len(transforms)):
+                instance = bpy.data.objects.new(name, None)
+                instance.instance_type = 'COLLECTION'
+                instance.instance_collection = collection
+                instance.empty_display_size = 0.1
+                instances.objects.link(instance)
+
+            ## blender flattens matrices column by column, so transpose each one before writing them all at once.
+            instances.objects.foreach_set("matrix_basis", np.ascontiguousarray(np.transpose(transforms, (0, 2, 1))).ravel())
+        InvalidateSceneIndexes()
+        return(instances)
+
 
 ## Generates terrain for a scene
 class TerrainGenerators():
@@ -20,9 +20,25 @@ spec.loader.exec_module(module)
 
 import ImranSceneLib as im
 
+## The asset library index finds assets by name, type and size -- refresh it from a command prompt with
+##  python ImranAssetIndex.py C:\temp\AssetLibrary
+assetIndex = im.ai.AssetIndex("C:\\temp\\AssetLibrary")
+
 ## Setup an importer and import the house, HDR, and treasure chest into the scene
-importer = im.Importers()
-chest, chestErr = importer.ImportGLTF("C:\\temp\\AssetLibrary\\furniture\\chest", "treasure_chest_4k.gltf")
-house, houseErr = importer.ImportFromBlendFile(blendFile="C:\\temp\\AssetLibrary\\buildings\\Cottage_FREE.blend", objectName="Cottage_Free")
+## Converted imports are cached by content hash, so re-running the script appends them instead of importing again.
+## While laying the scene out, set layoutOnly so the assets come in as bounding boxes -- they're swapped for the real ones
+## by importer.ResolveProxies() -- call it before rendering, as the boxes don't render.
+## textureQuality loads textures and the HDR from smaller copies during look-dev -- 512, 1024 or 2048 -- or 'full' for final renders.
+layoutOnly = False
+textureQuality = 'full'
+importer = im.Importers(cache=im.ImportCache(), proxies=layoutOnly, textures=im.TexturePyramid(quality=textureQuality))
+## glTF assets are converted in parallel by headless blender workers, then appended in one pass -- add more files to the list as the scene grows.
+gltfAssets = ["C:\\temp\\AssetLibrary\\furniture\\chest\\treasure_chest_4k.gltf"]
+gltfObjects, gltfErrors = importer.ImportGLTFParallel(gltfAssets)
+chest = gltfObjects.get(gltfAssets[0])
+cottages = assetIndex.FindAssets(name="Cottage_Free", objectType='MESH', category="buildings")
+houseFile, houseName = cottages[0][:2] if len(cottages) > 0 else ("C:\\temp\\AssetLibrary\\buildings\\Cottage_FREE.blend", "Cottage_Free")
+house, houseErr = importer.ImportFromBlendFile(blendFile=houseFile, objectName=houseName)
 importer.ImportHDRorEXRIntoWorld("C:\\temp\\AssetLibrary\\EXRs\\je_gray_park_4k.hdr")
-
+## what the importer did -- cache hits, parallel conversions, linked libraries and images -- to check from the python console.
+importStats = importer.Stats()
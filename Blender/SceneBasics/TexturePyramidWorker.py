@@ -0,0 +1,51 @@
+## TexturePyramidWorker makes the downscaled copies of a shard of images inside one headless blender, for TexturePyramid.Build.
+## Each image is loaded once and scaled down tier by tier, biggest first, so every step starts from the last one's smaller pixels.
+## Copies keep the source's file format, so EXR and HDR environment maps stay float.
+## Usage (TexturePyramid.Build does this for you):
+##  blender -b --factory-startup --python TexturePyramidWorker.py -- shard.json results.jsonl
+
+import bpy
+import json
+import os
+import sys
+import time
+
+## file_formats maps image extensions to the format blender saves them in.
+file_formats = {'.exr': 'OPEN_EXR', '.hdr': 'HDR', '.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG', '.tga': 'TARGA', '.tif': 'TIFF', '.tiff': 'TIFF', '.bmp': 'BMP'}
+
+## ScaleImage writes every tier of one image, giving back a record of what happened.
+## Parameters:
+##  job -- a dictionary with the 'source' image and its 'tiers': a list of [size, output file] pairs, biggest first.
+def ScaleImage(job):
+    started = time.perf_counter()
+    record = {'source': job['source'], 'tiers': {}, 'worker': os.getpid()}
+    try:
+        image = bpy.data.images.load(job['source'])
+        width, height = image.size
+        if width == 0 or height == 0:
+            raise RuntimeError("could not read " + job['source'])
+        record['size'] = [width, height]
+        image.file_format = file_formats.get(os.path.splitext(job['source'])[1].lower(), image.file_format)
+        for size, outputPath in job['tiers']:
+            ## the longest side becomes the tier size, and the other keeps the aspect ratio.
+            scale = size / max(width, height)
+            if scale >= 1.0:
+                continue
+            image.scale(max(1, round(width * scale)), max(1, round(height * scale)))
+            image.filepath_raw = outputPath
+            image.save()
+            record['tiers'][str(size)] = outputPath
+        bpy.data.images.remove(image)
+    except RuntimeError as error:
+        record['error'] = str(error)
+    record['seconds'] = time.perf_counter() - started
+    return(record)
+
+
+## blender passes our own arguments after "--"
+shardPath, resultPath = sys.argv[sys.argv.index("--") + 1:][:2]
+with open(shardPath) as shard:
+    jobs = json.load(shard)
+with open(resultPath, "w") as results:
+    for job in jobs:
+        results.write(json.dumps(ScaleImage(job)) + "\n")